@@ -1,10 +1,11 @@
 # asset_data.py
-from dataclasses import dataclass
-from typing import Optional  # If User Leave Input Empty
+from dataclasses import FrozenInstanceError
+from operator import attrgetter
+from typing import NamedTuple, Optional  # If User Leave Input Empty
 
-@dataclass
-class AssetData:
-    # Google Sheet Variables
+
+class AssetInput(NamedTuple):
+    """One sheet row, as loaded. Immutable; never modified by the calculations."""
     name: str
     symbol: str
     currency: str
@@ -15,45 +16,127 @@ class AssetData:
     mdd: Optional[float] = None
     eps: Optional[float] = None                         # Trailing EPS
     dps: Optional[float] = None                         # Trailing DPS
-    
+    region: Optional[str] = None                        # Optional risk tree level
+    sector: Optional[str] = None                        # Optional risk tree level
+    lot_size: Optional[float] = None                    # Optional board lot (shares per order unit)
+    high_52w: Optional[float] = None
+    low_52w: Optional[float] = None
+    low_years: Optional[float] = None
+    pe_p25: Optional[float] = None                      # 25th percentile P/E
+    pe_p75: Optional[float] = None                      # 75th percentile P/E
+
+
+# Every AssetData field in display / column order
+ASSET_FIELDS = (
+    # Google Sheet Variables
+    "name", "symbol", "currency", "shares", "price", "fx_rate", "asset_class", "mdd",
+    "eps", "dps", "region", "sector", "lot_size",
+
     # Portfolio Value Variables
-    value_local: Optional[float] = None
-    value_thb: Optional[float] = None
-    weight: Optional[float] = None
+    "value_local", "value_thb", "weight",
 
     # Assumption Calculated from MDD
-    rebound: Optional[float] = None 
-    cagr: Optional[float] = None
-    dividend_yield_offset: Optional[float] = None
-    
+    "rebound", "cagr", "dividend_yield_offset",
+
     # Proportion
-    mdd_inverse: Optional[float] = None
-    target_in_class: Optional[float] = None
-    target: Optional[float] = None
-    mdd_contribution: Optional[float] = None
+    "mdd_inverse", "target_in_class", "target", "mdd_contribution",
 
     # Position Size
-    drift: Optional[float] = None
-    drift_relative: Optional[float] = None
-    position_size: Optional[str] = None
-    drift_amount: Optional[float] = None
+    "drift", "drift_relative", "position_size", "drift_amount",
 
     # Price Signal
-    high_52w: Optional[float] = None
-    low_52w: Optional[float] = None
-    low_years: Optional[float] = None
-    drop_52w: Optional[float] = None
-    gain_52w: Optional[float] = None
-    gain_years: Optional[float] = None
-    calmar_ratio: Optional[float] = None
-    price_signal: Optional[str] = None
+    "high_52w", "low_52w", "low_years",
+    "drop_52w", "gain_52w", "gain_years", "calmar_ratio", "price_signal",
 
     # P/E Signal
-    pe_ratio: Optional[float] = None                    # Trailing P/E ratio
-    pe_p25: Optional[float] = None                      # 25th percentile P/E
-    pe_p75: Optional[float] = None                      # 75th percentile P/E
-    pe_signal: Optional[str] = None
+    "pe_ratio",
+    "pe_p25", "pe_p75",
+    "pe_signal",
 
     # Dividend Yield Signal
-    dividend_yield: Optional[float] = None              # Trailing dividend yield
-    dividend_yield_signal: Optional[str] = None
+    "dividend_yield", "dividend_yield_signal",
+)
+INPUT_FIELDS = AssetInput._fields
+OUTPUT_FIELDS = tuple(f for f in ASSET_FIELDS if f not in INPUT_FIELDS)
+_REQUIRED_FIELDS = ("name", "symbol", "currency", "shares")
+
+
+def _make_init():
+    """
+    __init__(name, symbol, currency, shares, price=None, ...) in ASSET_FIELDS
+    order, generated like a dataclass __init__ so every slot is a direct store.
+    """
+    params = ", ".join(name if name in _REQUIRED_FIELDS else f"{name}=None" for name in ASSET_FIELDS)
+    body = [f"    self.input = AssetInput({', '.join(INPUT_FIELDS)})"]
+    body += [f"    self.{name} = {name}" for name in OUTPUT_FIELDS]
+    namespace = {"AssetInput": AssetInput}
+    exec(f"def __init__(self, {params}):\n" + "\n".join(body), namespace)
+    return namespace["__init__"]
+
+
+def _read_only(name: str) -> property:
+    def _set(self, value):
+        raise FrozenInstanceError(
+            f"'{name}' is a sheet input; use asset.with_input({name}=...)"
+        )
+    return property(attrgetter(f"input.{name}"), _set)
+
+
+class AssetData:
+    """
+    One asset: the frozen sheet input plus the values computed from it.
+
+    Constructed and read like the former dataclass (AssetData(name, symbol,
+    currency, shares, price=..., target=...), asset.price, asset.target);
+    input fields are read-only views of asset.input, output fields are
+    plain slots. No per-instance __dict__.
+    """
+    __slots__ = ("input",) + OUTPUT_FIELDS
+
+    __init__ = _make_init()
+
+    @classmethod
+    def from_input(cls, asset_input: AssetInput) -> "AssetData":
+        asset = cls.__new__(cls)
+        asset.input = asset_input
+        for name in OUTPUT_FIELDS:
+            setattr(asset, name, None)
+        return asset
+
+    def copy(self) -> "AssetData":
+        """New record sharing the (immutable) input, with the outputs copied."""
+        asset = AssetData.__new__(AssetData)
+        asset.input = self.input
+        for name in OUTPUT_FIELDS:
+            setattr(asset, name, getattr(self, name))
+        return asset
+
+    def with_input(self, **changes) -> "AssetData":
+        """Copy with some sheet inputs replaced."""
+        asset = self.copy()
+        asset.input = self.input._replace(**changes)
+        return asset
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in ASSET_FIELDS}
+
+    def __eq__(self, other):
+        if not isinstance(other, AssetData):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return "AssetData(" + ", ".join(f"{name}={getattr(self, name)!r}" for name in ASSET_FIELDS) + ")"
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+
+for _name in INPUT_FIELDS:
+    setattr(AssetData, _name, _read_only(_name))
+del _name
@@ -1,6 +1,8 @@
 # assumption.py
 
+import numpy as np
 from asset_data import AssetData
+from portfolio_frame import PortfolioFrame
 from user_preferences import UserPreference
 
 
@@ -27,3 +29,22 @@ def calculate_assumptions(assets: list[AssetData], user_pref: UserPreference) ->
     """
     for asset in assets:
         calculate_assumption(asset, user_pref)
+
+
+def calculate_assumptions_frame(frame: PortfolioFrame, user_pref: UserPreference) -> None:
+    """
+    Vectorized calculate_assumptions over a PortfolioFrame.
+    """
+    mdd = frame.get("mdd")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Rebound
+        frame.set_where("rebound", frame.present("mdd"), 1 / (1 - mdd) - 1)
+
+        # CAGR
+        years = user_pref.years_rebound
+        frame.set_where("cagr", frame.present("rebound"), (1 + frame.get("rebound")) ** (1 / years) - 1)
+
+    # Dividend Yield Offset
+    if user_pref.years_dividend is not None:
+        frame.set("dividend_yield_offset", mdd / user_pref.years_dividend)
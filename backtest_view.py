@@ -0,0 +1,53 @@
+# backtest_view.py
+import matplotlib.pyplot as plt
+import pandas as pd
+import streamlit as st
+
+from rebalance_backtest import BacktestResult
+from table_format import format_table
+
+BACKTEST_METRICS = {
+    "CAGR": "cagr",
+    "MDD": "mdd",
+    "Volatility": "volatility",
+    "Turnover / Year": "turnover_per_year",
+    "Cost / Year": "cost_per_year",
+}
+
+
+def show_backtest(results: dict[str, BacktestResult]):
+    """Value curves and statistics of named backtests (e.g. rules vs buy-and-hold)."""
+    st.line_chart(pd.DataFrame({name: result.value for name, result in results.items()}))
+
+    stats = pd.DataFrame({name: result.stats() for name, result in results.items()}).T
+    table = pd.DataFrame({label: stats[metric].astype(float) for label, metric in BACKTEST_METRICS.items()})
+    table["Rebalances"] = stats["rebalances"].astype(int)
+    formats = dict.fromkeys(BACKTEST_METRICS, "pct1")
+    st.dataframe(format_table(table, formats, empty="", zero_is_empty=False), use_container_width=True)
+
+    skipped = sorted({name for result in results.values() for name in result.skipped})
+    if skipped:
+        st.caption("ℹ️ Left out for zero or missing prices: " + ", ".join(skipped))
+
+
+def show_threshold_heatmap(grid_df: pd.DataFrame, threshold_drift: float, threshold_drift_relative: float):
+    label = st.selectbox("Metric", list(BACKTEST_METRICS), key="backtest_metric")
+    metric = BACKTEST_METRICS[label]
+    grid = grid_df.pivot(index="threshold_drift_relative", columns="threshold_drift", values=metric) * 100
+
+    fig, ax = plt.subplots(figsize=(6, 4))
+    image = ax.imshow(
+        grid.values,
+        origin="lower",
+        aspect="auto",
+        extent=[
+            grid.columns.min() * 100, grid.columns.max() * 100,
+            grid.index.min() * 100, grid.index.max() * 100,
+        ],
+    )
+    ax.plot(threshold_drift * 100, threshold_drift_relative * 100, "w+", markersize=12)   # Current setting
+    ax.set_xlabel("Absolute Drift Threshold (%)")
+    ax.set_ylabel("Relative Drift Threshold (%)")
+    fig.colorbar(image, ax=ax, label=f"{label} (%)")
+    st.pyplot(fig)
+    plt.close(fig)
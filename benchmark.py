@@ -0,0 +1,393 @@
+# benchmark.py
+"""
+Benchmarks for the portfolio pipeline.
+
+Usage:
+    python benchmark.py --rows 100000                  # columnar vs iterrows sheet parsing
+    python benchmark.py --memory --rows 100000         # bytes per AssetData record
+    python benchmark.py --suite                        # every pipeline function, 100 … 1M assets
+    python benchmark.py --suite --sizes 1000 100000 --currencies 8 --missing 0.05 --fail-on-regression
+
+The suite appends its timings to a JSON-lines history file and flags a
+case as a regression when it is slower than the median of its previous
+runs (same case and size) by more than --tolerance.
+
+Cases that build one AssetData per asset (the list-based functions and
+parse_assets_dataframe) only run up to --max-object-rows (default 100k);
+larger sizes time the frame cases only and print which cases were skipped.
+"""
+import argparse
+import io
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from asset_data import AssetData
+from class_portfolio import ERC_CLASSES, new_risk_classes
+from load_assets import parse_assets_dataframe, parse_float, parse_percent
+from portfolio_frame import PortfolioFrame
+from portfolio_value import summarize_assets, summarize_assets_frame, calculate_portfolio_total_frame, assign_weights_frame
+from assumption import calculate_assumptions_frame
+from investment_allocation import apply_asset_class_erc
+from reserve_allocation import build_currency_portfolio
+from risk_tree import build_risk_tree
+from position_size import assign_position_sizes_frame
+from price_signal import assign_price_signals_frame
+from pe_signal import assign_pe_signals_frame
+from yield_signal import assign_yield_signals_frame
+from user_preferences import UserPreference
+
+SHEET_HEADER = [
+    "Name", "Symbol", "Currency", "Shares", "Price", "Fx", "Class", "Assumed MDD",
+    "52w High", "52w Low", "Years Low", "EPS", "DPS", "PE p25", "PE p75",
+]
+
+
+SHEET_CLASSES = ("Core", "Growth", "Speculative", "Cash", "Bond", "Gold")
+SHEET_CURRENCIES = {"THB": 1.0, "USD": 35.0, "EUR": 38.0, "JPY": 0.24}
+
+# Sheet columns that can be left blank by --missing (identity columns are always filled)
+OPTIONAL_SHEET_COLUMNS = ("Price", "52w High", "52w Low", "Years Low", "EPS", "DPS", "PE p25", "PE p75")
+
+
+def make_sheet_csv(
+    n_rows: int,
+    seed: int = 0,
+    n_currencies: int = len(SHEET_CURRENCIES),
+    classes: tuple[str, ...] = SHEET_CLASSES,
+    missing_ratio: float = 0.0,
+) -> str:
+    """Synthetic Google Sheet export with formatted numbers ("1,234.5", "40%")."""
+    rng = random.Random(seed)
+    currencies = _currencies(n_currencies)
+
+    lines = [",".join(SHEET_HEADER)]
+    for i in range(n_rows):
+        currency = rng.choice(list(currencies))
+        price = rng.uniform(1, 2000)
+        cells = [
+            f"Asset {i}", f"SYM{i}", currency,
+            f"\"{rng.uniform(1, 100000):,.2f}\"", f"\"{price:,.2f}\"", f"{currencies[currency]}",
+            rng.choice(classes), f"{rng.randint(5, 80)}%",
+            f"{price * 1.2:.2f}", f"{price * 0.8:.2f}", f"{price * 0.5:.2f}",
+            f"{price / 20:.2f}", f"{price / 50:.2f}", "15", "25",
+        ]
+        if missing_ratio:
+            for column in OPTIONAL_SHEET_COLUMNS:
+                if rng.random() < missing_ratio:
+                    cells[SHEET_HEADER.index(column)] = ""
+        lines.append(",".join(cells))
+    return "\n".join(lines)
+
+
+def _currencies(n_currencies: int) -> dict[str, float]:
+    """The SHEET_CURRENCIES first, then synthetic codes (C004, …) with made-up rates."""
+    currencies = dict(list(SHEET_CURRENCIES.items())[:n_currencies])
+    for i in range(len(currencies), n_currencies):
+        currencies[f"C{i:03d}"] = round(0.1 + (i * 7.31) % 50, 2)
+    return currencies
+
+
+def make_sheet_frame(
+    n_rows: int,
+    seed: int = 0,
+    n_currencies: int = len(SHEET_CURRENCIES),
+    classes: tuple[str, ...] = SHEET_CLASSES,
+    missing_ratio: float = 0.0,
+) -> PortfolioFrame:
+    """
+    Same kind of portfolio as make_sheet_csv, generated column-wise straight
+    into a PortfolioFrame (as parsed: blank cells become 0.0). Cheap enough
+    for millions of rows.
+    """
+    rng = np.random.default_rng(seed)
+    currencies = _currencies(n_currencies)
+    codes = rng.integers(0, len(currencies), n_rows)
+    price = rng.uniform(1, 2000, n_rows)
+
+    frame = PortfolioFrame(n_rows)
+    frame.set("name", np.char.add("Asset ", np.arange(n_rows).astype(str)).astype(object))
+    frame.set("symbol", np.char.add("SYM", np.arange(n_rows).astype(str)).astype(object))
+    frame.set("currency", np.array(list(currencies), dtype=object)[codes])
+    frame.set("asset_class", np.array(classes, dtype=object)[rng.integers(0, len(classes), n_rows)])
+    frame.set("shares", rng.uniform(1, 100000, n_rows).round(2))
+    frame.set("fx_rate", np.array(list(currencies.values()))[codes])
+    frame.set("mdd", rng.integers(5, 81, n_rows) / 100)
+
+    columns = {
+        "price": price, "high_52w": price * 1.2, "low_52w": price * 0.8, "low_years": price * 0.5,
+        "eps": price / 20, "dps": price / 50, "pe_p25": np.full(n_rows, 15.0), "pe_p75": np.full(n_rows, 25.0),
+    }
+    for field, values in columns.items():
+        blank = rng.random(n_rows) < missing_ratio
+        frame.set(field, np.where(blank, 0.0, values.round(2)))
+    return frame
+
+
+def _legacy_parse(df: pd.DataFrame) -> list[AssetData]:
+    """Row-wise iterrows parser that load_assets used before column-wise parsing."""
+    return [
+        AssetData(
+            name=row["name"],
+            symbol=row["symbol"],
+            currency=row["currency"],
+            shares=parse_float(row["shares"]),
+            price=parse_float(row["price"]),
+            fx_rate=parse_float(row["fx"]),
+            asset_class=row["class"],
+            mdd=parse_percent(row["assumed mdd"]),
+            high_52w=parse_float(row["52w high"]),
+            low_52w=parse_float(row["52w low"]),
+            low_years=parse_float(row["years low"]),
+            eps=parse_float(row["eps"]),
+            dps=parse_float(row["dps"]),
+            pe_p25=parse_float(row["pe p25"]),
+            pe_p75=parse_float(row["pe p75"]),
+        )
+        for _, row in df.iterrows()
+    ]
+
+
+def _read_sheet(csv_text: str, **read_csv_kwargs) -> pd.DataFrame:
+    df = pd.read_csv(io.StringIO(csv_text), **read_csv_kwargs)
+    df.columns = df.columns.str.strip().str.lower()
+    return df
+
+
+def bench_load(n_rows: int) -> None:
+    csv_text = make_sheet_csv(n_rows)
+
+    start = time.perf_counter()
+    legacy = _legacy_parse(_read_sheet(csv_text))
+    legacy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    assets, failures = parse_assets_dataframe(_read_sheet(csv_text, dtype=str))
+    columnar_s = time.perf_counter() - start
+
+    assert len(assets) == len(legacy) == n_rows and not failures
+    assert all(a.shares == b.shares and a.mdd == b.mdd for a, b in zip(assets, legacy))
+
+    print(f"load {n_rows:,} rows")
+    print(f"  iterrows   {legacy_s:8.3f}s  {n_rows / legacy_s:12,.0f} rows/s")
+    print(f"  columnar   {columnar_s:8.3f}s  {n_rows / columnar_s:12,.0f} rows/s  ({legacy_s / columnar_s:.1f}x)")
+
+
+def bench_memory(n_rows: int) -> None:
+    """Traced bytes per asset: slotted AssetData vs. the former dict-backed dataclass layout."""
+    import tracemalloc
+    from dataclasses import make_dataclass
+
+    from asset_data import ASSET_FIELDS
+
+    DictAssetData = make_dataclass("DictAssetData", [(name, object, None) for name in ASSET_FIELDS])
+    columns = make_sheet_frame(n_rows).to_dataframe()
+    rows = [dict(zip(columns.columns, values)) for values in columns.itertuples(index=False)]
+
+    print(f"memory {n_rows:,} assets")
+    for label, cls in (("dict dataclass", DictAssetData), ("slotted", AssetData)):
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        assets = [cls(**row) for row in rows]
+        after, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"  {label:<15} {(after - before) / 1024 ** 2:8.1f} MiB  {(after - before) / n_rows:6.0f} B/asset")
+        del assets
+
+
+# --- Suite ---
+
+SUITE_SIZES = (100, 1_000, 10_000, 100_000, 1_000_000)
+DEFAULT_HISTORY = "benchmark_history.jsonl"
+
+# Cases on list[AssetData] build one object per asset; above this size they
+# are skipped (run_suite prints them) and only the frame cases are timed
+MAX_OBJECT_ROWS = 100_000
+
+# Differences below this are timer noise, never a regression
+NOISE_FLOOR_S = 0.002
+
+
+def _time(func: Callable[[], object], setup: Callable[[], tuple], repeat: int) -> float:
+    """Best wall time of func(*setup()) over `repeat` runs; setup is not timed."""
+    best = float("inf")
+    for _ in range(repeat):
+        args = setup()
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _valued(frame: PortfolioFrame) -> PortfolioFrame:
+    frame = frame.copy()
+    summarize_assets_frame(frame)
+    assign_weights_frame(frame, calculate_portfolio_total_frame(frame))
+    calculate_assumptions_frame(frame, UserPreference(sheet_url=""))
+    frame.set("target", frame.get("weight")[::-1].copy())         # Any target that sums to 1
+    return frame
+
+
+def _suite_cases(frame: PortfolioFrame, csv_text: Optional[str], assets: Optional[list[AssetData]]) -> dict:
+    """Case name → (func, setup); object cases only when assets are given."""
+    # View cases need Streamlit; imported here so make_sheet_csv etc. stay headless
+    from portfolio_view import get_portfolio_df, portfolio_df_from_frame
+
+    user_pref = UserPreference(sheet_url="")
+    valued = _valued(frame)
+    total_thb = calculate_portfolio_total_frame(valued)
+
+    cases = {
+        "summarize_assets_frame": (
+            lambda f: (summarize_assets_frame(f), assign_weights_frame(f, calculate_portfolio_total_frame(f))),
+            lambda: (frame.copy(),),
+        ),
+        "calculate_assumptions_frame": (lambda f: calculate_assumptions_frame(f, user_pref), lambda: (valued.copy(),)),
+        "build_risk_tree": (lambda f: build_risk_tree(f), lambda: (valued,)),
+        "assign_position_sizes_frame": (
+            lambda f: assign_position_sizes_frame(f, user_pref, total_thb), lambda: (valued.copy(),),
+        ),
+        "assign_price_signals_frame": (
+            lambda f: assign_price_signals_frame(f, user_pref.years_rebound), lambda: (valued.copy(),),
+        ),
+        "assign_pe_signals_frame": (assign_pe_signals_frame, lambda: (valued.copy(),)),
+        "assign_yield_signals_frame": (assign_yield_signals_frame, lambda: (valued.copy(),)),
+        "portfolio_df_from_frame": (portfolio_df_from_frame, lambda: (valued,)),
+    }
+    if csv_text is not None:
+        cases["parse_assets_dataframe"] = (parse_assets_dataframe, lambda: (_read_sheet(csv_text, dtype=str),))
+    if assets is not None:
+        valued_assets = valued.to_assets()
+        cases.update({
+            "PortfolioFrame.from_assets": (PortfolioFrame.from_assets, lambda: (assets,)),
+            "summarize_assets": (summarize_assets, lambda: ([a.copy() for a in assets],)),
+            "apply_asset_class_erc": (
+                lambda a, rcs: [apply_asset_class_erc(a, rcs, name) for name in ERC_CLASSES],
+                lambda: ([a.copy() for a in valued_assets], new_risk_classes()),     # Writes targets
+            ),
+            "build_currency_portfolio": (build_currency_portfolio, lambda: (valued_assets, 0.2)),
+            "get_portfolio_df": (get_portfolio_df, lambda: (valued_assets,)),
+        })
+    return cases
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path: str) -> list[dict]:
+    try:
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def find_regressions(history: list[dict], results: list[dict], tolerance: float, window: int = 5) -> list[dict]:
+    """Results slower than the median of the last `window` runs of the same case and size."""
+    regressions = []
+    for result in results:
+        previous = [
+            h["seconds"] for h in history
+            if h["case"] == result["case"] and h["rows"] == result["rows"]
+        ][-window:]
+        if not previous:
+            continue
+        baseline = statistics.median(previous)
+        if result["seconds"] > baseline * (1 + tolerance) and result["seconds"] - baseline > NOISE_FLOOR_S:
+            regressions.append({**result, "baseline": baseline})
+    return regressions
+
+
+def run_suite(
+    sizes=SUITE_SIZES,
+    n_currencies: int = len(SHEET_CURRENCIES),
+    missing_ratio: float = 0.0,
+    repeat: int = 3,
+    max_object_rows: int = MAX_OBJECT_ROWS,
+) -> list[dict]:
+    """
+    Time every case at every size; one result dict per case and size.
+
+    Object cases are skipped above max_object_rows, so those sizes have no
+    result for them.
+    """
+    run = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    commit = _git_commit()
+    results = []
+
+    for n_rows in sizes:
+        frame = make_sheet_frame(n_rows, n_currencies=n_currencies, missing_ratio=missing_ratio)
+        small = n_rows <= max_object_rows
+        csv_text = make_sheet_csv(n_rows, n_currencies=n_currencies, missing_ratio=missing_ratio) if small else None
+        assets = frame.to_assets() if small else None
+
+        for case, (func, setup) in _suite_cases(frame, csv_text, assets).items():
+            seconds = _time(func, setup, repeat if n_rows < 1_000_000 else 1)
+            results.append({
+                "run": run, "commit": commit, "python": platform.python_version(),
+                "case": case, "rows": n_rows, "currencies": n_currencies, "missing": missing_ratio,
+                "seconds": seconds,
+            })
+            print(f"{case:<30} {n_rows:>10,} rows  {seconds:10.4f}s  {n_rows / seconds:14,.0f} rows/s")
+        if not small:
+            print(f"{'(object cases skipped)':<30} {n_rows:>10,} rows  above max_object_rows={max_object_rows:,}")
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--suite", action="store_true")
+    parser.add_argument("--memory", action="store_true", help="Bytes per AssetData at --rows.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SUITE_SIZES))
+    parser.add_argument("--currencies", type=int, default=len(SHEET_CURRENCIES))
+    parser.add_argument("--missing", type=float, default=0.0, help="Share of blank optional cells.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-object-rows", type=int, default=MAX_OBJECT_ROWS)
+    parser.add_argument("--history", default=DEFAULT_HISTORY)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs. history (0.25 = 25%%).")
+    parser.add_argument("--no-record", action="store_true", help="Compare with the history without appending.")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.memory:
+        bench_memory(args.rows)
+        return 0
+    if not args.suite:
+        bench_load(args.rows)
+        return 0
+
+    history = load_history(args.history)
+    results = run_suite(args.sizes, args.currencies, args.missing, args.repeat, args.max_object_rows)
+    regressions = find_regressions(
+        [h for h in history if h.get("currencies") == args.currencies and h.get("missing") == args.missing],
+        results, args.tolerance,
+    )
+    for r in regressions:
+        print(f"REGRESSION {r['case']} @ {r['rows']:,} rows: {r['seconds']:.4f}s vs median {r['baseline']:.4f}s")
+
+    if not args.no_record:
+        with open(args.history, "a") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
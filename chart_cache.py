@@ -0,0 +1,51 @@
+# chart_cache.py
+import io
+from functools import lru_cache
+
+import pandas as pd
+import streamlit as st
+from matplotlib.figure import Figure
+
+CHART_BACKENDS = ("matplotlib", "native")
+
+
+@lru_cache(maxsize=64)
+def _render_pie_png(labels: tuple, values: tuple, autopct: str) -> bytes:
+    """
+    Render a pie chart to PNG bytes.
+
+    Keyed on the plotted labels and values, so an unchanged chart is never
+    re-rendered. Figure() is used instead of pyplot: it is not registered
+    in pyplot's global figure list and is freed as soon as this returns.
+    """
+    fig = Figure(figsize=(5, 5))
+    ax = fig.subplots()
+    ax.pie(values, labels=labels, autopct=autopct)
+    ax.set_ylabel("")
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    return buffer.getvalue()
+
+
+def show_pie_chart(series: pd.Series, backend: str = "matplotlib", autopct: str = "%1.0f%%"):
+    """
+    Show a pie chart of series (index = labels).
+
+    backend="matplotlib" serves cached PNG bytes.
+    backend="native" sends the data to Streamlit's built-in Vega-Lite chart
+    (rendered by the browser, no server-side rendering).
+    """
+    if backend == "native":
+        chart_df = pd.DataFrame({"Name": series.index, "Value": series.values})
+        st.vega_lite_chart(chart_df, {
+            "mark": {"type": "arc", "tooltip": True},
+            "encoding": {
+                "theta": {"field": "Value", "type": "quantitative", "stack": True},
+                "color": {"field": "Name", "type": "nominal"},
+            },
+        })
+        return
+
+    png = _render_pie_png(tuple(series.index), tuple(float(v) for v in series.values), autopct)
+    st.image(png)
@@ -2,7 +2,7 @@
 from dataclasses import dataclass
 from typing import Optional
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class RiskClass:
     name: str
     class_mdd: Optional[float] = None
@@ -11,11 +11,9 @@ class RiskClass:
     class_mdd_contribution: Optional[float] = None
 
 # ERC investment classes only
-ERC_CLASSES = ["Core", "Growth", "Speculative"]
+ERC_CLASSES = ("Core", "Growth", "Speculative")
 
-# Risk classes used in hierarchical ERC
-RISK_CLASSES = [
-    RiskClass("Core"),
-    RiskClass("Growth"),
-    RiskClass("Speculative"),
-]
+
+def new_risk_classes() -> list[RiskClass]:
+    """Fresh, empty risk classes for one hierarchical ERC run (never shared between runs)."""
+    return [RiskClass(name) for name in ERC_CLASSES]
@@ -2,7 +2,7 @@
 
 from dataclasses import dataclass
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Currency:
     name: str
 
@@ -15,9 +15,3 @@ class Currency:
     currency_cash_ratio: float = 0.0
     currency_bond_weight: float = 0.0
 
-
-def build_currency_objects(currency_names: list[str]):
-    currency_names = sorted({n.upper() for n in currency_names})
-    currencies = [Currency(name=n) for n in currency_names]
-    currency_map = {c.name: c for c in currencies}
-    return currencies, currency_map
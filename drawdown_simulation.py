@@ -0,0 +1,190 @@
+# drawdown_simulation.py
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from portfolio_frame import PortfolioFrame
+from price_history import PriceHistoryStore, daily_log_returns
+
+SIMULATION_METHODS = ("bootstrap", "gaussian")
+TRADING_DAYS = 252
+
+# Working memory per chunk of paths
+DEFAULT_CHUNK_BYTES = 64 * 1024 ** 2
+
+
+@dataclass
+class DrawdownSimulation:
+    """Simulated maximum drawdown per path (rows) and portfolio (columns)."""
+    mdd: pd.DataFrame
+    method: str
+    horizon_days: int
+    history_days: int                   # Days of return history the model was fitted on
+
+    def summary(self, quantiles: Iterable[float] = (0.05, 0.25, 0.5, 0.75, 0.95)) -> pd.DataFrame:
+        """Mean and quantiles of MDD per portfolio (rows = portfolios)."""
+        quantiles = tuple(quantiles)
+        table = self.mdd.quantile(list(quantiles)).T
+        table.columns = [f"p{round(q * 100)}" for q in quantiles]
+        table.insert(0, "mean", self.mdd.mean())
+        return table
+
+    def exceedance(self, thresholds: dict[str, float]) -> pd.Series:
+        """Share of paths whose MDD is worse than each portfolio's threshold (e.g. its assumed MDD)."""
+        return pd.Series({name: float((self.mdd[name] > abs(value)).mean()) for name, value in thresholds.items()})
+
+
+# --- Model inputs ---
+
+def portfolio_return_history(
+    frame: PortfolioFrame,
+    weights: dict[str, np.ndarray],
+    store: PriceHistoryStore,
+    years: int,
+) -> pd.DataFrame:
+    """
+    Daily simple returns of each weight vector over stored history, with
+    weights held constant (rebalanced daily).
+
+    Rows without price history (e.g. auto-added Cash / Bond placeholders)
+    contribute a zero return; days a symbol did not trade count as flat.
+
+    Args:
+        weights: portfolio name → weight per frame row (NaN = 0)
+
+    Returns:
+        DataFrame indexed by day number, one column per portfolio
+    """
+    symbols = frame.get("symbol")
+    log_returns = daily_log_returns(store, [s for s in symbols if s], years)
+    if log_returns.empty:
+        return pd.DataFrame(columns=list(weights), dtype=np.float64)
+
+    # Weight per symbol column (repeated symbols add up)
+    column = pd.Series(symbols).map({s: i for i, s in enumerate(log_returns.columns)}).to_numpy()
+    has_history = ~pd.isna(column)
+    symbol_weights = np.zeros((log_returns.shape[1], len(weights)))
+    for k, w in enumerate(weights.values()):
+        w = np.nan_to_num(np.asarray(w, dtype=np.float64))
+        np.add.at(symbol_weights[:, k], column[has_history].astype(np.int64), w[has_history])
+
+    simple = np.expm1(log_returns.fillna(0.0).to_numpy())
+    return pd.DataFrame(simple @ symbol_weights, index=log_returns.index, columns=list(weights))
+
+
+# --- Simulation kernel ---
+# Paths are simulated in log space, laid out (portfolios, paths, days) so the
+# cumulative sums / running peaks run along contiguous memory:
+#     MDD = 1 − exp(−max(peak − cum))   with peak = running max of cum, at least 0
+
+def _max_drawdown(log_returns: np.ndarray) -> np.ndarray:
+    """MDD per (portfolio, path) of a (portfolios, paths, days) cube; overwrites the input."""
+    cum = np.cumsum(log_returns, axis=2, out=log_returns)
+    drawdown = np.maximum.accumulate(cum, axis=2)
+    np.maximum(drawdown, 0.0, out=drawdown)                         # Start at wealth 1
+    drawdown -= cum
+    return -np.expm1(-drawdown.max(axis=2))
+
+
+def _simulate_chunk(job: tuple) -> np.ndarray:
+    """One chunk of paths; module-level so it can run in a worker process."""
+    method, model, n_paths, horizon, block_days, seed = job
+    rng = np.random.default_rng(seed)
+
+    if method == "bootstrap":
+        history = model                                             # (portfolios, days) log returns
+        n_days = history.shape[1]
+        n_blocks = -(-horizon // block_days)
+        starts = rng.integers(0, n_days, size=(n_paths, n_blocks, 1))
+        index = ((starts + np.arange(block_days)) % n_days).reshape(n_paths, -1)[:, :horizon]
+        log_returns = np.take(history, index, axis=1)
+    else:
+        mean, cholesky = model                                      # (portfolios,), (portfolios, portfolios)
+        shocks = rng.standard_normal((len(mean), n_paths * horizon))
+        log_returns = (cholesky @ shocks).reshape(len(mean), n_paths, horizon)
+        log_returns += mean[:, None, None]
+
+    return _max_drawdown(log_returns).T.astype(np.float32)
+
+
+def simulate_drawdowns(
+    history: pd.DataFrame,
+    n_paths: int = 10_000,
+    horizon_days: int = TRADING_DAYS,
+    method: str = "bootstrap",
+    block_days: int = 1,
+    seed: int = 0,
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+    workers: int = 1,
+) -> DrawdownSimulation:
+    """
+    Monte Carlo maximum drawdown over horizon_days for each portfolio
+    column of history (see portfolio_return_history).
+
+    method:
+        "bootstrap" – resample historical days (all portfolios on the same
+                      day, so their co-movement is kept); block_days > 1
+                      resamples runs of consecutive days
+        "gaussian"  – correlated normal daily log returns with the historical
+                      mean and covariance of the portfolios
+
+    Paths are generated in chunks that fit chunk_bytes, each with its own
+    seed spawned from `seed`, so a run is reproducible for the same
+    arguments whatever the number of worker processes.
+    """
+    if method not in SIMULATION_METHODS:
+        raise ValueError(f"method='{method}' is not in SIMULATION_METHODS={SIMULATION_METHODS}")
+    if len(history) < 2:
+        raise ValueError("At least two days of return history are needed.")
+
+    log_returns = np.log1p(history.to_numpy(dtype=np.float64)).T       # (portfolios, days)
+    n_portfolios = len(log_returns)
+
+    if method == "bootstrap":
+        model = np.ascontiguousarray(log_returns)
+    else:
+        covariance = np.atleast_2d(np.cov(log_returns))
+        # Jitter keeps the factorization valid for identical portfolios
+        cholesky = np.linalg.cholesky(covariance + np.eye(n_portfolios) * 1e-12)
+        model = (log_returns.mean(axis=1), cholesky)
+
+    # Per path and day: two float64 cubes (returns / peaks) plus one int64 index
+    chunk_paths = max(1, chunk_bytes // (horizon_days * (n_portfolios * 16 + 8)))
+    sizes = [min(chunk_paths, n_paths - start) for start in range(0, n_paths, chunk_paths)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(method, model, size, horizon_days, block_days, s) for size, s in zip(sizes, seeds)]
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks = list(pool.map(_simulate_chunk, jobs))
+    else:
+        chunks = [_simulate_chunk(job) for job in jobs]
+
+    mdd = np.concatenate(chunks) if chunks else np.empty((0, n_portfolios), dtype=np.float32)
+    return DrawdownSimulation(
+        mdd=pd.DataFrame(mdd, columns=history.columns),
+        method=method,
+        horizon_days=horizon_days,
+        history_days=len(history),
+    )
+
+
+def simulate_portfolio_drawdowns(
+    frame: PortfolioFrame,
+    store: PriceHistoryStore,
+    history_years: int = 10,
+    **kwargs,
+) -> Optional[DrawdownSimulation]:
+    """
+    Simulate the target and current portfolios of a pipeline result frame.
+
+    Returns None when the store has no usable history for its symbols.
+    """
+    weights = {"Target": frame.get("target"), "Current": frame.get("weight")}
+    history = portfolio_return_history(frame, weights, store, history_years)
+    if len(history) < 2:
+        return None
+    return simulate_drawdowns(history, **kwargs)
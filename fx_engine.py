@@ -0,0 +1,168 @@
+# fx_engine.py
+"""
+Currency conversion through one rate matrix.
+
+    fx = FxMatrix.from_frame(frame)              # Sheet "Fx" column: units of THB per 1 unit
+    fx.rate("THB", "USD")                        # Cross rate from the sheet quote to a base currency
+    fx.rate("USD", "EUR")                        # Cross rate, triangulated through THB
+    fx.convert(values, currencies, "USD")        # Whole array in one vectorized step
+
+rates[i, j] holds the units of currency j per 1 unit of currency i. Pairs
+not quoted directly are filled from their inverse, then triangulated
+through intermediate currencies, fewest legs first; NaN marks pairs with
+no path.
+
+Sheet rows are always valued with their own Fx cell (convert_frame); the
+matrix only supplies the cross rate from SHEET_FX_BASE to another base
+currency, and per-currency rates where no row is involved.
+"""
+import warnings
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from asset_data import AssetData
+from portfolio_frame import PortfolioFrame
+
+# Quote currency of the sheet's Fx column (and of market data FX refreshes)
+SHEET_FX_BASE = "THB"
+
+
+class FxRateError(ValueError):
+    """No conversion path between a currency and the base currency."""
+
+
+def _upper(currencies: Iterable) -> np.ndarray:
+    return np.array([(c or "").upper() for c in currencies], dtype=object)
+
+
+class FxMatrix:
+    def __init__(self, currencies: Iterable[str], rates: np.ndarray):
+        self.currencies = tuple(currencies)
+        self.index = pd.Index(self.currencies)
+        self.rates = rates
+        self.rates.flags.writeable = False
+
+    @classmethod
+    def from_quotes(cls, quotes: dict[tuple[str, str], float], currencies: Iterable[str] = ()) -> "FxMatrix":
+        """Matrix over every quoted currency (plus currencies) from {(from, to): units of to per 1 from}."""
+        names = list(dict.fromkeys(
+            [c.upper() for c in currencies if c] + [c.upper() for pair in quotes for c in pair]
+        ))
+        index = {c: i for i, c in enumerate(names)}
+        rates = np.full((len(names), len(names)), np.nan)
+        for (source, to), rate in quotes.items():
+            if rate is not None and rate > 0:
+                rates[index[source.upper()], index[to.upper()]] = rate
+        np.fill_diagonal(rates, 1.0)
+        return cls(names, _triangulate(rates))
+
+    @classmethod
+    def from_columns(cls, currencies: Iterable, fx_rate: np.ndarray, quote_currency: str = SHEET_FX_BASE) -> "FxMatrix":
+        """
+        Matrix from an Fx column: the last positive fx_rate of each
+        currency, quoted in quote_currency. Warns when a currency has
+        conflicting rates.
+        """
+        currencies = _upper(currencies)
+        fx_rate = np.nan_to_num(np.asarray(fx_rate, dtype=np.float64))
+        quoted = (currencies != "") & (fx_rate > 0)
+        by_currency = pd.Series(fx_rate[quoted]).groupby(currencies[quoted], sort=True)
+        conflicting = by_currency.nunique()
+        conflicting = conflicting[conflicting > 1].index.tolist()
+        if conflicting:
+            warnings.warn(
+                f"Conflicting Fx rates for {', '.join(conflicting)}: rows are valued with their own Fx cell, "
+                "the last rate is used where one rate per currency is needed.",
+                stacklevel=2,
+            )
+        last = by_currency.last()
+        names, rates = last.index.to_numpy(), last.to_numpy()
+        return cls.from_quotes(
+            {(c, quote_currency): r for c, r in zip(names, rates)},
+            currencies=[quote_currency] + list(np.unique(currencies[currencies != ""])),
+        )
+
+    @classmethod
+    def from_frame(cls, frame: PortfolioFrame, quote_currency: str = SHEET_FX_BASE) -> "FxMatrix":
+        return cls.from_columns(frame.get("currency"), frame.get("fx_rate"), quote_currency)
+
+    @classmethod
+    def from_assets(cls, assets: list[AssetData], quote_currency: str = SHEET_FX_BASE) -> "FxMatrix":
+        fx_rate = [np.nan if a.fx_rate is None else a.fx_rate for a in assets]
+        return cls.from_columns([a.currency for a in assets], fx_rate, quote_currency)
+
+    def __contains__(self, currency: str) -> bool:
+        return currency.upper() in self.index
+
+    def rate(self, source: str, to: str) -> float:
+        """Units of to per 1 unit of source (NaN when there is no path or either is unknown)."""
+        i, j = self.index.get_indexer([source.upper(), to.upper()])
+        return float(self.rates[i, j]) if i >= 0 and j >= 0 else np.nan
+
+    def rates_to(self, to: str, currencies: Iterable[str]) -> np.ndarray:
+        """Rate from each currency of an array to one currency (NaN where unknown)."""
+        j = self.index.get_indexer([to.upper()])[0]
+        if j < 0:
+            raise FxRateError(f"No FX rates for currency '{to}'.")
+        codes = self.index.get_indexer(_upper(currencies))
+        column = np.append(self.rates[:, j], np.nan)        # Code -1 reads the trailing NaN
+        return column[codes]
+
+    def convert(self, values: np.ndarray, currencies: Iterable[str], to: str) -> np.ndarray:
+        """values[i] in currencies[i], converted to one currency in a single vectorized step."""
+        return np.asarray(values, dtype=np.float64) * self.rates_to(to, currencies)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(self.rates, index=self.index, columns=self.index)
+
+
+def _triangulate(rates: np.ndarray) -> np.ndarray:
+    """Fill missing pairs from inverses, then through intermediates (each round doubles the legs)."""
+    rates = rates.copy()
+    missing = np.isnan(rates)
+    rates[missing] = 1 / rates.T[missing]
+
+    while True:
+        missing = np.isnan(rates)
+        if not missing.any():
+            break
+        via = rates[:, :, None] * rates[None, :, :]          # via[i, k, j] = rates[i, k] * rates[k, j]
+        known = ~np.isnan(via)
+        reachable = missing & known.any(axis=1)
+        if not reachable.any():
+            break
+        k = known.argmax(axis=1)                              # First intermediate with both legs
+        rates[reachable] = np.take_along_axis(via, k[:, None, :], axis=1)[:, 0, :][reachable]
+    return rates
+
+
+def sheet_cross_rate(fx: Optional[FxMatrix], base: str = SHEET_FX_BASE) -> float:
+    """
+    Units of base per 1 SHEET_FX_BASE (1.0 when base is SHEET_FX_BASE).
+
+    Raises:
+        FxRateError: when fx has no rate between the two
+    """
+    if base.upper() == SHEET_FX_BASE:
+        return 1.0
+    rate = fx.rate(SHEET_FX_BASE, base) if fx is not None else np.nan
+    if np.isnan(rate):
+        raise FxRateError(
+            f"No FX rate for base currency '{base}'. Add a sheet row in {base} with its Fx rate to {SHEET_FX_BASE}."
+        )
+    return rate
+
+
+def convert_frame(
+    frame: PortfolioFrame,
+    values: np.ndarray,
+    fx: Optional[FxMatrix],
+    base: str = SHEET_FX_BASE,
+) -> np.ndarray:
+    """
+    Local-currency values of each row in the base currency: each row's own
+    Fx cell (NaN where missing) times the cross rate to base.
+    """
+    return values * frame.get("fx_rate") * sheet_cross_rate(fx, base)
@@ -0,0 +1,58 @@
+# history_view.py
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import pandas as pd
+import streamlit as st
+
+from portfolio_history import PortfolioHistory
+
+HISTORY_FIELDS = {"Weight": "weight", "Target": "target", "Drift": "drift"}
+HISTORY_RANGES = {"1 Week": 7, "1 Month": 30, "3 Months": 91, "1 Year": 365, "All": None}
+HISTORY_TOP_ASSETS = 10
+
+
+def get_history_settings() -> tuple[Optional[datetime], str]:
+    """(start of the range or None, AssetData field)"""
+    col1, col2 = st.columns(2)
+    days = HISTORY_RANGES[col1.selectbox("Range", list(HISTORY_RANGES), index=2, key="history_range")]
+    field = HISTORY_FIELDS[col2.selectbox("Series", list(HISTORY_FIELDS), key="history_field")]
+    start = datetime.now(timezone.utc) - timedelta(days=days) if days is not None else None
+    return start, field
+
+
+def load_history(history: PortfolioHistory, portfolio: str, start: Optional[datetime]) -> dict[str, pd.DataFrame]:
+    """Runs and per-asset weight / target / drift of one portfolio (only those columns are read)."""
+    if start is not None:
+        start = start.replace(hour=0, minute=0, second=0, microsecond=0)      # Stable memo key within a day
+    return {
+        "runs": history.query(
+            "runs", start, columns=["timestamp", "total_thb", "current_portfolio_mdd", "target_portfolio_mdd"],
+            portfolio=portfolio,
+        ),
+        "assets": history.asset_history(tuple(HISTORY_FIELDS.values()), start, portfolio=portfolio),
+    }
+
+
+def show_history(data: dict[str, pd.DataFrame], field: str):
+    runs, assets = data["runs"], data["assets"]
+    if runs.empty:
+        st.info("ℹ️ No recorded runs in this range yet.")
+        return
+
+    label = next(k for k, v in HISTORY_FIELDS.items() if v == field)
+    series = assets.pivot_table(index="timestamp", columns="name", values=field, aggfunc="sum") * 100
+    latest = assets[assets["timestamp"] == assets["timestamp"].max()].groupby("name")["weight"].sum()
+    default = latest.sort_values(ascending=False).index[:HISTORY_TOP_ASSETS].tolist()
+    names = st.multiselect("Assets", series.columns.tolist(), default=default, key="history_assets")
+    st.line_chart(series[names], y_label=f"{label} (%)")
+
+    st.line_chart(
+        (runs.set_index("timestamp")[["current_portfolio_mdd", "target_portfolio_mdd"]] * 100)
+        .rename(columns={"current_portfolio_mdd": "Current MDD", "target_portfolio_mdd": "Target MDD"}),
+        y_label="Portfolio MDD (%)",
+    )
+    st.caption(
+        f"ℹ️ {len(runs):,} recorded runs since {runs['timestamp'].iloc[0]:%Y-%m-%d %H:%M} UTC. "
+        "A run is recorded whenever the portfolio results change."
+    )
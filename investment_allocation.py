@@ -1,6 +1,27 @@
 # investment_allocation.py
-from typing import Any, Iterable
-from class_portfolio import ERC_CLASSES
+import warnings
+from dataclasses import asdict, replace
+from types import SimpleNamespace
+from typing import Any, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from class_portfolio import ERC_CLASSES, RiskClass
+
+# "inverse_mdd": weights ∝ 1 / MDD (correlations ignored)
+# "covariance":  true ERC on diag(MDD) · correlation · diag(MDD)
+ERC_METHODS = ("inverse_mdd", "covariance")
+
+# Above this size a CCD sweep is cheaper than Newton's O(n³) linear solves
+NEWTON_MAX_ASSETS = 500
+
+# Weight of the identity in the shrunk correlation: its eigenvalues are then
+# at least this large, which bounds the condition number the solver sees
+CORRELATION_SHRINKAGE = 0.05
+
+# Largest relative risk-contribution error accepted from solve_erc
+ERC_RESIDUAL_TOL = 1e-6
 
 
 def apply_erc_by_mdd(
@@ -77,15 +98,245 @@ def apply_erc_by_mdd(
     return portfolio_mdd
 
 
-def apply_asset_class_erc(assets, risk_classes, class_name: str) -> float:
+def nearest_correlation(
+    corr: np.ndarray,
+    min_eigenvalue: float = 1e-8,
+    shrinkage: float = CORRELATION_SHRINKAGE,
+) -> np.ndarray:
+    """
+    Make a pairwise-estimated correlation matrix usable by the solver:
+    unknown pairs (NaN) become 0, the diagonal 1, negative eigenvalues are
+    clipped so the matrix is positive definite, and the result is shrunk
+    towards the identity, (1 − shrinkage)·corr + shrinkage·I.
+    """
+    corr = np.nan_to_num(np.asarray(corr, dtype=np.float64))
+    corr = (corr + corr.T) / 2
+    np.fill_diagonal(corr, 1.0)
+
+    eigenvalues, eigenvectors = np.linalg.eigh(corr)
+    if eigenvalues.min() < min_eigenvalue:
+        corr = (eigenvectors * np.maximum(eigenvalues, min_eigenvalue)) @ eigenvectors.T
+        scale = 1 / np.sqrt(np.diag(corr))
+        corr = corr * np.outer(scale, scale)
+
+    corr = (1 - shrinkage) * corr
+    np.fill_diagonal(corr, 1.0)
+    return corr
+
+
+def _newton_erc(cov: np.ndarray, x: np.ndarray, budget: float, tol: float, max_iter: int) -> np.ndarray:
+    """Damped Newton steps on the ERC objective, from a positive x."""
+    def objective(v):
+        return 0.5 * v @ cov @ v - budget * np.log(v).sum()
+
+    for _ in range(max_iter):
+        cov_x = cov @ x
+        if np.max(np.abs(x * cov_x - budget)) <= tol * budget:
+            break
+        gradient = cov_x - budget / x
+        hessian = cov + np.diag(budget / x ** 2)
+        step = -np.linalg.solve(hessian, gradient)
+
+        # Stay strictly positive, then backtrack until the objective decreases
+        shrinking = step < 0
+        alpha = min(1.0, 0.99 * np.min(-x[shrinking] / step[shrinking])) if shrinking.any() else 1.0
+        f = objective(x)
+        while alpha > 1e-12 and objective(x + alpha * step) > f + 1e-4 * alpha * (gradient @ step):
+            alpha /= 2
+        x = x + alpha * step
+    return x
+
+
+def _ccd_erc(cov: np.ndarray, x: np.ndarray, budget: float, tol: float, max_iter: int) -> np.ndarray:
+    """Cyclical coordinate descent: each x_i solves its own quadratic exactly."""
+    diag = np.diag(cov)
+    cov_x = cov @ x
+    for _ in range(max_iter):
+        largest_change = 0.0
+        for i in range(len(x)):
+            c = cov_x[i] - diag[i] * x[i]
+            new = (-c + np.sqrt(c * c + 4 * diag[i] * budget)) / (2 * diag[i])
+            change = new - x[i]
+            cov_x += cov[:, i] * change
+            x[i] = new
+            largest_change = max(largest_change, abs(change) / new)
+        if largest_change <= tol:
+            break
+    return x
+
+
+def solve_erc(
+    cov: np.ndarray,
+    x0: Optional[np.ndarray] = None,
+    method: str = "auto",
+    tol: float = 1e-10,
+    max_iter: int = 500,
+) -> np.ndarray:
+    """
+    Equal Risk Contribution weights for a covariance matrix.
+
+    Solves the convex problem
+        min ½ x'Σx − (1/n) Σ ln(x_i),  x > 0
+    whose optimum has x_i (Σx)_i = 1/n for every i; normalized weights
+    w = x / Σx therefore have equal risk contributions w_i (Σw)_i.
+
+    method:
+        "newton" – damped Newton steps, O(n³) each, a handful of iterations;
+                   above NEWTON_MAX_ASSETS assets CCD sweeps bring it close
+                   first, so only one or two solves are left
+        "ccd"    – cyclical coordinate descent, O(n²) per sweep, no linear solves
+        "auto"   – Newton up to NEWTON_MAX_ASSETS assets, CCD above
+
+    x0 (any positive scale, e.g. inverse-MDD weights) warm-starts the solver.
+    Ill-conditioned matrices converge slowly: pass correlations through
+    nearest_correlation (which shrinks them) before building Σ.
+
+    Warns (RuntimeWarning) when a risk contribution is still more than
+    ERC_RESIDUAL_TOL away from 1/n after max_iter iterations.
+
+    Returns:
+        np.ndarray: weights summing to 1
+    """
+    cov = np.asarray(cov, dtype=np.float64)
+    n = len(cov)
+    if n == 0:
+        return np.empty(0)
+    budget = 1.0 / n
+    if method == "auto":
+        method = "newton" if n <= NEWTON_MAX_ASSETS else "ccd"
+
+    x = np.full(n, 1.0 / n) if x0 is None else np.asarray(x0, dtype=np.float64).copy()
+    # Best scale of the starting direction: argmin_s f(s·x)
+    x *= np.sqrt(1.0 / (x @ cov @ x))
+
+    if method == "newton":
+        if n > NEWTON_MAX_ASSETS:
+            x = _ccd_erc(cov, x, budget, np.sqrt(tol), max_iter)
+        x = _newton_erc(cov, x, budget, tol, max_iter)
+    elif method == "ccd":
+        x = _ccd_erc(cov, x, budget, tol, max_iter)
+    else:
+        raise ValueError(f"Unknown ERC solver method '{method}'. Use 'auto', 'newton' or 'ccd'.")
+
+    residual = np.max(np.abs(x * (cov @ x) - budget)) / budget
+    if not residual <= ERC_RESIDUAL_TOL:
+        warnings.warn(
+            f"ERC solver ({method}) did not converge in {max_iter} iterations: "
+            f"risk contributions are up to {residual:.2%} away from equal.",
+            RuntimeWarning,
+            stacklevel=2,
+        )
+
+    return x / x.sum()
+
+
+def apply_erc_by_covariance(
+    items,
+    mdd_attr: str,
+    inverse_attr: str,
+    target_attr: str,
+    correlation: Optional[np.ndarray] = None,
+) -> float:
     """
-    Apply ERC to assets within one asset class, then write the resulting
-    weighted class MDD back to the matching RiskClass.class_mdd.
+    Equal Risk Contribution with correlations.
+
+    Covariance = diag(|MDD|) · correlation · diag(|MDD|), so MDD stays the
+    risk unit and history only contributes the co-movement. With an identity
+    correlation the result equals apply_erc_by_mdd, which is also used as
+    the warm start.
+
+    Notes:
+        - correlation is aligned with items (n × n); None = identity.
+        - Items with missing / zero MDD get zero weight, as in apply_erc_by_mdd.
+        - Writes the same attributes as apply_erc_by_mdd.
+
+    Returns:
+        float: weighted portfolio MDD
+    """
+    items = list(items)
+    portfolio_mdd = apply_erc_by_mdd(items, mdd_attr, inverse_attr, target_attr)
+    if correlation is None:
+        return portfolio_mdd
+
+    start = np.array([getattr(item, target_attr) for item in items], dtype=np.float64)
+    active = start > 0
+    if active.sum() < 2:
+        return portfolio_mdd
+
+    mdd = np.abs(np.array([getattr(item, mdd_attr) for item in items], dtype=np.float64))[active]
+    corr = nearest_correlation(np.asarray(correlation)[np.ix_(active, active)])
+    weights = solve_erc(np.outer(mdd, mdd) * corr, x0=start[active])
+
+    active_items = [item for item, a in zip(items, active) if a]
+    for item, weight in zip(active_items, weights.tolist()):
+        setattr(item, target_attr, weight)
+
+    return float(weights @ mdd)
+
+
+def _asset_correlation(assets, correlation: Optional[pd.DataFrame]) -> Optional[np.ndarray]:
+    """Correlation block for the given assets by symbol (unknown pairs = NaN)."""
+    if correlation is None:
+        return None
+    symbols = [a.symbol for a in assets]
+    return correlation.reindex(index=symbols, columns=symbols).to_numpy(dtype=np.float64)
+
+
+def _class_correlation(assets, erc_risk_classes, correlation: Optional[pd.DataFrame]) -> Optional[np.ndarray]:
+    """
+    Correlation between class portfolios: with asset covariance Σ and class
+    composition A (class × asset, target_in_class), class covariance = A Σ Aᵀ.
+    """
+    if correlation is None or assets is None:
+        return None
+
+    erc_assets = [a for a in assets if a.asset_class in ERC_CLASSES]
+    mdd = np.abs(np.array([a.mdd or 0.0 for a in erc_assets], dtype=np.float64))
+    asset_cov = np.outer(mdd, mdd) * nearest_correlation(_asset_correlation(erc_assets, correlation))
+
+    composition = np.array([
+        [(a.target_in_class or 0.0) if a.asset_class == rc.name else 0.0 for a in erc_assets]
+        for rc in erc_risk_classes
+    ])
+    class_cov = composition @ asset_cov @ composition.T
+    vol = np.sqrt(np.diag(class_cov))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return class_cov / np.outer(vol, vol)
+
+
+def _replace_class(risk_classes: list[RiskClass], class_name: str, **changes) -> None:
+    """Swap the named RiskClass (frozen) in the list for an updated copy."""
+    for i, rc in enumerate(risk_classes):
+        if rc.name == class_name:
+            risk_classes[i] = replace(rc, **changes)
+            break
+
+
+def _check_method(method: str) -> None:
+    if method not in ERC_METHODS:
+        raise ValueError(f"erc_method='{method}' is not in ERC_METHODS={ERC_METHODS}")
+
+
+def apply_asset_class_erc(
+    assets,
+    risk_classes,
+    class_name: str,
+    method: str = "inverse_mdd",
+    correlation: Optional[pd.DataFrame] = None,
+) -> float:
+    """
+    Apply ERC to assets within one asset class, then replace the matching
+    RiskClass in risk_classes (a list) with a copy carrying the resulting
+    weighted class MDD.
+
+    method="covariance" uses the symbol × symbol return correlation
+    (e.g. price_history.return_correlation); symbols without history are
+    treated as uncorrelated.
 
     Writes:
         asset.mdd_inverse
         asset.target_in_class
-        risk_class.class_mdd
+        risk_classes[i] → copy with class_mdd
 
     Returns:
         float: weighted MDD of the class
@@ -94,57 +345,81 @@ def apply_asset_class_erc(assets, risk_classes, class_name: str) -> float:
         raise ValueError(
             f"asset_class='{class_name}' is not in ERC_CLASSES={ERC_CLASSES}"
         )
+    _check_method(method)
 
     class_assets = [a for a in assets if a.asset_class == class_name]
 
     # If class is missing, treat as empty instead of crashing
     if not class_assets:
-        for rc in risk_classes:
-            if rc.name == class_name:
-                rc.class_mdd = 0.0
-                break
+        _replace_class(risk_classes, class_name, class_mdd=0.0)
         return 0.0
 
-    class_mdd = apply_erc_by_mdd(
-        items=class_assets,
-        mdd_attr="mdd",
-        inverse_attr="mdd_inverse",
-        target_attr="target_in_class",
-    )
+    if method == "covariance":
+        class_mdd = apply_erc_by_covariance(
+            items=class_assets,
+            mdd_attr="mdd",
+            inverse_attr="mdd_inverse",
+            target_attr="target_in_class",
+            correlation=_asset_correlation(class_assets, correlation),
+        )
+    else:
+        class_mdd = apply_erc_by_mdd(
+            items=class_assets,
+            mdd_attr="mdd",
+            inverse_attr="mdd_inverse",
+            target_attr="target_in_class",
+        )
 
-    for rc in risk_classes:
-        if rc.name == class_name:
-            rc.class_mdd = class_mdd
-            break
+    _replace_class(risk_classes, class_name, class_mdd=class_mdd)
 
     return class_mdd
 
 
-def apply_risk_class_erc(risk_classes) -> float:
+def apply_risk_class_erc(
+    risk_classes,
+    method: str = "inverse_mdd",
+    assets=None,
+    correlation: Optional[pd.DataFrame] = None,
+) -> float:
     """
     Apply ERC across portfolio classes using dynamically computed class_mdd.
 
-    Writes:
-        risk_class.class_mdd_inverse
-        risk_class.class_target_weight
-        risk_class.class_mdd_contribution
+    method="covariance" derives class correlations from the asset correlation
+    and each class's target_in_class weights (run asset ERC first).
+
+    Replaces every ERC class in risk_classes (a list) with a copy carrying:
+        class_mdd_inverse
+        class_target_weight
+        class_mdd_contribution
     """
 
-    erc_risk_classes = [rc for rc in risk_classes if rc.name in ERC_CLASSES]
+    # RiskClass is frozen: the ERC helpers write to mutable working copies
+    erc_risk_classes = [SimpleNamespace(**asdict(rc)) for rc in risk_classes if rc.name in ERC_CLASSES]
 
     if not erc_risk_classes:
         raise ValueError("No ERC risk classes found.")
-
-    portfolio_mdd = apply_erc_by_mdd(
-        items=erc_risk_classes,
-        mdd_attr="class_mdd",
-        inverse_attr="class_mdd_inverse",
-        target_attr="class_target_weight",
-    )
+    _check_method(method)
+
+    if method == "covariance":
+        portfolio_mdd = apply_erc_by_covariance(
+            items=erc_risk_classes,
+            mdd_attr="class_mdd",
+            inverse_attr="class_mdd_inverse",
+            target_attr="class_target_weight",
+            correlation=_class_correlation(assets, erc_risk_classes, correlation),
+        )
+    else:
+        portfolio_mdd = apply_erc_by_mdd(
+            items=erc_risk_classes,
+            mdd_attr="class_mdd",
+            inverse_attr="class_mdd_inverse",
+            target_attr="class_target_weight",
+        )
 
     # --- calculate class risk contribution
     for rc in erc_risk_classes:
         rc.class_mdd_contribution = rc.class_target_weight * abs(rc.class_mdd)
+        _replace_class(risk_classes, rc.name, **vars(rc))
 
     return portfolio_mdd
 
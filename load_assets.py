@@ -1,7 +1,11 @@
 # load_assets.py
+from typing import Iterator, Optional
+
+import numpy as np
 import pandas as pd
-import streamlit as st
 from asset_data import AssetData
+from fx_engine import FxMatrix, SHEET_FX_BASE
+from sheet_cache import sheet_cache
 
 
 def parse_percent(value) -> float:
@@ -27,59 +31,312 @@ def parse_float(value) -> float:
         return 0.0
 
 
-def load_assets_from_google_sheet(sheet_url: str) -> list[AssetData]:
+# Sheet column → AssetData field
+TEXT_COLUMNS = {
+    "name": "name",
+    "symbol": "symbol",
+    "currency": "currency",
+    "class": "asset_class",
+}
+FLOAT_COLUMNS = {
+    "shares": "shares",
+    "price": "price",
+    "fx": "fx_rate",
+    "52w high": "high_52w",
+    "52w low": "low_52w",
+    "years low": "low_years",
+    "eps": "eps",
+    "dps": "dps",
+    "pe p25": "pe_p25",
+    "pe p75": "pe_p75",
+}
+PERCENT_COLUMNS = {
+    "assumed mdd": "mdd",
+}
+REQUIRED_COLUMNS = set(TEXT_COLUMNS) | set(FLOAT_COLUMNS) | set(PERCENT_COLUMNS)
+
+# Read when present (risk tree levels below class)
+OPTIONAL_TEXT_COLUMNS = {
+    "region": "region",
+    "sector": "sector",
+}
+OPTIONAL_FLOAT_COLUMNS = {
+    "lot": "lot_size",
+}
+
+
+def _to_float(text: pd.Series) -> pd.Series:
+    """Cast cleaned text to float64; invalid cells become NaN."""
+    try:
+        return text.astype("float64")               # Fast path: every cell is numeric
+    except (ValueError, TypeError):
+        return pd.to_numeric(text, errors="coerce").astype("float64")
+
+
+def parse_float_column(column: pd.Series, fill: Optional[float] = 0.0) -> tuple[pd.Series, pd.Series]:
+    """
+    Vectorized parse_float for a whole column.
+
+    Returns:
+        (values, failed): float64 values (fill for empty or invalid cells,
+        NaN when fill is None) and a bool mask of non-empty cells that
+        could not be parsed.
+    """
+    text = column.astype("string").str.strip().str.replace(",", "", regex=False)
+    values = _to_float(text)
+    failed = values.isna() & text.notna() & (text != "")
+    return values if fill is None else values.fillna(fill), failed
+
+
+def parse_percent_column(column: pd.Series, fill: Optional[float] = 0.0) -> tuple[pd.Series, pd.Series]:
+    """Vectorized parse_percent for a whole column ("12.5%" → 0.125)."""
+    raw = column.astype("string").str.strip().str.replace(",", "", regex=False)
+    is_percent = raw.str.endswith("%").fillna(False)
+    text = raw.where(~is_percent, raw.str[:-1].str.strip())
+    values = _to_float(text)
+    failed = values.isna() & raw.notna() & (raw != "")
+    values = values.where(~is_percent, values / 100.0)
+    return values if fill is None else values.fillna(fill), failed
+
+
+def parse_sheet_columns(
+    df: pd.DataFrame, fill: Optional[float] = 0.0,
+) -> tuple[dict[str, list], dict[str, list]]:
+    """
+    Parse a cleaned sheet DataFrame column-wise.
+
+    Returns:
+        (fields, failures): AssetData field → list of values, and each
+        sheet column → the raw cell values that could not be converted
+        (those cells, like empty ones, become fill; NaN when fill is None).
+    """
+    fields = {}
+    failures = {}
+
+    for col, field in TEXT_COLUMNS.items():
+        fields[field] = df[col].tolist()
+
+    for col, field in OPTIONAL_TEXT_COLUMNS.items():
+        if col in df:
+            fields[field] = [None if pd.isna(v) else v for v in df[col].tolist()]
+
+    parsers = [(FLOAT_COLUMNS, parse_float_column), (PERCENT_COLUMNS, parse_percent_column)]
+    for columns, parser in parsers:
+        for col, field in columns.items():
+            values, failed = parser(df[col], fill)
+            fields[field] = values.tolist()
+            if failed.any():
+                failures[col] = df[col][failed].tolist()
+
+    for col, field in OPTIONAL_FLOAT_COLUMNS.items():
+        if col in df:
+            values, failed = parse_float_column(df[col], fill)
+            fields[field] = values.tolist()
+            if failed.any():
+                failures[col] = df[col][failed].tolist()
+
+    return fields, failures
+
+
+def _assets_from_fields(fields: dict[str, list]) -> list[AssetData]:
+    names = list(fields)
+    return [
+        AssetData(**dict(zip(names, row)))
+        for row in zip(*(fields[name] for name in names))
+    ]
+
+
+def parse_assets_dataframe(df: pd.DataFrame) -> tuple[list[AssetData], dict[str, list]]:
+    """
+    Build AssetData objects column-wise from a cleaned sheet DataFrame.
+
+    Returns:
+        (assets, failures) as in parse_sheet_columns
+    """
+    fields, failures = parse_sheet_columns(df)
+    return _assets_from_fields(fields), failures
+
+
+class SheetLoadError(Exception):
+    """Sheet could not be downloaded or is missing required columns."""
+
+
+def _csv_export_url(sheet_url: str) -> str:
     # Adjust URL for CSV export
-    sheet_url = sheet_url.replace("/edit#gid=", "/gviz/tq?tqx=out:csv&gid=")
+    return sheet_url.replace("/edit#gid=", "/gviz/tq?tqx=out:csv&gid=")
+
+
+def sheet_revision(sheet_url: str) -> str:
+    """
+    Content digest of the sheet behind sheet_url.
+
+    Served from the sheet cache within its TTL.
+
+    Raises:
+        SheetLoadError
+    """
+    try:
+        return sheet_cache.get(_csv_export_url(sheet_url), dtype=str).digest
+    except Exception as e:
+        raise SheetLoadError(f"Failed to load Google Sheet: {e}") from e
+
+
+def read_assets_from_sheet(sheet_url: str) -> tuple[list[AssetData], dict[str, list]]:
+    """
+    Headless loader: download (cached), validate and parse the sheet.
 
-    # Load and clean data
+    Returns:
+        (assets, failures) as in parse_assets_dataframe
+
+    Raises:
+        SheetLoadError
+    """
+    sheet_url = _csv_export_url(sheet_url)
+
+    # Load and clean data (cached across reruns, revalidated after TTL)
+    # Every cell is read as text; numeric columns are parsed column-wise below
     try:
-        df = pd.read_csv(sheet_url)
+        df = sheet_cache.read_csv(sheet_url, dtype=str)
         df.columns = df.columns.str.strip().str.lower()
     except Exception as e:
-        st.error(f"❌ Failed to load Google Sheet: {e}")
-        st.stop()
+        raise SheetLoadError(f"Failed to load Google Sheet: {e}") from e
 
     # Validate columns
-    required_cols = {
-        "name", "symbol", "currency", "shares", "price", "fx", "class", "assumed mdd",
-        "52w high", "52w low", "years low", "eps", "dps", "pe p25", "pe p75"
-    }
-
-    missing = required_cols - set(df.columns)
-    if missing:
-        st.error(f"Missing columns in Google Sheet: {sorted(missing)}")
-        st.write("Loaded columns:", df.columns.tolist())
-        st.stop()
+    _check_columns(df.columns)
 
     # Create AssetData objects
-    assets = [
-        AssetData(
-            name=row["name"],
-            symbol=row["symbol"],
-            currency=row["currency"],
-            shares=parse_float(row["shares"]),
-            price=parse_float(row["price"]),
-            fx_rate=parse_float(row["fx"]),
-            asset_class=row["class"],
-            mdd=parse_percent(row["assumed mdd"]),
-            high_52w=parse_float(row["52w high"]),
-            low_52w=parse_float(row["52w low"]),
-            low_years=parse_float(row["years low"]),
-            eps=parse_float(row["eps"]),
-            dps=parse_float(row["dps"]),
-            pe_p25=parse_float(row["pe p25"]),
-            pe_p75=parse_float(row["pe p75"]),
+    return parse_assets_dataframe(df)
+
+
+def _check_columns(columns: pd.Index) -> None:
+    missing = REQUIRED_COLUMNS - set(columns)
+    if missing:
+        raise SheetLoadError(
+            f"Missing columns in Google Sheet: {sorted(missing)}. "
+            f"Loaded columns: {columns.tolist()}"
         )
-        for _, row in df.iterrows()
-    ]
 
-    return assets
 
+# --- Lot-level exports ---
+
+LOT_CHUNK_ROWS = 100_000
+MAX_FAILURE_SAMPLES = 100           # Unparsable cells kept per column when streaming
+
+# Summed over the lots of a position; every other field takes its first non-empty value
+SUMMED_LOT_FIELDS = ("shares",)
+
+# failures key for lots with neither symbol nor name (skipped)
+KEYLESS_LOTS = "symbol / name"
+
+
+def _read_chunks(source: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Text chunks with cleaned column names; columns are validated on the first one."""
+    try:
+        reader = pd.read_csv(source, dtype=str, chunksize=chunksize)
+        for i, chunk in enumerate(reader):
+            chunk.columns = chunk.columns.str.strip().str.lower()
+            if i == 0:
+                _check_columns(chunk.columns)
+            yield chunk
+    except SheetLoadError:
+        raise
+    except Exception as e:
+        raise SheetLoadError(f"Failed to load lot export: {e}") from e
+
+
+def _normalized(column: pd.Series) -> pd.Series:
+    return column.fillna("").astype(str).str.strip().str.upper()
+
+
+def _keep_failures(failures: dict[str, list], col: str, values: list) -> None:
+    kept = failures.setdefault(col, [])
+    kept.extend(values[:MAX_FAILURE_SAMPLES - len(kept)])
+
+
+def stream_assets_from_csv(
+    source: str, chunksize: int = LOT_CHUNK_ROWS,
+) -> tuple[list[AssetData], dict[str, list]]:
+    """
+    Loader for lot-level exports too large to hold in memory: read the CSV
+    in chunks of chunksize rows and aggregate lots into one AssetData per
+    symbol and currency as they arrive.
+
+    Lots are keyed on the trimmed, upper-cased symbol (the trimmed name
+    when the symbol is empty) and currency; the positions carry those
+    normalized symbol and currency values. Lots with neither symbol nor
+    name are skipped and listed, by CSV line, under failures[KEYLESS_LOTS].
+
+    Shares are summed over the lots; price, fx and every other field take
+    the first non-empty value among the position's lots (0.0 when every
+    lot is empty). Peak memory is one chunk plus one row per position,
+    whatever the file size. failures keeps at most MAX_FAILURE_SAMPLES
+    cells per column.
 
-def ensure_reserve_assets_per_currency(assets: list[AssetData]) -> list[AssetData]:
+    Raises:
+        SheetLoadError
     """
-    Ensure every currency has Bond and Cash.
-    Ensure Gold exists only in USD.
+    positions = None
+    failures: dict[str, list] = {}
+
+    for chunk in _read_chunks(_csv_export_url(source), chunksize):
+        symbol = _normalized(chunk["symbol"])
+        holding = symbol.where(symbol != "", chunk["name"].fillna("").astype(str).str.strip())
+        keyless = holding == ""
+        if keyless.any():
+            _keep_failures(failures, KEYLESS_LOTS, [f"line {i + 2}" for i in chunk.index[keyless]])
+            chunk, symbol, holding = chunk[~keyless], symbol[~keyless], holding[~keyless]
+
+        # Empty numeric cells stay NaN until after aggregation, so they never win first()
+        fields, chunk_failures = parse_sheet_columns(chunk, fill=None)
+        for col, values in chunk_failures.items():
+            _keep_failures(failures, col, values)
+
+        lots = pd.DataFrame(fields)
+        lots["symbol"] = symbol.to_numpy()
+        lots["currency"] = _normalized(chunk["currency"]).to_numpy()
+        lots["_holding"] = holding.to_numpy()
+        if positions is not None:
+            lots = pd.concat([positions.reset_index(), lots], ignore_index=True)
+        grouped = lots.groupby(["_holding", "currency"], sort=False)
+        positions = grouped.first()
+        summed = [f for f in SUMMED_LOT_FIELDS if f in positions]
+        positions[summed] = grouped[summed].sum()
+
+    if positions is None:
+        return [], failures
+
+    positions = positions.reset_index().drop(columns="_holding")
+    numeric = positions.select_dtypes("number").columns
+    positions[numeric] = positions[numeric].fillna(0.0)
+    fields = {
+        field: [None if field in OPTIONAL_TEXT_COLUMNS.values() and pd.isna(v) else v for v in positions[field].tolist()]
+        for field in positions.columns
+    }
+    return _assets_from_fields(fields), failures
+
+
+def lot_export_revision(source: str) -> str:
+    """
+    Cheap change token for a lot export: size and mtime for local files,
+    otherwise the ETag / Last-Modified of a conditional HEAD through the
+    sheet cache (nothing is downloaded while the server sends either).
+
+    Raises:
+        SheetLoadError
+    """
+    try:
+        return sheet_cache.revision(_csv_export_url(source))
+    except Exception as e:
+        raise SheetLoadError(f"Failed to load lot export: {e}") from e
+
+
+def build_reserve_assets(assets: list[AssetData], fx: Optional[FxMatrix] = None) -> list[AssetData]:
+    """
+    Return the reserve assets missing from the portfolio:
+    Bond and Cash for every currency, Gold only in USD.
+
+    Their Fx cells come from fx (built from the assets when not given),
+    so currencies quoted only through a cross still get a rate.
     """
 
     per_currency_reserves = {"Bond", "Cash"}
@@ -88,14 +345,18 @@ def ensure_reserve_assets_per_currency(assets: list[AssetData]) -> list[AssetDat
 
     existing_pairs = {(a.currency, a.asset_class) for a in assets}
 
-    fx_map = {a.currency: a.fx_rate for a in assets if a.currency and a.fx_rate > 0}
+    fx = fx if fx is not None else FxMatrix.from_assets(assets)
+
+    def sheet_fx(currency: str) -> float:
+        rate = fx.rate(currency, SHEET_FX_BASE)
+        return 1.0 if np.isnan(rate) else rate
 
     added_assets = []
 
     # Bond & Cash per currency
     for currency in currencies:
 
-        fx_rate = fx_map.get(currency, 1.0)
+        fx_rate = sheet_fx(currency)
 
         for reserve in per_currency_reserves:
 
@@ -123,7 +384,7 @@ def ensure_reserve_assets_per_currency(assets: list[AssetData]) -> list[AssetDat
                 )
 
     # Gold only in USD
-    usd_fx = fx_map.get("USD", 1.0)
+    usd_fx = sheet_fx("USD")
 
     if ("USD", "Gold") not in existing_pairs:
 
@@ -147,10 +408,4 @@ def ensure_reserve_assets_per_currency(assets: list[AssetData]) -> list[AssetDat
             )
         )
 
-    if added_assets:
-        st.caption(
-            "ℹ️ Auto-added reserve assets: "
-            + ", ".join(a.name for a in added_assets)
-        )
-
-    return assets + added_assets
+    return added_assets
@@ -0,0 +1,164 @@
+# load_test.py
+"""
+Concurrent-session load test for the portfolio pipeline.
+
+Usage:
+    python load_test.py --sessions 8 --runs 20 --rows 2000
+    python load_test.py --sheet portfolio.csv --shared-graph
+
+Every simulated session runs in its own thread and, like a Streamlit
+session, owns a StageGraph that it reruns with randomly changed
+preferences (--shared-graph makes all sessions share one graph instead).
+
+Checks:
+    isolation     each result equals the result of the same preferences
+                  computed alone in a fresh graph
+    immutability  each result is unchanged after every thread has finished
+
+Exit status is 1 when a check fails.
+"""
+import argparse
+import hashlib
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from benchmark import make_sheet_csv
+from fx_engine import FxRateError
+from load_assets import SheetLoadError
+from portfolio_pipeline import (
+    PipelineResult, ReserveAllocationError, build_portfolio_graph, run_portfolio_pipeline,
+)
+from user_preferences import UserPreference
+
+# Preference values the simulated users pick from (small, so reruns also hit the stage cache)
+PREFERENCE_CHOICES = {
+    "investment_weight": (0.40, 0.50, 0.60),
+    "gold_weight_reserve": (0.10, 0.20),
+    "years_rebound": (2, 3, 5),
+    "threshold_drift": (0.03, 0.05),
+}
+
+
+def result_fingerprint(result: PipelineResult) -> str:
+    """Digest of everything a session displays from one result."""
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(result.frame.to_dataframe(), index=False).to_numpy().tobytes())
+    for rc in result.risk_classes:
+        digest.update(repr((rc.name, rc.class_mdd, rc.class_target_weight)).encode())
+    for ccy in result.currencies:
+        digest.update(repr((ccy.name, ccy.currency_cash_weight, ccy.currency_bond_weight)).encode())
+    digest.update(repr((result.total_thb, result.target_portfolio_mdd, result.investment_portfolio_mdd)).encode())
+    return digest.hexdigest()
+
+
+def _outcome(graph, user_pref: UserPreference) -> tuple[str, object]:
+    """(fingerprint or error text, result)"""
+    try:
+        result = run_portfolio_pipeline(graph, user_pref)
+    except (SheetLoadError, ReserveAllocationError, FxRateError) as e:
+        return f"error: {e}", None
+    return result_fingerprint(result), result
+
+
+@dataclass
+class SessionLog:
+    runs: list = field(default_factory=list)        # (UserPreference, fingerprint, result)
+    latencies: list = field(default_factory=list)
+
+
+def _session(sheet_url: str, n_runs: int, seed: int, graph, barrier: threading.Barrier, log: SessionLog) -> None:
+    rng = random.Random(seed)
+    graph = graph or build_portfolio_graph()
+    barrier.wait()
+    for _ in range(n_runs):
+        user_pref = UserPreference(
+            sheet_url=sheet_url, **{name: rng.choice(values) for name, values in PREFERENCE_CHOICES.items()},
+        )
+        start = time.perf_counter()
+        fingerprint, result = _outcome(graph, user_pref)
+        log.latencies.append(time.perf_counter() - start)
+        log.runs.append((user_pref, fingerprint, result))
+
+
+def run_load_test(sheet_url: str, n_sessions: int, n_runs: int, shared_graph: bool = False, seed: int = 0) -> dict:
+    """Run the sessions concurrently, then verify every result serially."""
+    logs = [SessionLog() for _ in range(n_sessions)]
+    barrier = threading.Barrier(n_sessions)
+    graph = build_portfolio_graph() if shared_graph else None
+    threads = [
+        threading.Thread(target=_session, args=(sheet_url, n_runs, seed + i, graph, barrier, logs[i]))
+        for i in range(n_sessions)
+    ]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    # Reference: each distinct preference set computed alone
+    reference = {}
+    mismatches = mutated = 0
+    for log in logs:
+        for user_pref, fingerprint, result in log.runs:
+            key = repr(user_pref)
+            if key not in reference:
+                reference[key] = _outcome(build_portfolio_graph(), user_pref)[0]
+            mismatches += fingerprint != reference[key]
+            mutated += result is not None and result_fingerprint(result) != fingerprint
+
+    latencies = np.array([t for log in logs for t in log.latencies])
+    return {
+        "sessions": n_sessions,
+        "runs": len(latencies),
+        "seconds": elapsed,
+        "runs_per_second": len(latencies) / elapsed,
+        "latency_p50_ms": float(np.percentile(latencies, 50) * 1e3),
+        "latency_p95_ms": float(np.percentile(latencies, 95) * 1e3),
+        "latency_mean_ms": statistics.fmean(latencies) * 1e3,
+        "distinct_preferences": len(reference),
+        "isolation_failures": int(mismatches),
+        "mutated_results": int(mutated),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sheet", help="Sheet URL or CSV path (default: synthetic sheet of --rows assets).")
+    parser.add_argument("--rows", type=int, default=1_000)
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--runs", type=int, default=20, help="Reruns per session.")
+    parser.add_argument("--shared-graph", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    sheet_url, tmp_path = args.sheet, None
+    if sheet_url is None:
+        fd, tmp_path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(fd, "w") as f:
+            f.write(make_sheet_csv(args.rows, seed=args.seed))
+        sheet_url = tmp_path
+
+    try:
+        report = run_load_test(sheet_url, args.sessions, args.runs, args.shared_graph, args.seed)
+    finally:
+        if tmp_path:
+            os.remove(tmp_path)
+
+    for key, value in report.items():
+        print(f"{key:<22} {value:,.2f}" if isinstance(value, float) else f"{key:<22} {value:,}")
+    return 1 if report["isolation_failures"] or report["mutated_results"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+# market_data.py
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+
+from fx_engine import SHEET_FX_BASE
+from portfolio_frame import PortfolioFrame
+
+QUOTE_FIELDS = ("price", "eps", "dps")
+
+# Default time-to-live per field (seconds)
+DEFAULT_TTL = {
+    "price": 60.0,
+    "fx_rate": 300.0,
+    "eps": 86400.0,
+    "dps": 86400.0,
+}
+
+# Rows that are never quoted (auto-added reserve placeholders)
+UNQUOTED_CLASSES = ("Cash", "Bond")
+
+
+# --- Providers ---
+# A provider answers one symbol / pair at a time and may raise on transient errors.
+#     fetch_quote(symbol) -> {"price": .., "eps": .., "dps": ..}   (missing keys = no data)
+#     fetch_fx(currency, base) -> Optional[float]                 (units of base per 1 currency)
+
+class YFinanceProvider:
+    """Live quotes through yfinance (optional dependency, imported on first use)."""
+
+    def fetch_quote(self, symbol: str) -> dict:
+        import yfinance as yf
+
+        ticker = yf.Ticker(symbol)
+        info = ticker.info or {}
+        quote = {
+            "price": ticker.fast_info.get("last_price"),
+            "eps": info.get("trailingEps"),
+            "dps": info.get("trailingAnnualDividendRate"),
+        }
+        return {k: float(v) for k, v in quote.items() if v is not None}
+
+    def fetch_fx(self, currency: str, base: str) -> Optional[float]:
+        import yfinance as yf
+
+        rate = yf.Ticker(f"{currency}{base}=X").fast_info.get("last_price")
+        return float(rate) if rate else None
+
+
+class ReplayProvider:
+    """
+    Offline provider backed by a JSON file:
+        {"quotes": {"AAPL": {"price": 190.5, "eps": 6.1, "dps": 0.96}},
+         "fx": {"USDTHB": 35.2}}
+    """
+
+    def __init__(self, path: str):
+        with open(path) as f:
+            data = json.load(f)
+        self.quotes = data.get("quotes", {})
+        self.fx = data.get("fx", {})
+
+    def fetch_quote(self, symbol: str) -> dict:
+        return dict(self.quotes.get(symbol, {}))
+
+    def fetch_fx(self, currency: str, base: str) -> Optional[float]:
+        return self.fx.get(f"{currency}{base}")
+
+
+class RecordingProvider:
+    """Wraps another provider and records its answers in ReplayProvider format."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.quotes = {}
+        self.fx = {}
+        self._lock = threading.Lock()
+
+    def fetch_quote(self, symbol: str) -> dict:
+        quote = self.inner.fetch_quote(symbol)
+        with self._lock:
+            self.quotes[symbol] = quote
+        return quote
+
+    def fetch_fx(self, currency: str, base: str) -> Optional[float]:
+        rate = self.inner.fetch_fx(currency, base)
+        if rate is not None:
+            with self._lock:
+                self.fx[f"{currency}{base}"] = rate
+        return rate
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump({"quotes": self.quotes, "fx": self.fx}, f, indent=2, sort_keys=True)
+
+
+# --- Service ---
+
+class RateLimiter:
+    """Spaces calls at most rate_per_second apart across all threads."""
+
+    def __init__(self, rate_per_second: float, clock: Callable[[], float] = time.monotonic, sleep=time.sleep):
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self.clock = clock
+        self.sleep = sleep
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = self.clock()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            self.sleep(slot - now)
+
+
+class MarketDataService:
+    """
+    Concurrent, cached access to a provider.
+
+        - symbols / FX pairs are fetched in a thread pool
+        - calls are rate limited and retried with exponential backoff
+        - concurrent requests for the same symbol share one provider call
+        - every field is cached with its own TTL; a symbol is refetched only
+          when one of the requested fields is stale
+    """
+
+    def __init__(
+        self,
+        provider,
+        max_workers: int = 8,
+        rate_per_second: float = 10.0,
+        retries: int = 3,
+        backoff_seconds: float = 0.5,
+        ttl: Optional[dict[str, float]] = None,
+        clock: Callable[[], float] = time.time,
+        sleep=time.sleep,
+    ):
+        self.provider = provider
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.ttl = {**DEFAULT_TTL, **(ttl or {})}
+        self.clock = clock
+        self.sleep = sleep
+        self.limiter = RateLimiter(rate_per_second, sleep=sleep)
+
+        self._cache: dict[tuple, tuple[Optional[float], float]] = {}     # (key, field) → (value, fetched_at)
+        self._inflight: dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+        self.errors: dict[str, str] = {}                                    # Last failure per symbol / pair
+
+    @classmethod
+    def from_env(cls) -> Optional["MarketDataService"]:
+        """
+        MARKET_DATA_REPLAY=<file>     → replay provider
+        MARKET_DATA_PROVIDER=yfinance → live yfinance provider
+        Otherwise None (sheet values only).
+        """
+        replay_path = os.environ.get("MARKET_DATA_REPLAY")
+        if replay_path:
+            return cls(ReplayProvider(replay_path))
+        if os.environ.get("MARKET_DATA_PROVIDER") == "yfinance":
+            return cls(YFinanceProvider())
+        return None
+
+    def refresh_token(self) -> int:
+        """Changes once per shortest TTL; used to decide when to re-query."""
+        return int(self.clock() // min(self.ttl.values()))
+
+    # --- Public API ---
+
+    def get_quotes(self, symbols: Iterable[str], fields: Iterable[str] = QUOTE_FIELDS) -> dict[str, dict]:
+        fields = tuple(fields)
+        symbols = list(dict.fromkeys(symbols))
+        stale = [s for s in symbols if self._is_stale(("quote", s), fields)]
+
+        self._fetch_all(
+            [(("quote", s), s, lambda s=s: self.provider.fetch_quote(s)) for s in stale],
+            QUOTE_FIELDS,
+        )
+        return {s: self._cached_fields(("quote", s), fields) for s in symbols}
+
+    def get_fx_rates(self, currencies: Iterable[str], base: str = "THB") -> dict[str, Optional[float]]:
+        currencies = [c for c in dict.fromkeys(currencies) if c != base]
+        stale = [c for c in currencies if self._is_stale(("fx", c, base), ("fx_rate",))]
+
+        self._fetch_all(
+            [(("fx", c, base), f"{c}{base}", lambda c=c: {"fx_rate": self.provider.fetch_fx(c, base)}) for c in stale],
+            ("fx_rate",),
+        )
+        rates = {c: self._cached_fields(("fx", c, base), ("fx_rate",)).get("fx_rate") for c in currencies}
+        rates[base] = 1.0
+        return rates
+
+    # --- Internals ---
+
+    def _is_stale(self, key: tuple, fields: tuple) -> bool:
+        now = self.clock()
+        for field in fields:
+            cached = self._cache.get((key, field))
+            if cached is None or now - cached[1] >= self.ttl.get(field, 0.0):
+                return True
+        return False
+
+    def _cached_fields(self, key: tuple, fields: tuple) -> dict:
+        values = {field: self._cache.get((key, field), (None, 0.0))[0] for field in fields}
+        return {field: value for field, value in values.items() if value is not None}
+
+    def _fetch_all(self, jobs: list[tuple], fields: tuple) -> None:
+        if not jobs:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as pool:
+            list(pool.map(lambda job: self._fetch_one(*job, fields), jobs))
+
+    def _fetch_one(self, key: tuple, label: str, fetch: Callable[[], dict], fields: tuple) -> None:
+        try:
+            result = self._coalesced(key, lambda: self._with_retries(fetch))
+        except Exception as e:
+            self.errors[label] = str(e)
+            return
+
+        self.errors.pop(label, None)
+        fetched_at = self.clock()
+        with self._lock:
+            for field in fields:
+                # A missing field is cached as None so it is not re-queried before its TTL
+                self._cache[(key, field)] = (result.get(field), fetched_at)
+
+    def _coalesced(self, key: tuple, fn: Callable[[], dict]) -> dict:
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+
+        if not owner:
+            return future.result()
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def _with_retries(self, fetch: Callable[[], dict]) -> dict:
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            try:
+                return fetch()
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                self.sleep(self.backoff_seconds * 2 ** attempt)
+
+
+def apply_market_data(frame: PortfolioFrame, service: MarketDataService, base: str = SHEET_FX_BASE) -> PortfolioFrame:
+    """
+    Overwrite price / eps / dps / fx_rate with provider values where available.
+    Run before summarize_assets so values and weights use the fresh quotes.
+    """
+    symbols = frame.get("symbol")
+    has_symbol = np.array([isinstance(s, str) and s.strip() != "" for s in symbols], dtype=bool)
+    quoted = ~np.isin(frame.get("asset_class"), UNQUOTED_CLASSES) & has_symbol
+    quotes = service.get_quotes(symbols[quoted])
+
+    for field in QUOTE_FIELDS:
+        values = np.array([
+            quotes[s].get(field, np.nan) if q else np.nan
+            for s, q in zip(symbols, quoted)
+        ], dtype=np.float64)
+        frame.set_where(field, ~np.isnan(values), values)
+
+    currencies = np.array([(c or "").upper() for c in frame.get("currency")], dtype=object)
+    rates = service.get_fx_rates([c for c in set(currencies) if c], base=base)
+    fx = np.array([rates.get(c) if rates.get(c) is not None else np.nan for c in currencies], dtype=np.float64)
+    frame.set_where("fx_rate", ~np.isnan(fx), fx)
+    return frame
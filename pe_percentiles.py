@@ -0,0 +1,162 @@
+# pe_percentiles.py
+import bisect
+from collections import deque
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from portfolio_frame import PortfolioFrame
+from price_history import PriceHistoryStore, DAYS_PER_YEAR
+
+
+class RollingQuantile:
+    """
+    Sliding window of (day, value) pairs kept in arrival order plus a
+    sorted copy of the values, so quantiles are read in O(1) and each
+    new / evicted bar costs one binary search.
+    """
+
+    def __init__(self):
+        self._arrival = deque()
+        self._sorted = []
+
+    def __len__(self) -> int:
+        return len(self._sorted)
+
+    def load(self, days: np.ndarray, values: np.ndarray) -> None:
+        """Bulk initialize from day-ordered arrays (one sort instead of n inserts)."""
+        self._arrival = deque(zip(days.tolist(), values.tolist()))
+        self._sorted = np.sort(values).tolist()
+
+    def push(self, day: int, value: float) -> None:
+        self._arrival.append((day, value))
+        bisect.insort(self._sorted, value)
+
+    def evict_before(self, first_day: int) -> None:
+        while self._arrival and self._arrival[0][0] < first_day:
+            _, value = self._arrival.popleft()
+            del self._sorted[bisect.bisect_left(self._sorted, value)]
+
+    def quantile(self, q: float) -> float:
+        """Linear interpolation, same as np.quantile's default method."""
+        if not self._sorted:
+            return np.nan
+        position = q * (len(self._sorted) - 1)
+        lo = int(position)
+        hi = min(lo + 1, len(self._sorted) - 1)
+        return self._sorted[lo] + (self._sorted[hi] - self._sorted[lo]) * (position - lo)
+
+
+class PEPercentileEngine:
+    """
+    Rolling P/E quantiles per symbol from stored daily closes and trailing EPS.
+
+    Daily P/E = close / latest EPS on or before that day (bars with EPS <= 0
+    are skipped). One window per (symbol, years) is built on first use and
+    then only fed the bars appended since the previous call. New EPS bars
+    change the P/E of closes already in the window, so a symbol whose EPS
+    series changed since its window was built gets the window rebuilt.
+    """
+
+    def __init__(self, price_store: PriceHistoryStore, eps_store: PriceHistoryStore, min_bars: int = 20):
+        self.price_store = price_store
+        self.eps_store = eps_store
+        self.min_bars = min_bars
+        self._windows: dict[tuple[str, int], RollingQuantile] = {}
+        self._last_day: dict[tuple[str, int], int] = {}
+        self._eps_seen: dict[tuple[str, int], tuple] = {}
+
+    def revision(self) -> tuple:
+        return self.price_store.revision(), self.eps_store.revision()
+
+    @staticmethod
+    def _eps_token(eps_dates: np.ndarray) -> tuple:
+        """Changes whenever bars are appended to (or the file replaces) a symbol's EPS series."""
+        if len(eps_dates) == 0:
+            return (0,)
+        return len(eps_dates), int(eps_dates[0]), int(eps_dates[-1])
+
+    @staticmethod
+    def _daily_pe(eps_dates: np.ndarray, eps: np.ndarray, days: np.ndarray, closes: np.ndarray) -> np.ndarray:
+        if len(eps_dates) == 0:
+            return np.full(len(days), np.nan)
+
+        idx = np.searchsorted(eps_dates, days, side="right") - 1
+        trailing_eps = np.where(idx >= 0, eps[np.clip(idx, 0, None)], np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(trailing_eps > 0, closes / trailing_eps, np.nan)
+
+    def _update(self, symbol: str, years: int) -> RollingQuantile:
+        key = (symbol, years)
+        dates, closes = self.price_store.load(symbol)
+        eps_dates, eps = self.eps_store.load(symbol)
+        window = self._windows.get(key)
+        if window is not None and self._eps_seen[key] != self._eps_token(eps_dates):
+            window = None                   # EPS backfilled or revised: rebuild from the stored closes
+
+        if len(dates) == 0:
+            return window or RollingQuantile()
+
+        span = int(years * DAYS_PER_YEAR)
+        first_day = dates[-1] - span + 1
+
+        if window is None:
+            start = np.searchsorted(dates, first_day, side="left")
+        else:
+            start = np.searchsorted(dates, self._last_day[key], side="right")
+
+        days = np.asarray(dates[start:])
+        pe = self._daily_pe(eps_dates, eps, days, np.asarray(closes[start:]))
+        valid = ~np.isnan(pe)
+
+        if window is None:
+            window = self._windows[key] = RollingQuantile()
+            window.load(days[valid], pe[valid])
+        else:
+            for day, value in zip(days[valid].tolist(), pe[valid].tolist()):
+                window.push(day, value)
+
+        window.evict_before(first_day)
+        self._last_day[key] = int(dates[-1])
+        self._eps_seen[key] = self._eps_token(eps_dates)
+        return window
+
+    def percentiles(
+        self,
+        symbols: Iterable[str],
+        years: int,
+        quantiles: tuple[float, float] = (0.25, 0.75),
+    ) -> pd.DataFrame:
+        """
+        Returns:
+            DataFrame indexed by symbol: pe_p25, pe_p75, n_bars
+            (symbols with fewer than min_bars P/E bars are omitted)
+        """
+        rows = {}
+        for symbol in dict.fromkeys(symbols):
+            window = self._update(symbol, years)
+            if len(window) >= self.min_bars:
+                rows[symbol] = {
+                    "pe_p25": window.quantile(quantiles[0]),
+                    "pe_p75": window.quantile(quantiles[1]),
+                    "n_bars": len(window),
+                }
+        return pd.DataFrame.from_dict(rows, orient="index", columns=["pe_p25", "pe_p75", "n_bars"])
+
+
+def apply_pe_percentiles(frame: PortfolioFrame, engine: PEPercentileEngine, years_rebound: int) -> PortfolioFrame:
+    """
+    Overwrite pe_p25 / pe_p75 with history-derived percentiles for every
+    symbol with enough P/E history; sheet values are kept otherwise.
+    """
+    percentiles = engine.percentiles([s for s in frame.get("symbol") if s], years_rebound)
+    if percentiles.empty:
+        return frame
+
+    symbols = pd.Series(frame.get("symbol"))
+    has_history = symbols.isin(percentiles.index).to_numpy()
+    for field in ("pe_p25", "pe_p75"):
+        values = symbols.map(percentiles[field]).to_numpy(dtype=np.float64)
+        frame.set_where(field, has_history, values)
+    return frame
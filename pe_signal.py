@@ -1,5 +1,7 @@
 # pe_signal.py
+import numpy as np
 from asset_data import AssetData
+from portfolio_frame import PortfolioFrame
 from typing import List
 
 def assign_pe_signals(assets: List[AssetData]) -> None:
@@ -29,3 +31,31 @@ def assign_pe_signals(assets: List[AssetData]) -> None:
 
         else:
             asset.pe_signal = "-"
+
+
+def assign_pe_signals_frame(frame: PortfolioFrame) -> None:
+    """Vectorized assign_pe_signals over a PortfolioFrame."""
+    price = frame.get("price")
+    eps = frame.get("eps")
+    pe_p25 = frame.get("pe_p25")
+    pe_p75 = frame.get("pe_p75")
+
+    # --- Step 1: Calculate PE from EPS ---
+    has_pe = frame.present("eps") & (eps != 0) & frame.present("price")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frame.set("pe_ratio", price / eps, has_pe)
+    pe_ratio = frame.get("pe_ratio")
+
+    # --- Step 2: Assign Signal ---
+    no_pe = ~has_pe | (pe_ratio == 0)
+    no_data = ~no_pe & (
+        ~frame.present("pe_p25") | (pe_p25 == 0) |
+        ~frame.present("pe_p75") | (pe_p75 == 0)
+    )
+    rated = ~no_pe & ~no_data
+
+    frame.set("pe_signal", np.select(
+        [no_pe, no_data, rated & (pe_ratio < pe_p25), rated & (pe_ratio > pe_p75)],
+        [None, "no data", "undervalue", "overvalue"],
+        "-",
+    ))
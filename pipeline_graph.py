@@ -0,0 +1,120 @@
+# pipeline_graph.py
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional
+
+from profiling import NULL_PROFILER, Profiler
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    One named step of a pipeline.
+
+    func is called as func(inputs, **{dep: dep_result}) where inputs is the
+    object passed to StageGraph.run (e.g. UserPreference).
+
+    The stage is recomputed only when one of these changes:
+        - the value of a declared input attribute (params)
+        - the result version of an upstream stage (deps)
+        - the token returned by revision(inputs), for external data such as a sheet
+    """
+    name: str
+    func: Callable[..., Any]
+    deps: tuple[str, ...] = ()
+    params: tuple[str, ...] = ()
+    revision: Optional[Callable[[Any], Hashable]] = None
+
+
+@dataclass(frozen=True)
+class GraphRun:
+    """What one StageGraph.run() produced; indexable by stage name like a dict."""
+    results: dict[str, Any]
+    recomputed: tuple[str, ...]         # Stages recomputed by this run, in order
+
+    def __getitem__(self, name: str) -> Any:
+        return self.results[name]
+
+
+@dataclass
+class _StageCache:
+    key: Hashable
+    result: Any
+    version: int
+
+
+class StageGraph:
+    """
+    DAG of stages with a memoized result per stage.
+
+    Stage results are treated as read-only by downstream stages; a stage that
+    needs to modify upstream data must copy it first.
+
+    Revision checks and recomputed stages are timed as spans of the profiler
+    ("revision" / "stage" categories).
+
+    run() may be called from several threads: each run keys its stages on
+    the versions it used itself, only publishing a result takes a lock, and
+    what a run recomputed is reported in its own GraphRun.
+    """
+
+    def __init__(self, stages: list[Stage], profiler: Profiler = NULL_PROFILER):
+        self.profiler = profiler
+        self.stages = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage '{stage.name}'.")
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(
+                        f"Stage '{stage.name}' depends on '{dep}', which must be declared before it."
+                    )
+            self.stages[stage.name] = stage
+
+        self._cache: dict[str, _StageCache] = {}
+        self._publish_lock = threading.Lock()
+
+    def run(self, inputs: Any) -> GraphRun:
+        """Run every stage in declaration order, reusing unchanged results."""
+        results, versions, recomputed = {}, {}, []
+
+        for stage in self.stages.values():
+            revision = None
+            if stage.revision:
+                with self.profiler.span(stage.name, "revision"):
+                    revision = stage.revision(inputs)
+            key = (
+                tuple(getattr(inputs, p) for p in stage.params),
+                tuple(versions[d] for d in stage.deps),
+                revision,
+            )
+
+            cached = self._cache.get(stage.name)
+            if cached is None or cached.key != key:
+                with self.profiler.span(stage.name, "stage"):
+                    result = stage.func(inputs, **{d: results[d] for d in stage.deps})
+                with self._publish_lock:
+                    latest = self._cache.get(stage.name)
+                    cached = self._cache[stage.name] = _StageCache(key, result, latest.version + 1 if latest else 0)
+                recomputed.append(stage.name)
+
+            results[stage.name] = cached.result
+            versions[stage.name] = cached.version
+
+        return GraphRun(results, tuple(recomputed))
+
+    def version(self, name: str) -> Optional[int]:
+        """
+        Result version of a stage (None before its first run). Versions only
+        grow, so they can key caches of anything derived from the result.
+        """
+        cached = self._cache.get(name)
+        return cached.version if cached else None
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Forget one stage result (downstream stages follow on next run), or all."""
+        # Keep the version counters so dependents and version-keyed caches see a change
+        for stage_name in self.stages if name is None else (name,):
+            cached = self._cache.get(stage_name)
+            if cached is not None:
+                cached.key = None
@@ -0,0 +1,271 @@
+# portfolio_aggregate.py
+"""
+Household view over many portfolio sheets (accounts).
+
+Usage:
+    python portfolio_aggregate.py SHEET [SHEET ...] [--sheet-list FILE]
+        [--prefs prefs.json] [--out results] [--format csv|parquet]
+
+Every account keeps its own StageGraph (its own allocation and targets),
+but all graphs share one SymbolCache, one price history store and one
+market data service, so assumptions, price / P/E / yield signals, price
+history lookups and quotes / FX rates are computed or fetched once per
+symbol across the household. Cost grows with the number of distinct
+symbols; per-holding work is limited to valuation, allocation and the
+cache scatter.
+
+prefs.json is one preference set used for every account, e.g.
+    {"investment_weight": 0.6, "years_rebound": 3}
+"""
+import argparse
+import json
+import os
+from contextlib import ExitStack
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from fx_engine import FxRateError
+from load_assets import SheetLoadError
+from market_data import MarketDataService
+from pe_percentiles import PEPercentileEngine
+from portfolio_batch import write_tables
+from portfolio_pipeline import PipelineResult, ReserveAllocationError, build_portfolio_graph, run_portfolio_pipeline
+from pipeline_graph import StageGraph
+from price_history import PriceHistoryStore
+from profiling import NULL_PROFILER, Profiler
+from symbol_cache import SymbolCache
+from user_preferences import UserPreference
+
+# Per-row fields summed across accounts in the consolidated holdings
+SUMMED_FIELDS = ("shares", "value_thb", "target_thb", "drift_amount")
+
+# Per-symbol fields taken from the first account holding the symbol
+SYMBOL_FIELDS = ("name", "asset_class", "price", "price_signal", "pe_signal", "dividend_yield_signal")
+
+# Frame columns read for the consolidated views
+HOLDING_COLUMNS = (
+    "symbol", "currency", "target", "shares", "value_thb", "drift_amount",
+) + SYMBOL_FIELDS
+
+
+@dataclass(frozen=True)
+class AggregateResult:
+    accounts: dict[str, PipelineResult]     # Per-account pipeline results
+    errors: dict[str, str]                  # Accounts whose pipeline failed
+    summary: pd.DataFrame                   # One row per account
+    holdings: pd.DataFrame                  # Consolidated, one row per symbol and currency
+    exposure: pd.DataFrame                  # Value (THB) per holding (rows) and account (columns)
+    total_thb: float
+    current_portfolio_mdd: float            # Value-weighted over the accounts
+    target_portfolio_mdd: float
+
+
+def _holding_key(df: pd.DataFrame) -> pd.Series:
+    """Symbol, or name for rows without one (e.g. cash), so equal holdings line up across accounts."""
+    return df["symbol"].where(df["symbol"].fillna("") != "", df["name"])
+
+
+def account_holdings(name: str, result: PipelineResult) -> pd.DataFrame:
+    """Rows of one account with its target in THB and the consolidation key."""
+    df = result.frame.to_dataframe(HOLDING_COLUMNS)
+    df["account"] = name
+    df["holding"] = _holding_key(df)
+    df["currency"] = df["currency"].fillna("").str.upper()
+    df["target_thb"] = df["target"] * result.total_thb
+    return df
+
+
+def consolidate_holdings(accounts: dict[str, PipelineResult]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    (holdings, exposure) over every account.
+
+    holdings sums shares, value, target value and drift per holding and
+    currency; weights are of the household total. Signals come from the
+    first account holding the symbol (they agree whenever the accounts'
+    sheets agree on its inputs).
+    """
+    if not accounts:
+        return pd.DataFrame(), pd.DataFrame()
+
+    rows = pd.concat([account_holdings(name, result) for name, result in accounts.items()], ignore_index=True)
+    total_thb = sum(result.total_thb for result in accounts.values())
+    keys = ["holding", "currency"]
+
+    grouped = rows.groupby(keys, sort=False)
+    holdings = grouped[list(SUMMED_FIELDS)].sum(min_count=1)
+    holdings = grouped[list(SYMBOL_FIELDS)].first().join(holdings)
+    holdings["accounts"] = grouped["account"].nunique()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        holdings["weight"] = holdings["value_thb"].fillna(0.0) / total_thb if total_thb else 0.0
+        holdings["target"] = holdings["target_thb"].fillna(0.0) / total_thb if total_thb else 0.0
+    holdings = holdings.reset_index().sort_values("value_thb", ascending=False, ignore_index=True)
+
+    exposure = rows.pivot_table(
+        index=keys, columns="account", values="value_thb", aggfunc="sum", fill_value=0.0, sort=False,
+    )
+    exposure = exposure.reindex(columns=list(accounts))
+    exposure["total"] = exposure.sum(axis=1)
+    exposure = exposure.sort_values("total", ascending=False)
+    return holdings, exposure
+
+
+def summarize_accounts(accounts: dict[str, PipelineResult], errors: dict[str, str]) -> pd.DataFrame:
+    total_thb = sum(result.total_thb for result in accounts.values())
+    rows = []
+    for name, result in accounts.items():
+        position = pd.Series(result.frame.get("position_size"))
+        rows.append({
+            "account": name, "status": "ok", "error": None,
+            "total_thb": result.total_thb,
+            "weight": result.total_thb / total_thb if total_thb else 0.0,
+            "current_portfolio_mdd": result.current_portfolio_mdd,
+            "target_portfolio_mdd": result.target_portfolio_mdd,
+            "n_assets": len(result.frame),
+            "undersize": int((position == "undersize").sum()),
+            "oversize": int((position == "oversize").sum()),
+        })
+    rows += [{"account": name, "status": "error", "error": error} for name, error in errors.items()]
+    return pd.DataFrame(rows)
+
+
+class PortfolioAggregator:
+    """
+    Runs many accounts against shared data sources.
+
+    Graphs are kept per account between run() calls, so rerunning the
+    household only recomputes the stages whose sheet or preferences changed.
+    """
+
+    def __init__(
+        self,
+        price_store: Optional[PriceHistoryStore] = None,
+        market_data: Optional[MarketDataService] = None,
+        pe_engine: Optional[PEPercentileEngine] = None,
+        profiler: Profiler = NULL_PROFILER,
+        symbol_cache: Optional[SymbolCache] = None,
+    ):
+        self.price_store = price_store
+        self.market_data = market_data
+        self.pe_engine = pe_engine
+        self.profiler = profiler
+        self.symbol_cache = symbol_cache if symbol_cache is not None else SymbolCache()
+        self._graphs = {}
+
+    def graph(self, account: str) -> StageGraph:
+        graph = self._graphs.get(account)
+        if graph is None:
+            graph = self._graphs[account] = build_portfolio_graph(
+                self.price_store, self.market_data, self.pe_engine, self.profiler, self.symbol_cache,
+            )
+        return graph
+
+    def _stores(self) -> list[PriceHistoryStore]:
+        stores = [self.price_store]
+        if self.pe_engine is not None:
+            stores += [self.pe_engine.price_store, self.pe_engine.eps_store]
+        return list({id(s): s for s in stores if s is not None}.values())
+
+    def run(self, accounts: dict[str, UserPreference]) -> AggregateResult:
+        """Run every account (name → preferences) and consolidate the results."""
+        bases = {user_pref.base_currency.upper() for user_pref in accounts.values()}
+        if len(bases) > 1:
+            raise ValueError(f"Accounts must share one base currency to be consolidated, got {sorted(bases)}.")
+        for name in set(self._graphs) - set(accounts):
+            del self._graphs[name]
+
+        results, errors = {}, {}
+        with ExitStack() as stack:
+            # One store scan per run, not one per account and stage
+            for store in self._stores():
+                stack.enter_context(store.pinned_revision())
+            for name, user_pref in accounts.items():
+                try:
+                    with self.profiler.span(name, "account"):
+                        results[name] = run_portfolio_pipeline(self.graph(name), user_pref)
+                except (SheetLoadError, ReserveAllocationError, FxRateError) as e:
+                    errors[name] = str(e)
+
+        holdings, exposure = consolidate_holdings(results)
+        total_thb = sum(result.total_thb for result in results.values())
+
+        def weighted(field):
+            if not total_thb:
+                return 0.0
+            return sum(getattr(r, field) * r.total_thb for r in results.values()) / total_thb
+
+        return AggregateResult(
+            accounts=results,
+            errors=errors,
+            summary=summarize_accounts(results, errors),
+            holdings=holdings,
+            exposure=exposure,
+            total_thb=total_thb,
+            current_portfolio_mdd=weighted("current_portfolio_mdd"),
+            target_portfolio_mdd=weighted("target_portfolio_mdd"),
+        )
+
+
+def _account_names(sheets: list[str]) -> list[str]:
+    """File name without extension, made unique (sheet URLs fall back to their position)."""
+    names = []
+    for i, sheet in enumerate(sheets):
+        base = os.path.splitext(os.path.basename(sheet.split("?")[0]))[0] or f"account{i + 1}"
+        name, n = base, 2
+        while name in names:
+            name, n = f"{base}_{n}", n + 1
+        names.append(name)
+    return names
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sheets", nargs="*", help="CSV paths or Google Sheet CSV URLs, one per account")
+    parser.add_argument("--sheet-list", help="File with one sheet path/URL per line")
+    parser.add_argument("--prefs", help="JSON file with the preference set used for every account")
+    parser.add_argument("--out", default="results")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    args = parser.parse_args(argv)
+
+    sheets = list(args.sheets)
+    if args.sheet_list:
+        with open(args.sheet_list) as f:
+            sheets += [line.strip() for line in f if line.strip()]
+    if not sheets:
+        parser.error("no sheets given")
+
+    pref_set = {}
+    if args.prefs:
+        with open(args.prefs) as f:
+            pref_set = json.load(f)
+        if "risk_levels" in pref_set:
+            pref_set["risk_levels"] = tuple(pref_set["risk_levels"])
+
+    price_store = PriceHistoryStore.from_env()
+    aggregator = PortfolioAggregator(
+        price_store=price_store,
+        market_data=MarketDataService.from_env(),
+        pe_engine=PEPercentileEngine(price_store, price_store.companion("eps")) if price_store else None,
+    )
+    accounts = {
+        name: UserPreference(sheet_url=sheet, **pref_set)
+        for name, sheet in zip(_account_names(sheets), sheets)
+    }
+    result = aggregator.run(accounts)
+
+    tables = {"accounts": result.summary, "holdings": result.holdings, "exposure": result.exposure.reset_index()}
+    for path in write_tables(tables, args.out, args.format):
+        print(path)
+
+    stats = aggregator.symbol_cache.stats()
+    print(
+        f"{len(result.accounts)} accounts ({len(result.errors)} failed), "
+        f"{len(result.holdings)} holdings, total {result.total_thb:,.0f} THB; "
+        f"symbol cache {stats['misses']:,} computed / {stats['hits']:,} reused"
+    )
+
+
+if __name__ == "__main__":
+    main()
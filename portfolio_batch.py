@@ -0,0 +1,150 @@
+# portfolio_batch.py
+"""
+Headless batch runner: evaluate every sheet against every preference set
+in a process pool and write the results as CSV or Parquet tables.
+
+Usage:
+    python portfolio_batch.py SHEET [SHEET ...] [--sheet-list FILE]
+        [--prefs prefs.json] [--out results] [--format csv|parquet] [--workers N]
+
+prefs.json is a list of preference sets, e.g.
+    [{"name": "risk-off", "investment_weight": 0.4},
+     {"name": "risk-on", "investment_weight": 0.7, "gold_weight_reserve": 0.1}]
+Omitted fields use the UserPreference defaults.
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from itertools import repeat
+
+import pandas as pd
+
+from user_preferences import UserPreference
+from portfolio_pipeline import build_portfolio_graph, run_portfolio_pipeline
+
+TABLES = ("summary", "assets", "risk_classes", "currencies")
+
+
+def _pref_columns(user_pref: UserPreference) -> dict:
+    """Preference fields as flat table columns (tuples joined, e.g. 'asset_class > region')."""
+    return {
+        key: " > ".join(value) if isinstance(value, tuple) else value
+        for key, value in asdict(user_pref).items()
+    }
+
+
+def evaluate_sheet(sheet_url: str, pref_sets: list[dict]) -> dict[str, pd.DataFrame]:
+    """
+    Run the full pipeline for one sheet and every preference set.
+
+    All preference sets share one StageGraph, so the sheet is loaded and
+    valued once and only preference-dependent stages are recomputed.
+    """
+    graph = build_portfolio_graph()
+    tables = {name: [] for name in TABLES}
+
+    for pref_set in pref_sets:
+        pref_set = dict(pref_set)
+        pref_name = pref_set.pop("name", "default")
+        if "risk_levels" in pref_set:
+            pref_set["risk_levels"] = tuple(pref_set["risk_levels"])      # JSON list → hashable stage key
+        user_pref = UserPreference(sheet_url=sheet_url, **pref_set)
+        keys = {"sheet": sheet_url, "preference": pref_name}
+
+        try:
+            result = run_portfolio_pipeline(graph, user_pref)
+        except Exception as e:
+            # One bad sheet or preference set must not abort the batch
+            tables["summary"].append(pd.DataFrame([{
+                **keys, **_pref_columns(user_pref), "status": "error", "error": str(e),
+            }]))
+            continue
+
+        tables["summary"].append(pd.DataFrame([{
+            **keys, **_pref_columns(user_pref), "status": "ok", "error": None,
+            "total_thb": result.total_thb,
+            "current_portfolio_mdd": result.current_portfolio_mdd,
+            "target_portfolio_mdd": result.target_portfolio_mdd,
+            "n_assets": len(result.frame),
+        }]))
+        tables["assets"].append(result.frame.to_dataframe().assign(**keys))
+        tables["risk_classes"].append(
+            pd.DataFrame([asdict(rc) for rc in result.risk_classes]).assign(**keys)
+        )
+        tables["currencies"].append(
+            pd.DataFrame([asdict(ccy) for ccy in result.currencies]).assign(**keys)
+        )
+
+    return {
+        name: pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        for name, frames in tables.items()
+    }
+
+
+def run_batch(sheets: list[str], pref_sets: list[dict], workers: int = 1) -> dict[str, pd.DataFrame]:
+    """
+    Evaluate all sheets (one task per sheet) and concatenate the tables,
+    in sheet order whatever the number of workers.
+    """
+    outputs = []
+
+    if workers <= 1:
+        outputs = [evaluate_sheet(sheet, pref_sets) for sheet in sheets]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outputs = list(pool.map(evaluate_sheet, sheets, repeat(pref_sets)))
+
+    return {
+        name: pd.concat([out[name] for out in outputs], ignore_index=True)
+        for name in TABLES
+    }
+
+
+def write_tables(tables: dict[str, pd.DataFrame], out_dir: str, fmt: str = "csv") -> list[str]:
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for name, df in tables.items():
+        path = os.path.join(out_dir, f"{name}.{fmt}")
+        if fmt == "parquet":
+            df.to_parquet(path, index=False)
+        else:
+            df.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sheets", nargs="*", help="CSV paths or Google Sheet CSV URLs")
+    parser.add_argument("--sheet-list", help="File with one sheet path/URL per line")
+    parser.add_argument("--prefs", help="JSON file with a list of preference sets")
+    parser.add_argument("--out", default="results")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    sheets = list(args.sheets)
+    if args.sheet_list:
+        with open(args.sheet_list) as f:
+            sheets += [line.strip() for line in f if line.strip()]
+    if not sheets:
+        parser.error("no sheets given")
+
+    pref_sets = [{"name": "default"}]
+    if args.prefs:
+        with open(args.prefs) as f:
+            pref_sets = json.load(f)
+
+    tables = run_batch(sheets, pref_sets, workers=args.workers)
+    for path in write_tables(tables, args.out, args.format):
+        print(path)
+
+    summary = tables["summary"]
+    n_failed = int((summary["status"] != "ok").sum())
+    print(f"{len(summary)} runs, {n_failed} failed")
+
+
+if __name__ == "__main__":
+    main()
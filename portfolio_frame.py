@@ -0,0 +1,200 @@
+# portfolio_frame.py
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from asset_data import ASSET_FIELDS, INPUT_FIELDS, AssetData
+
+# AssetData fields holding labels instead of numbers
+TEXT_FIELDS = (
+    "name", "symbol", "currency", "asset_class", "region", "sector",
+    "position_size", "price_signal", "pe_signal", "dividend_yield_signal",
+)
+
+# Every other AssetData field is stored as a float64 column
+FLOAT_FIELDS = tuple(name for name in ASSET_FIELDS if name not in TEXT_FIELDS)
+
+# Investment classes evaluated by the signal stages
+INVESTMENT_CLASSES = ("Core", "Growth", "Speculative")
+
+
+class PortfolioFrame:
+    """
+    Columnar (struct-of-arrays) view of a list of AssetData.
+
+    Storage:
+        - one contiguous float64 array per numeric field
+        - one bool mask per numeric field (True = value present, False = None)
+        - one object array per text field (None = missing)
+
+    Missing numeric values also hold NaN so vectorized math never picks up
+    stale numbers.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.frozen = False
+        self._values = {name: np.full(size, np.nan) for name in FLOAT_FIELDS}
+        self._masks = {name: np.zeros(size, dtype=bool) for name in FLOAT_FIELDS}
+        self._text = {name: np.full(size, None, dtype=object) for name in TEXT_FIELDS}
+
+    def __len__(self) -> int:
+        return self.size
+
+    # --- Column access ---
+
+    def get(self, name: str) -> np.ndarray:
+        """Return the column array (NaN / None where missing)."""
+        if name in self._text:
+            return self._text[name]
+        return self._values[name]
+
+    def present(self, name: str) -> np.ndarray:
+        """Return the bool mask of rows where the field is not None."""
+        if name in self._text:
+            return np.array([v is not None for v in self._text[name]], dtype=bool)
+        return self._masks[name]
+
+    def set(self, name: str, values, mask: Optional[np.ndarray] = None) -> None:
+        """
+        Replace a whole column.
+
+        For numeric fields the mask defaults to "not NaN"; rows outside
+        the mask are stored as NaN.
+        """
+        self._check_writable()
+        if name in self._text:
+            column = np.empty(self.size, dtype=object)
+            column[:] = values
+            self._text[name] = column
+            return
+
+        column = np.array(values, dtype=np.float64, copy=True).reshape(self.size)
+        if mask is None:
+            mask = ~np.isnan(column)
+        else:
+            mask = np.asarray(mask, dtype=bool).copy()
+            column[~mask] = np.nan
+        self._values[name] = column
+        self._masks[name] = mask
+
+    def set_where(self, name: str, where: np.ndarray, values) -> None:
+        """Overwrite a numeric field only on rows in `where` (None elsewhere is kept)."""
+        self._check_writable()
+        column = self._values[name]
+        mask = self._masks[name]
+        values = np.broadcast_to(np.asarray(values, dtype=np.float64), column.shape)
+        column[where] = values[where]
+        mask[where] = ~np.isnan(values[where])
+
+    def assign_from(self, other: "PortfolioFrame", names: Iterable[str]) -> None:
+        """Copy whole columns from another frame with the same rows."""
+        self._check_writable()
+        if len(other) != self.size:
+            raise ValueError(f"Expected {self.size} rows, got {len(other)}.")
+        for name in names:
+            if name in self._text:
+                self._text[name] = other._text[name].copy()
+            else:
+                self._values[name] = other._values[name].copy()
+                self._masks[name] = other._masks[name].copy()
+
+    def freeze(self) -> "PortfolioFrame":
+        """
+        Make the frame read-only, arrays included, so it can be shared
+        between threads. copy() returns a writable frame.
+        """
+        for column in (*self._values.values(), *self._masks.values(), *self._text.values()):
+            column.flags.writeable = False
+        self.frozen = True
+        return self
+
+    def _check_writable(self) -> None:
+        if self.frozen:
+            raise ValueError("PortfolioFrame is frozen; copy() it before writing.")
+
+    def copy(self) -> "PortfolioFrame":
+        frame = PortfolioFrame.__new__(PortfolioFrame)
+        frame.size = self.size
+        frame.frozen = False
+        frame._values = {k: v.copy() for k, v in self._values.items()}
+        frame._masks = {k: v.copy() for k, v in self._masks.items()}
+        frame._text = {k: v.copy() for k, v in self._text.items()}
+        return frame
+
+    def take(self, rows: np.ndarray) -> "PortfolioFrame":
+        """New writable frame of the given rows (indices), in that order."""
+        frame = PortfolioFrame.__new__(PortfolioFrame)
+        frame.size = len(rows)
+        frame.frozen = False
+        frame._values = {k: v[rows] for k, v in self._values.items()}
+        frame._masks = {k: v[rows] for k, v in self._masks.items()}
+        frame._text = {k: v[rows] for k, v in self._text.items()}
+        return frame
+
+    # --- AssetData adapter ---
+
+    @classmethod
+    def from_assets(cls, assets: Iterable[AssetData]) -> "PortfolioFrame":
+        assets = list(assets)
+        frame = cls(len(assets))
+        frame.update_from(assets)
+        return frame
+
+    def update_from(self, assets: List[AssetData], names: Optional[Iterable[str]] = None) -> None:
+        """Reload the given fields (default: all) from AssetData objects."""
+        if len(assets) != self.size:
+            raise ValueError(f"Expected {self.size} assets, got {len(assets)}.")
+
+        for name in names or (FLOAT_FIELDS + TEXT_FIELDS):
+            raw = [getattr(a, name) for a in assets]
+            if name in self._text:
+                self.set(name, raw)
+            else:
+                mask = np.array([v is not None for v in raw], dtype=bool)
+                values = np.array([np.nan if v is None else v for v in raw], dtype=np.float64)
+                self.set(name, values, mask)
+
+    def write_back(self, assets: List[AssetData], names: Optional[Iterable[str]] = None) -> None:
+        """Copy the given fields (default: all) onto existing AssetData objects."""
+        if len(assets) != self.size:
+            raise ValueError(f"Expected {self.size} assets, got {len(assets)}.")
+
+        names = list(names or (FLOAT_FIELDS + TEXT_FIELDS))
+        for name in names:
+            if name not in INPUT_FIELDS:
+                for asset, value in zip(assets, self._column_as_python(name)):
+                    setattr(asset, name, value)
+
+        # Sheet inputs are frozen: swap in a new input record per asset
+        inputs = [name for name in names if name in INPUT_FIELDS]
+        if inputs:
+            columns = {name: self._column_as_python(name) for name in inputs}
+            for i, asset in enumerate(assets):
+                asset.input = asset.input._replace(**{name: columns[name][i] for name in inputs})
+
+    def to_assets(self) -> List[AssetData]:
+        """Materialize new AssetData objects for legacy callers."""
+        columns = {name: self._column_as_python(name) for name in FLOAT_FIELDS + TEXT_FIELDS}
+        return [
+            AssetData(**{name: columns[name][i] for name in columns})
+            for i in range(self.size)
+        ]
+
+    def to_dataframe(self, names: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Columns as a DataFrame named by AssetData field (NaN / None where missing)."""
+        names = list(names or ASSET_FIELDS)
+        return pd.DataFrame({name: self.get(name) for name in names})
+
+    def _column_as_python(self, name: str) -> list:
+        if name in self._text:
+            return self._text[name].tolist()
+        values = self._values[name].tolist()
+        mask = self._masks[name].tolist()
+        return [v if m else None for v, m in zip(values, mask)]
+
+    # --- Shared row selections ---
+
+    def investment_rows(self) -> np.ndarray:
+        return np.isin(self._text["asset_class"], INVESTMENT_CLASSES)
@@ -0,0 +1,297 @@
+# portfolio_history.py
+"""
+Local, append-only history of pipeline results.
+
+Every recorded run adds one Parquet file (zstd, dictionary-encoded text)
+per table, partitioned by UTC date:
+    <root>/runs/date=YYYY-MM-DD/<run_id>.parquet          totals, MDDs, preferences
+    <root>/assets/date=YYYY-MM-DD/<run_id>.parquet        every AssetData field, one row per asset
+    <root>/risk_classes/date=YYYY-MM-DD/<run_id>.parquet
+    <root>/currencies/date=YYYY-MM-DD/<run_id>.parquet
+
+Every row carries run_id, timestamp and portfolio (the sheet URL, or an
+account name), so queries filter on them without joins. A query reads
+only the requested columns, and only the date partitions in its range.
+Runs also store a content digest, so a result identical to the last one
+recorded for its portfolio is not recorded again (append_if_changed).
+
+Usage:
+    python portfolio_history.py runs --start 2026-01-01 --end 2026-02-01
+    python portfolio_history.py compact          # merge each day's run files into one
+Store location: --root, or the PORTFOLIO_HISTORY_DIR environment variable.
+"""
+import argparse
+import hashlib
+import json
+import os
+import uuid
+from dataclasses import asdict, fields as dataclass_fields
+from datetime import date, datetime, timezone
+from typing import Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from asset_data import ASSET_FIELDS
+from class_portfolio import RiskClass
+from currency_portfolio import Currency
+from portfolio_frame import TEXT_FIELDS
+from portfolio_pipeline import PipelineResult
+from user_preferences import UserPreference
+
+TimePoint = Union[str, date, datetime, pd.Timestamp]
+
+# Columns shared by every table
+KEY_SCHEMA = pa.schema([
+    ("run_id", pa.string()),
+    ("timestamp", pa.timestamp("us", tz="UTC")),
+    ("portfolio", pa.string()),
+])
+
+
+def _record_schema(names: Iterable[str], text: Iterable[str]) -> pa.Schema:
+    text = set(text)
+    return pa.schema([(name, pa.string() if name in text else pa.float64()) for name in names])
+
+
+RUN_FIELDS = ("total_thb", "current_portfolio_mdd", "investment_portfolio_mdd", "target_portfolio_mdd", "n_assets")
+
+# Written schema of each table; files of older runs missing a column read as null
+TABLE_SCHEMAS = {
+    "assets": _record_schema(ASSET_FIELDS, TEXT_FIELDS),
+    "risk_classes": _record_schema([f.name for f in dataclass_fields(RiskClass)], ["name"]),
+    "currencies": _record_schema([f.name for f in dataclass_fields(Currency)], ["name"]),
+    "runs": _record_schema(                     # Preferences as JSON
+        RUN_FIELDS + ("preferences", "content_digest"), ["preferences", "content_digest"],
+    ),
+}
+TABLE_SCHEMAS = {name: pa.unify_schemas([KEY_SCHEMA, schema]) for name, schema in TABLE_SCHEMAS.items()}
+
+# runs last: a run is visible to readers of the runs table only once complete
+TABLES = ("assets", "risk_classes", "currencies", "runs")
+
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+
+
+def _utc(value: TimePoint) -> pd.Timestamp:
+    """Timestamp in UTC (naive values and plain dates are taken as UTC)."""
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+
+def _scalar(ts: pd.Timestamp) -> pa.Scalar:
+    return pa.scalar(ts.to_pydatetime(), KEY_SCHEMA.field("timestamp").type)
+
+
+def content_digest(result: PipelineResult, source_revision: str = "") -> str:
+    """
+    Digest of what a run shows: the source revision (see
+    portfolio_pipeline.source_revision) plus every asset's name, symbol,
+    weight and target.
+    """
+    digest = hashlib.sha256(str(source_revision).encode())
+    for field in ("name", "symbol"):
+        digest.update("\x1f".join(value or "" for value in result.frame.get(field)).encode())
+    for field in ("weight", "target"):
+        digest.update(np.ascontiguousarray(result.frame.get(field), dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+class PortfolioHistory:
+    def __init__(self, root: str):
+        self.root = root
+        self._last_digests: tuple[tuple, dict[str, Optional[str]]] = ((), {})     # (revision, portfolio → digest)
+        os.makedirs(root, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> Optional["PortfolioHistory"]:
+        """Store at $PORTFOLIO_HISTORY_DIR, or None when it is not configured."""
+        root = os.environ.get("PORTFOLIO_HISTORY_DIR")
+        return cls(root) if root else None
+
+    def revision(self) -> tuple:
+        """Cheap token that changes whenever a run is recorded or a day is compacted."""
+        path = os.path.join(self.root, "runs")
+        if not os.path.isdir(path):
+            return ()
+        return tuple(sorted((entry.name, entry.stat().st_mtime_ns) for entry in os.scandir(path)))
+
+    # --- Write ---
+
+    def append(
+        self,
+        result: PipelineResult,
+        user_pref: UserPreference,
+        portfolio: Optional[str] = None,
+        timestamp: Optional[datetime] = None,
+        digest: Optional[str] = None,
+    ) -> str:
+        """Record one pipeline result; returns its run_id."""
+        timestamp = _utc(timestamp or datetime.now(timezone.utc))
+        run_id = f"{timestamp:%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+        keys = {"run_id": run_id, "timestamp": timestamp, "portfolio": portfolio or user_pref.sheet_url}
+
+        frames = {
+            "assets": result.frame.to_dataframe(),
+            "risk_classes": pd.DataFrame(
+                [asdict(rc) for rc in result.risk_classes], columns=[f.name for f in dataclass_fields(RiskClass)],
+            ),
+            "currencies": pd.DataFrame(
+                [asdict(ccy) for ccy in result.currencies], columns=[f.name for f in dataclass_fields(Currency)],
+            ),
+            "runs": pd.DataFrame([{
+                "total_thb": result.total_thb,
+                "current_portfolio_mdd": result.current_portfolio_mdd,
+                "investment_portfolio_mdd": result.investment_portfolio_mdd,
+                "target_portfolio_mdd": result.target_portfolio_mdd,
+                "n_assets": len(result.frame),
+                "preferences": json.dumps(asdict(user_pref)),
+                "content_digest": digest,
+            }]),
+        }
+        for table in TABLES:
+            df = frames[table].assign(**keys)
+            self._write(table, timestamp.date().isoformat(), run_id,
+                        pa.Table.from_pandas(df, schema=TABLE_SCHEMAS[table], preserve_index=False))
+        return run_id
+
+    def append_if_changed(
+        self,
+        result: PipelineResult,
+        user_pref: UserPreference,
+        source_revision: str = "",
+        portfolio: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Record the result unless the last run recorded for its portfolio has
+        the same content_digest (e.g. another session already recorded it).
+        Returns the new run_id, or None when nothing was recorded.
+        """
+        portfolio = portfolio or user_pref.sheet_url
+        digest = content_digest(result, source_revision)
+        if self.last_digest(portfolio) == digest:
+            return None
+        return self.append(result, user_pref, portfolio=portfolio, digest=digest)
+
+    def last_digest(self, portfolio: str) -> Optional[str]:
+        """content_digest of the last run recorded for portfolio (cached until the next write)."""
+        revision = self.revision()
+        cached_revision, digests = self._last_digests
+        if cached_revision != revision:
+            digests = {}
+            self._last_digests = (revision, digests)
+        if portfolio not in digests:
+            runs = self.query("runs", columns=["content_digest"], portfolio=portfolio)
+            digests[portfolio] = runs["content_digest"].iloc[-1] if len(runs) else None
+        return digests[portfolio]
+
+    def _write(self, table: str, day: str, name: str, data: pa.Table) -> None:
+        directory = os.path.join(self.root, table, f"date={day}")
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = os.path.join(directory, f".{name}.tmp")      # Hidden from readers until renamed
+        pq.write_table(data, tmp_path, compression="zstd")
+        os.replace(tmp_path, os.path.join(directory, f"{name}.parquet"))
+
+    def compact(self, tables: Iterable[str] = TABLES) -> int:
+        """
+        Merge each date partition into a single file. Returns the number of
+        files removed. Readers running meanwhile may briefly see a day twice.
+        """
+        removed = 0
+        for table in tables:
+            table_dir = os.path.join(self.root, table)
+            if not os.path.isdir(table_dir):
+                continue
+            for partition in sorted(os.listdir(table_dir)):
+                directory = os.path.join(table_dir, partition)
+                parts = sorted(f for f in os.listdir(directory) if f.endswith(".parquet"))
+                if len(parts) < 2:
+                    continue
+                merged = ds.dataset(
+                    [os.path.join(directory, f) for f in parts], schema=TABLE_SCHEMAS[table], format="parquet",
+                ).to_table()
+                self._write(table, partition[len("date="):], f"compacted-{uuid.uuid4().hex[:8]}",
+                            merged.sort_by("timestamp"))
+                for f in parts:
+                    os.remove(os.path.join(directory, f))
+                removed += len(parts) - 1
+        return removed
+
+    # --- Read ---
+
+    def query(
+        self,
+        table: str,
+        start: Optional[TimePoint] = None,
+        end: Optional[TimePoint] = None,
+        columns: Optional[Iterable[str]] = None,
+        portfolio: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """
+        Rows of one table recorded in [start, end), oldest first, optionally
+        of one portfolio. Only the given columns (default: all) are read.
+        """
+        schema = TABLE_SCHEMAS[table]
+        columns = list(columns or schema.names)
+        path = os.path.join(self.root, table)
+        if not os.path.isdir(path):
+            return schema.empty_table().select(columns).to_pandas()
+
+        dataset = ds.dataset(
+            path, format="parquet", partitioning=PARTITIONING,
+            schema=schema.append(pa.field("date", pa.string())),
+        )
+        condition = ds.scalar(True)
+        if start is not None:
+            start = _utc(start)
+            condition &= (ds.field("date") >= start.date().isoformat()) & (ds.field("timestamp") >= _scalar(start))
+        if end is not None:
+            end = _utc(end)
+            condition &= (ds.field("date") <= end.date().isoformat()) & (ds.field("timestamp") < _scalar(end))
+        if portfolio is not None:
+            condition &= ds.field("portfolio") == portfolio
+
+        scanned = dataset.to_table(columns=sorted(set(columns) | {"timestamp"}), filter=condition)
+        df = scanned.sort_by("timestamp").to_pandas()
+        return df[columns]
+
+    def runs(self, start=None, end=None, portfolio=None) -> pd.DataFrame:
+        return self.query("runs", start, end, portfolio=portfolio)
+
+    def asset_history(
+        self,
+        fields: Iterable[str] = ("weight", "target", "drift"),
+        start: Optional[TimePoint] = None,
+        end: Optional[TimePoint] = None,
+        portfolio: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """Long table of timestamp, run_id, name, symbol plus fields: one row per asset and run."""
+        return self.query(
+            "assets", start, end, columns=["timestamp", "run_id", "name", "symbol", *fields], portfolio=portfolio,
+        )
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", default=os.environ.get("PORTFOLIO_HISTORY_DIR", "portfolio_history"))
+    sub = parser.add_subparsers(dest="command", required=True)
+    runs_cmd = sub.add_parser("runs")
+    runs_cmd.add_argument("--start")
+    runs_cmd.add_argument("--end")
+    runs_cmd.add_argument("--portfolio")
+    sub.add_parser("compact")
+    args = parser.parse_args(argv)
+
+    history = PortfolioHistory(args.root)
+    if args.command == "compact":
+        print(f"{history.compact()} files merged away")
+    else:
+        runs = history.runs(args.start, args.end, args.portfolio)
+        print(runs.drop(columns=["preferences", "content_digest"]).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
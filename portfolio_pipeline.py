@@ -0,0 +1,353 @@
+# portfolio_pipeline.py
+from dataclasses import dataclass
+from functools import partial
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+from asset_data import AssetData
+from class_portfolio import RiskClass, ERC_CLASSES, new_risk_classes
+from currency_portfolio import Currency
+from fx_engine import FxMatrix
+from user_preferences import UserPreference
+from pipeline_graph import Stage, StageGraph
+from profiling import NULL_PROFILER, Profiler
+from portfolio_frame import PortfolioFrame
+from price_history import PriceHistoryStore, apply_price_history, return_correlation
+from market_data import MarketDataService, apply_market_data
+from pe_percentiles import PEPercentileEngine, apply_pe_percentiles
+from risk_tree import RiskTree, build_risk_tree, apply_risk_tree
+from symbol_cache import SymbolCache
+
+from load_assets import (
+    read_assets_from_sheet, build_reserve_assets, sheet_revision, stream_assets_from_csv, lot_export_revision,
+)
+from portfolio_value import summarize_assets_frame, calculate_portfolio_total_frame, assign_weights_frame
+from assumption import calculate_assumptions_frame
+from investment_allocation import apply_asset_class_erc, apply_risk_class_erc, apply_final_asset_targets
+from reserve_allocation import calculate_reserve_weights, build_currency_portfolio, assign_reserve_asset_targets
+
+from position_size import assign_position_sizes_frame
+from price_signal import assign_price_signals_frame
+from pe_signal import assign_pe_signals_frame
+from yield_signal import assign_yield_signals_frame
+
+# AssetData fields written by each stage
+ASSUMPTION_FIELDS = ("rebound", "cagr", "dividend_yield_offset")
+ALLOCATION_FIELDS = ("mdd_inverse", "target_in_class", "target", "mdd_contribution")
+POSITION_FIELDS = ("drift", "drift_relative", "drift_amount", "position_size")
+PRICE_SIGNAL_FIELDS = (
+    "high_52w", "low_52w", "low_years",
+    "drop_52w", "gain_52w", "gain_years", "calmar_ratio", "price_signal",
+)
+PE_SIGNAL_FIELDS = ("pe_p25", "pe_p75", "pe_ratio", "pe_signal")
+YIELD_SIGNAL_FIELDS = ("dividend_yield", "dividend_yield_signal")
+
+# Row fields read by each row-wise stage (the SymbolCache key)
+ASSUMPTION_INPUTS = ("mdd",)
+PRICE_SIGNAL_INPUTS = (
+    "symbol", "asset_class", "price", "high_52w", "low_52w", "low_years", "mdd", "rebound", "cagr",
+)
+PE_SIGNAL_INPUTS = ("symbol", "price", "eps", "pe_p25", "pe_p75")
+YIELD_SIGNAL_INPUTS = ("asset_class", "price", "dps", "dividend_yield_offset")
+
+# Return history used for the correlations of erc_method="covariance"
+ERC_CORRELATION_YEARS = 3
+
+
+class ReserveAllocationError(ValueError):
+    """Reserve portfolio cannot cover cash and gold for the chosen investment weight."""
+
+
+@dataclass(frozen=True)
+class PipelineResult:
+    """
+    Output of one pipeline run. Built from objects created for that run
+    only, with a read-only frame, frozen records and tuples / read-only
+    mappings in place of lists and dicts, so results can be shared between
+    threads and sessions without locks.
+    """
+    frame: PortfolioFrame               # Frozen (read-only arrays)
+    risk_classes: tuple[RiskClass, ...]
+    currencies: tuple[Currency, ...]
+    added_reserves: tuple[str, ...]     # Names of auto-added Bond / Cash / Gold assets
+    parse_failures: Mapping[str, tuple]     # Sheet cells that could not be parsed, per column (read-only)
+    total_thb: float
+    current_portfolio_mdd: float
+    investment_portfolio_mdd: float
+    target_portfolio_mdd: float
+    risk_tree: Optional[RiskTree] = None    # Every level of the inverse-MDD hierarchy
+    fx: Optional[FxMatrix] = None           # Cross rates of every sheet currency
+    base_currency: str = "THB"              # Currency of value_thb / total_thb
+
+    @property
+    def assets(self) -> tuple[AssetData, ...]:
+        """AssetData rows of frame, built fresh on each access (the caller owns the copies)."""
+        return tuple(self.frame.to_assets())
+
+
+# --- Stages ---
+# Each stage copies the upstream frame before writing, so cached results stay valid.
+
+def source_revision(user_pref) -> str:
+    """Change token of the sheet or lot export behind user_pref."""
+    if user_pref.lot_export:
+        return lot_export_revision(user_pref.sheet_url)
+    return sheet_revision(user_pref.sheet_url)
+
+
+def _row_wise(frame, compute, symbol_cache, table, inputs, outputs):
+    """compute(frame), or through the shared SymbolCache when there is one."""
+    if symbol_cache is None:
+        compute(frame)
+        return frame
+    return symbol_cache.apply(frame, table, inputs, outputs, compute)
+
+
+def _load(user_pref):
+    if user_pref.lot_export:
+        assets, failures = stream_assets_from_csv(user_pref.sheet_url)
+    else:
+        assets, failures = read_assets_from_sheet(user_pref.sheet_url)
+    added_assets = build_reserve_assets(assets)
+    return {
+        "frame": PortfolioFrame.from_assets(assets + added_assets),
+        "added_reserves": tuple(a.name for a in added_assets),
+        "parse_failures": MappingProxyType({col: tuple(values) for col, values in failures.items()}),
+    }
+
+
+def _market(user_pref, load, market_data=None):
+    """Refresh price / fx / EPS / DPS from the market data provider, if any."""
+    if market_data is None:
+        return load["frame"]
+    frame = load["frame"].copy()
+    apply_market_data(frame, market_data)
+    return frame
+
+
+def _fx(user_pref, market):
+    """Rate matrix over the sheet's (or refreshed) Fx column, crosses triangulated once."""
+    return FxMatrix.from_frame(market)
+
+
+def _valuation(user_pref, market, fx):
+    frame = market.copy()
+    summarize_assets_frame(frame, fx, user_pref.base_currency)
+    total_thb = calculate_portfolio_total_frame(frame)
+    current_portfolio_mdd = assign_weights_frame(frame, total_thb)
+    return {"frame": frame, "total_thb": total_thb, "current_portfolio_mdd": current_portfolio_mdd}
+
+
+def _assumptions(user_pref, valuation, symbol_cache=None):
+    return _row_wise(
+        valuation["frame"].copy(), partial(calculate_assumptions_frame, user_pref=user_pref),
+        symbol_cache, ("assumptions", user_pref.years_rebound, user_pref.years_dividend),
+        ASSUMPTION_INPUTS, ASSUMPTION_FIELDS,
+    )
+
+
+def _investment_erc(user_pref, valuation, price_store=None):
+    """
+    Asset ERC inside each class, then class ERC using dynamic class_mdd.
+
+    Inverse-MDD runs over the whole risk tree (user_pref.risk_levels) in one
+    pass; covariance ERC uses the class → asset hierarchy.
+    """
+    method = user_pref.erc_method
+    if method == "inverse_mdd":
+        tree = build_risk_tree(valuation["frame"], user_pref.risk_levels)
+        frame = valuation["frame"].copy()
+        apply_risk_tree(frame, tree)
+        return {
+            "frame": frame, "risk_classes": tree.risk_classes(),
+            "investment_portfolio_mdd": tree.portfolio_mdd, "risk_tree": tree,
+        }
+
+    assets = valuation["frame"].to_assets()
+    risk_classes = new_risk_classes()
+
+    correlation = None
+    if price_store is not None:
+        symbols = [a.symbol for a in assets if a.asset_class in ERC_CLASSES and a.symbol]
+        correlation = return_correlation(price_store, symbols, ERC_CORRELATION_YEARS)
+
+    for class_name in ERC_CLASSES:
+        apply_asset_class_erc(assets, risk_classes, class_name, method=method, correlation=correlation)
+    investment_portfolio_mdd = apply_risk_class_erc(risk_classes, method=method, assets=assets, correlation=correlation)
+
+    frame = valuation["frame"].copy()
+    frame.update_from(assets, ALLOCATION_FIELDS)
+    return {"frame": frame, "risk_classes": risk_classes, "investment_portfolio_mdd": investment_portfolio_mdd}
+
+
+def _allocation(user_pref, investment_erc):
+    """Final investment targets plus Cash / Bond / Gold reserve targets."""
+    assets = investment_erc["frame"].to_assets()
+    investment_portfolio_mdd = investment_erc["investment_portfolio_mdd"]
+
+    apply_final_asset_targets(assets, investment_erc["risk_classes"], user_pref.investment_weight)
+
+    cash_weight = user_pref.investment_weight * investment_portfolio_mdd
+    bond_weight_total, gold_weight = calculate_reserve_weights(cash_weight=cash_weight, user_pref=user_pref)
+
+    # If gold also becomes negative, reserve is insufficient
+    if gold_weight < 0:
+        raise ReserveAllocationError(
+            "Reserve allocation is insufficient. Please lower Investment Portfolio (%) setting."
+        )
+
+    currencies, _ = build_currency_portfolio(assets=assets, bond_weight_total=bond_weight_total)
+    assign_reserve_asset_targets(assets, currencies, gold_weight)
+
+    frame = investment_erc["frame"].copy()
+    frame.update_from(assets, ALLOCATION_FIELDS)
+    return {
+        "frame": frame,
+        "currencies": currencies,
+        "target_portfolio_mdd": user_pref.investment_weight * investment_portfolio_mdd,
+    }
+
+
+def _positions(user_pref, valuation, allocation):
+    frame = allocation["frame"].copy()
+    assign_position_sizes_frame(frame, user_pref, valuation["total_thb"])
+    return frame
+
+
+def _price_signals(user_pref, assumptions, price_store=None, symbol_cache=None):
+    def compute(frame):
+        if price_store is not None:
+            apply_price_history(frame, price_store, user_pref.years_rebound)
+        assign_price_signals_frame(frame, user_pref.years_rebound)
+
+    # Store revision in the cache key (only looked up when there is a cache)
+    revision = price_store.revision() if price_store is not None and symbol_cache is not None else None
+    return _row_wise(
+        assumptions.copy(), compute, symbol_cache,
+        ("price_signals", user_pref.years_rebound, revision),
+        PRICE_SIGNAL_INPUTS, PRICE_SIGNAL_FIELDS,
+    )
+
+
+def _pe_signals(user_pref, valuation, pe_engine=None, symbol_cache=None):
+    def compute(frame):
+        if pe_engine is not None:
+            apply_pe_percentiles(frame, pe_engine, user_pref.years_rebound)
+        assign_pe_signals_frame(frame)
+
+    history = None
+    if pe_engine is not None and symbol_cache is not None:
+        history = (user_pref.years_rebound, pe_engine.revision())
+    return _row_wise(
+        valuation["frame"].copy(), compute, symbol_cache,
+        ("pe_signals", history),
+        PE_SIGNAL_INPUTS, PE_SIGNAL_FIELDS,
+    )
+
+
+def _yield_signals(user_pref, assumptions, symbol_cache=None):
+    return _row_wise(
+        assumptions.copy(), assign_yield_signals_frame, symbol_cache,
+        ("yield_signals",), YIELD_SIGNAL_INPUTS, YIELD_SIGNAL_FIELDS,
+    )
+
+
+def _assemble(user_pref, load, fx, valuation, assumptions, investment_erc, allocation,
+              positions, price_signals, pe_signals, yield_signals):
+    frame = valuation["frame"].copy()
+    frame.assign_from(assumptions, ASSUMPTION_FIELDS)
+    frame.assign_from(allocation["frame"], ALLOCATION_FIELDS)
+    frame.assign_from(positions, POSITION_FIELDS)
+    frame.assign_from(price_signals, PRICE_SIGNAL_FIELDS)
+    frame.assign_from(pe_signals, PE_SIGNAL_FIELDS)
+    frame.assign_from(yield_signals, YIELD_SIGNAL_FIELDS)
+    frame.freeze()
+
+    return PipelineResult(
+        frame=frame,
+        risk_classes=tuple(investment_erc["risk_classes"]),
+        currencies=tuple(allocation["currencies"]),
+        added_reserves=load["added_reserves"],
+        parse_failures=load["parse_failures"],
+        total_thb=valuation["total_thb"],
+        current_portfolio_mdd=valuation["current_portfolio_mdd"],
+        investment_portfolio_mdd=investment_erc["investment_portfolio_mdd"],
+        target_portfolio_mdd=allocation["target_portfolio_mdd"],
+        risk_tree=investment_erc.get("risk_tree"),
+        fx=fx,
+        base_currency=user_pref.base_currency,
+    )
+
+
+def build_portfolio_graph(
+    price_store: Optional[PriceHistoryStore] = None,
+    market_data: Optional[MarketDataService] = None,
+    pe_engine: Optional[PEPercentileEngine] = None,
+    profiler: Profiler = NULL_PROFILER,
+    symbol_cache: Optional[SymbolCache] = None,
+) -> StageGraph:
+    """
+    Portfolio pipeline as a DAG. Inputs are UserPreference fields plus the
+    content digest of the Google Sheet; only stages downstream of a changed
+    input are recomputed.
+
+    With user_pref.lot_export, the sheet is a lot-level export streamed in
+    chunks and aggregated to one row per symbol and currency.
+
+    Values are converted to user_pref.base_currency through one FX matrix
+    built from the Fx column (refreshed by market_data when given).
+
+    With a price_store, 52w high / low and years low come from the local
+    price history instead of the sheet wherever a symbol has history.
+    With market_data, price / fx / EPS / DPS are refreshed from the provider
+    once per shortest field TTL.
+    With erc_method="covariance", asset and class ERC use return correlations
+    from the price_store (uncorrelated without history).
+    With a pe_engine, PE p25 / p75 are rolling percentiles over the last
+    years_rebound years of stored P/E history.
+    With an enabled profiler, every revision check and recomputed stage is timed.
+    With a symbol_cache (shared by several graphs, see portfolio_aggregate),
+    assumptions and price / P/E / yield signals are computed once per
+    distinct symbol input row across every graph using the cache.
+    """
+    return StageGraph([
+        Stage("load", _load, params=("sheet_url", "lot_export"), revision=source_revision),
+        Stage(
+            "market", partial(_market, market_data=market_data), deps=("load",),
+            revision=(lambda p: market_data.refresh_token()) if market_data is not None else None,
+        ),
+        Stage("fx", _fx, deps=("market",)),
+        Stage("valuation", _valuation, deps=("market", "fx"), params=("base_currency",)),
+        Stage(
+            "assumptions", partial(_assumptions, symbol_cache=symbol_cache),
+            deps=("valuation",), params=("years_rebound", "years_dividend"),
+        ),
+        Stage(
+            "investment_erc", partial(_investment_erc, price_store=price_store),
+            deps=("valuation",), params=("erc_method", "risk_levels"),
+            revision=(
+                lambda p: price_store.revision() if p.erc_method == "covariance" else None
+            ) if price_store is not None else None,
+        ),
+        Stage("allocation", _allocation, deps=("investment_erc",), params=("investment_weight", "gold_weight_reserve")),
+        Stage("positions", _positions, deps=("valuation", "allocation"), params=("threshold_drift", "threshold_drift_relative")),
+        Stage(
+            "price_signals", partial(_price_signals, price_store=price_store, symbol_cache=symbol_cache),
+            deps=("assumptions",), params=("years_rebound",),
+            revision=(lambda p: price_store.revision()) if price_store is not None else None,
+        ),
+        Stage(
+            "pe_signals", partial(_pe_signals, pe_engine=pe_engine, symbol_cache=symbol_cache), deps=("valuation",),
+            params=("years_rebound",) if pe_engine is not None else (),
+            revision=(lambda p: pe_engine.revision()) if pe_engine is not None else None,
+        ),
+        Stage("yield_signals", partial(_yield_signals, symbol_cache=symbol_cache), deps=("assumptions",)),
+        Stage("assemble", _assemble, deps=(
+            "load", "fx", "valuation", "assumptions", "investment_erc", "allocation",
+            "positions", "price_signals", "pe_signals", "yield_signals",
+        )),
+    ], profiler=profiler)
+
+
+def run_portfolio_pipeline(graph: StageGraph, user_pref: UserPreference) -> PipelineResult:
+    return graph.run(user_pref)["assemble"]
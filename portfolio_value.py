@@ -1,19 +1,24 @@
 # portfolio_value.py
-from typing import List
+from typing import List, Optional
+import numpy as np
 from asset_data import AssetData
+from fx_engine import FxMatrix, SHEET_FX_BASE, convert_frame, sheet_cross_rate
+from portfolio_frame import PortfolioFrame
 
-def calculate_asset_value(asset: AssetData) -> None:
+def calculate_asset_value(asset: AssetData, fx: Optional[FxMatrix] = None, base: str = SHEET_FX_BASE) -> None:
     """
-    Compute value_local and value_thb for an asset if price and fx_rate are available.
+    Compute value_local and value_thb (in the base currency) for an asset
+    if price and fx_rate are available: the asset's own Fx cell, times the
+    cross rate from fx when base is not the sheet quote currency.
     """
     if asset.price is not None and asset.fx_rate is not None:
         asset.value_local = asset.shares * asset.price
-        asset.value_thb = asset.value_local * asset.fx_rate
+        asset.value_thb = asset.value_local * asset.fx_rate * sheet_cross_rate(fx, base)
 
-def summarize_assets(assets: List[AssetData]) -> List[AssetData]:
+def summarize_assets(assets: List[AssetData], fx: Optional[FxMatrix] = None, base: str = SHEET_FX_BASE) -> List[AssetData]:
     # Ensure all value fields are populated
     for asset in assets:
-        calculate_asset_value(asset)
+        calculate_asset_value(asset, fx, base)
     return assets
 
 
@@ -39,13 +44,43 @@ def assign_weights(assets: List[AssetData], total_value: float) -> float:
 
     return portfolio_estimated_mdd
 
-def combine_assets(assets: List[AssetData]) -> List[AssetData]:
+def summarize_assets_frame(frame: PortfolioFrame, fx: Optional[FxMatrix] = None, base: str = SHEET_FX_BASE) -> PortfolioFrame:
     """
-    Combine bonds and cash into summary positions.
+    Vectorized summarize_assets: value_local / value_thb (in the base
+    currency) for every priced row with an fx rate, converted in one step.
+    """
+    value_local = frame.get("shares") * frame.get("price")
+    value_base = convert_frame(frame, value_local, fx, base)
+    priced = frame.present("price") & ~np.isnan(value_base)
+    frame.set_where("value_local", priced, value_local)
+    frame.set_where("value_thb", priced, value_base)
+    return frame
+
+
+def calculate_portfolio_total_frame(frame: PortfolioFrame) -> float:
+    return float(np.nansum(frame.get("value_thb")))
+
+
+def assign_weights_frame(frame: PortfolioFrame, total_value: float) -> float:
+    """
+    Vectorized assign_weights. Returns the estimated portfolio MDD.
+    """
+    weight = np.zeros(len(frame))
+    if total_value > 0:
+        valued = frame.present("value_thb")
+        weight[valued] = frame.get("value_thb")[valued] / total_value
+    frame.set("weight", weight)
+
+    has_mdd = frame.present("mdd")
+    return float(np.sum(weight[has_mdd] * frame.get("mdd")[has_mdd]))
+
+def combine_assets(assets: List[AssetData], fx: Optional[FxMatrix] = None, base: str = SHEET_FX_BASE) -> List[AssetData]:
+    """
+    Combine bonds and cash into summary positions in the base currency.
     Preserve both actual value and target allocation.
     """
     for asset in assets:
-        calculate_asset_value(asset)
+        calculate_asset_value(asset, fx, base)
 
     bond_assets = [a for a in assets if a.asset_class == "Bond"]
     cash_assets = [a for a in assets if a.asset_class == "Cash"]
@@ -61,7 +96,7 @@ def combine_assets(assets: List[AssetData]) -> List[AssetData]:
         return AssetData(
             name=name,
             symbol=name.upper().replace(" ", "_"),
-            currency="THB",
+            currency=base,
             shares=1,
             price=1,
             asset_class=asset_class,
@@ -1,222 +1,218 @@
 # portfolio_view.py
 
+from functools import cached_property
+from typing import List, Optional
+
 import pandas as pd
-import matplotlib.pyplot as plt
 import streamlit as st
 from asset_data import AssetData
-from typing import List
+from chart_cache import show_pie_chart
+from portfolio_frame import PortfolioFrame
+from table_format import format_table, signal_styles
+from trade_list import TradeList
+
+# Display column → AssetData field
+DISPLAY_COLUMNS = {
+    "Name": "name",
+    "Symbol": "symbol",
+    "Currency": "currency",
+    "Shares": "shares",
+    "Price": "price",
+    "Fx": "fx_rate",
+    "Value (THB)": "value_thb",
+    "Class": "asset_class",
+    "assumed MDD": "mdd",
+    "MDD": "mdd",            #for debug table
+    "EPS": "eps",
+    "DPS": "dps",
+
+    "Weight": "weight",
+
+    "Rebound": "rebound",
+    "CAGR": "cagr",
+    "Offset Yield": "dividend_yield_offset",
+
+    "Inverse MDD": "mdd_inverse",
+    "Target in Class": "target_in_class",
+    "Target": "target",
+    "MDD Contribution": "mdd_contribution",
+
+    "Drift": "drift",
+    "%Drift": "drift_relative",
+    "Drift Amount (THB)": "drift_amount",
+    "Position": "position_size",
+
+    "52w high": "high_52w",
+    "52w low": "low_52w",
+    "Years low": "low_years",
+    "52w drop": "drop_52w",
+    "52w gain": "gain_52w",
+    "Years gain": "gain_years",
+    "Calmar ratio": "calmar_ratio",
+    "Price Signal": "price_signal",
+
+    "PE": "pe_ratio",
+    "PE p25": "pe_p25",
+    "PE p75": "pe_p75",
+    "PE Signal": "pe_signal",
+
+    "Yield": "dividend_yield",
+    "Yield Signal": "dividend_yield_signal",
+}
+
+# Reserve classes shown as one slice each in the pie charts
+COMBINED_CLASSES = {"Bond": "Total Bond", "Cash": "Total Cash"}
+
+
+def portfolio_df_from_frame(frame: PortfolioFrame) -> pd.DataFrame:
+    return pd.DataFrame({column: frame.get(field) for column, field in DISPLAY_COLUMNS.items()})
 
 def get_portfolio_df(assets: List[AssetData]) -> pd.DataFrame:
-    return pd.DataFrame([{
-        "Name": asset.name,
-        "Symbol": asset.symbol,
-        "Currency": asset.currency,
-        "Shares": asset.shares,
-        "Price": asset.price,
-        "Fx": asset.fx_rate,
-        "Value (THB)": asset.value_thb,
-        "Class": asset.asset_class,
-        "assumed MDD": asset.mdd,
-        "MDD": asset.mdd,            #for debug table
-        "EPS": asset.eps,            
-        "DPS": asset.dps,            
-
-        "Weight": asset.weight,
-        
-        "Rebound": asset.rebound,
-        "CAGR": asset.cagr,
-        "Offset Yield": asset.dividend_yield_offset,
-
-        "Inverse MDD": asset.mdd_inverse,
-        "Target in Class": asset.target_in_class,
-        "Target": asset.target,
-        "MDD Contribution": asset.mdd_contribution,
-        
-        "Drift": asset.drift,
-        "%Drift": asset.drift_relative,
-        "Drift Amount (THB)": asset.drift_amount,
-        "Position": asset.position_size,
-    
-        "52w high": asset.high_52w,
-        "52w low": asset.low_52w,
-        "Years low": asset.low_years,
-        "52w drop": asset.drop_52w,
-        "52w gain": asset.gain_52w,
-        "Years gain": asset.gain_years,
-        "Calmar ratio": asset.calmar_ratio,
-        "Price Signal": asset.price_signal,
-        
-        "PE": asset.pe_ratio,
-        "PE p25": asset.pe_p25,
-        "PE p75": asset.pe_p75,
-        "PE Signal": asset.pe_signal,
-        
-        "Yield": asset.dividend_yield,
-        "Yield Signal": asset.dividend_yield_signal,
-    } for asset in assets])
-
-def show_portfolio_table(portfolio_df: pd.DataFrame):
-    show_cols = ["Name", "Currency", "Shares", "Price", "Fx", "Value (THB)", "Weight"]
-    format_dict = {
-        "Shares": lambda x: f"{x:,.2f}" if x != 0.0 else "-",
-        "Price": lambda x: f"{x:,.2f}" if x != 0.0 else "-",
-        "Fx": lambda x: f"{x:,.2f}" if x != 0.0 else "-",
-        "Value (THB)": lambda x: f"{x:,.0f}" if x != 0.0 else "-",
-        "Weight": lambda x: f"{x * 100:.1f}%" if x is not None else "-",
+    return portfolio_df_from_frame(PortfolioFrame.from_assets(assets))
+
+def relabel_base(columns, base_currency: str) -> list[str]:
+    """Column labels with "(THB)" naming the base currency the values are in."""
+    return [column.replace("(THB)", f"({base_currency})") for column in columns]
+
+def combine_portfolio_df(portfolio_df: pd.DataFrame, base_currency: str = "THB") -> pd.DataFrame:
+    """
+    Same rows as combine_assets: bonds and cash summed into one base currency
+    row per class (dropped when both value and target are zero), other assets as is.
+    """
+    other = portfolio_df[~portfolio_df["Class"].isin(list(COMBINED_CLASSES))]
+    totals = []
+    for asset_class, name in COMBINED_CLASSES.items():
+        group = portfolio_df[portfolio_df["Class"] == asset_class]
+        value_thb = group["Value (THB)"].fillna(0).sum()
+        target = group["Target"].fillna(0).sum()
+        if value_thb == 0 and target == 0:
+            continue
+        totals.append({
+            "Name": name, "Symbol": name.upper().replace(" ", "_"), "Currency": base_currency,
+            "Shares": 1.0, "Price": 1.0, "Fx": 1.0, "Class": asset_class,
+            "Value (THB)": value_thb, "Target": target,
+        })
+    return pd.concat([other, pd.DataFrame(totals, columns=portfolio_df.columns)], ignore_index=True)
+
+
+class PortfolioView:
+    """
+    Display model for one pipeline result.
+
+    The DataFrame is built once; each styled table is built on first use and
+    then reused for as long as the view is kept. Tables keep the numbers and
+    only format their display, so columns sort numerically.
+    Value columns keep their "(THB)" names in df and are labelled with the
+    base currency in the tables.
+    """
+
+    def __init__(self, portfolio_df: pd.DataFrame, base_currency: str = "THB"):
+        self.df = portfolio_df
+        self.base_currency = base_currency
+        self._tables: dict[tuple, object] = {}
+
+    @classmethod
+    def from_frame(cls, frame: PortfolioFrame, base_currency: str = "THB") -> "PortfolioView":
+        return cls(portfolio_df_from_frame(frame), base_currency)
+
+    @cached_property
+    def combined_df(self) -> pd.DataFrame:
+        return combine_portfolio_df(self.df, self.base_currency)
+
+    def table(self, columns: dict[str, Optional[str]], highlight: tuple = ()):
+        """
+        Styled table of the given {column: formatter name} (None = as is),
+        with signal colors on the highlight columns.
+        """
+        key = (tuple(columns.items()), tuple(highlight))
+        if key not in self._tables:
+            labels = relabel_base(columns, self.base_currency)
+            display = self.df[list(columns)].set_axis(labels, axis=1)
+            styled = format_table(display, dict(zip(labels, columns.values())))
+            if highlight:
+                styled = styled.apply(signal_styles, axis=None, subset=list(highlight))
+            self._tables[key] = styled
+        return self._tables[key]
+
+def show_portfolio_table(view: PortfolioView):
+    columns = {
+        "Name": None, "Currency": None,
+        "Shares": "num2", "Price": "num2", "Fx": "num2", "Value (THB)": "num0", "Weight": "pct1",
     }
-    st.dataframe(portfolio_df[show_cols].style.format(format_dict))
+    st.dataframe(view.table(columns))
 
-def show_summary_signal_table(portfolio_df: pd.DataFrame):
-    show_cols = ["Name", "Class", "Weight", "Target", "Position", "Price Signal", "PE Signal", "Yield Signal"]
-    format_dict = {
-        "Weight": lambda x: f"{x * 100:.1f}%" if x not in (None, 0.0) else "-",
-        "Target": lambda x: f"{x * 100:.1f}%" if x not in (None, 0.0) else "-",
-    }
-    # Color Green and Red Format
-    def highlight_condition(val):
-        if str(val).lower() in ("oversize", "overbought", "overvalue"):
-            return "color: red;"
-        elif str(val).lower() in ("undersize", "oversold", "undervalue", "sufficient"):
-            return "color: green;"
-        return ""
-
-    styled_df = (
-        portfolio_df[show_cols]
-        .style
-        .format(format_dict)
-        .map(highlight_condition, subset=["Position", "Price Signal", "PE Signal", "Yield Signal"])
-    )
-    st.dataframe(styled_df)
-
-def show_position_table(portfolio_df: pd.DataFrame):
-    show_cols = ["Name", "Class", "Weight", "Target", "Drift", "%Drift", "Position", "Drift Amount (THB)"]
-    format_dict = {
-        "Weight": lambda x: f"{x * 100:.1f}%" if x not in (None, 0.0) else "-",
-        "Target": lambda x: f"{x * 100:.1f}%" if x not in (None, 0.0) else "-",
-        "Drift": lambda x: f"{x * 100:.1f}%" if x not in (None, 0.0) else "-",
-        "%Drift": lambda x: f"{x * 100:.1f}%" if x not in (None, 0.0) else "-",
-        "Drift Amount (THB)": lambda x: f"{x:,.0f}" if pd.notnull(x) and x != 0.0 else "-",
+def show_summary_signal_table(view: PortfolioView):
+    columns = {
+        "Name": None, "Class": None, "Weight": "pct1", "Target": "pct1",
+        "Position": None, "Price Signal": None, "PE Signal": None, "Yield Signal": None,
     }
-    # Color Green and Red Format
-    def highlight_condition(val):
-        if str(val).lower() in ("oversize", "overbought", "overvalue"):
-            return "color: red;"
-        elif str(val).lower() in ("undersize", "oversold", "undervalue", "sufficient"):
-            return "color: green;"
-        return ""
-
-    styled_df = (
-        portfolio_df[show_cols]
-        .style
-        .format(format_dict)
-        .map(highlight_condition, subset=["Position"])
-    )
-    st.dataframe(styled_df)
-
-def show_price_signal_table(portfolio_df: pd.DataFrame):
-    show_cols = ["Name", "Class", "assumed MDD", "52w drop", "52w gain", "Years gain", "Calmar ratio", "Price Signal"]
-    format_dict = {
-        "assumed MDD": lambda x: f"{x * 100:.1f}%" if x not in (None, 0.0) else "-",
-        "52w drop": lambda x: f"{x * 100:.1f}%" if x not in (None, 0.0) else "-",
-        "52w gain": lambda x: f"{x * 100:.1f}%" if x not in (None, 0.0) else "-",
-        "Calmar ratio": lambda x: f"{x:,.2f}" if pd.notnull(x) and x != 0.0 else "-",
-        "Years gain": lambda x: f"{x * 100:.1f}%" if x not in (None, 0.0) else "-",
+    st.dataframe(view.table(columns, highlight=("Position", "Price Signal", "PE Signal", "Yield Signal")))
+
+def show_position_table(view: PortfolioView):
+    columns = {
+        "Name": None, "Class": None, "Weight": "pct1", "Target": "pct1",
+        "Drift": "pct1", "%Drift": "pct1", "Position": None, "Drift Amount (THB)": "num0",
     }
-    # Color Green and Red Format
-    def highlight_condition(val):
-        if str(val).lower() in ("oversize", "overbought", "overvalue"):
-            return "color: red;"
-        elif str(val).lower() in ("undersize", "oversold", "undervalue", "sufficient"):
-            return "color: green;"
-        return ""
-
-    styled_df = (
-        portfolio_df[show_cols]
-        .style
-        .format(format_dict)
-        .map(highlight_condition, subset=["Price Signal"])
-    )
-    st.dataframe(styled_df)
-
-def show_pe_signal_table(portfolio_df: pd.DataFrame):
-    show_cols = ["Name", "Class","PE", "PE p25", "PE p75", "PE Signal"]
-    format_dict = {
-        "PE": lambda x: f"{x:,.0f}" if pd.notnull(x) and x != 0.0 else "-",
-        "PE p25": lambda x: f"{x:,.0f}" if pd.notnull(x) and x != 0.0 else "-",
-        "PE p75": lambda x: f"{x:,.0f}" if pd.notnull(x) and x != 0.0 else "-",
+    st.dataframe(view.table(columns, highlight=("Position",)))
+
+def show_trade_list(trade_list: TradeList, base_currency: str = "THB"):
+    if trade_list.orders.empty and trade_list.fx.empty:
+        st.info("✅ No trades needed: every position is within its drift thresholds.")
+        return
+
+    orders = trade_list.orders.set_axis(relabel_base(trade_list.orders.columns, base_currency), axis=1)
+    formats = {"Shares": "num2", "Price": "num2", "Value (Local)": "num0", "Value (THB)": "num0"}
+    styled = format_table(orders, dict(zip(relabel_base(formats, base_currency), formats.values())))
+    st.dataframe(styled.apply(lambda col: col.map({"Buy": "color: green;", "Sell": "color: red;"}).fillna(""), subset=["Side"]), hide_index=True)
+
+    if not trade_list.fx.empty:
+        fx = trade_list.fx.set_axis(relabel_base(trade_list.fx.columns, base_currency), axis=1)
+        formats = dict.fromkeys(relabel_base(("Amount (THB)", "Amount (From)", "Amount (To)"), base_currency), "num0")
+        st.dataframe(format_table(fx, formats), hide_index=True)
+
+    cash = trade_list.cash
+    st.dataframe(format_table(cash, dict.fromkeys(cash.columns, "num0"), zero_is_empty=False))
+
+    shortfall = trade_list.shortfall
+    if not shortfall.empty:
+        missing = ", ".join(f"{currency} {amount:,.0f}" for currency, amount in shortfall.items())
+        st.warning(f"⚠️ Not enough cash to settle these orders, even after FX ({base_currency}): {missing}.")
+
+def show_price_signal_table(view: PortfolioView):
+    columns = {
+        "Name": None, "Class": None, "assumed MDD": "pct1", "52w drop": "pct1", "52w gain": "pct1",
+        "Years gain": "pct1", "Calmar ratio": "num2", "Price Signal": None,
     }
-    # Color Green and Red Format
-    def highlight_condition(val):
-        if str(val).lower() in ("oversize", "overbought", "overvalue"):
-            return "color: red;"
-        elif str(val).lower() in ("undersize", "oversold", "undervalue", "sufficient"):
-            return "color: green;"
-        return ""
-
-    styled_df = (
-        portfolio_df[show_cols]
-        .style
-        .format(format_dict)
-        .map(highlight_condition, subset=["PE Signal"])
-    )
-    st.dataframe(styled_df)
-
-def show_yield_signal_table(portfolio_df: pd.DataFrame):
-    show_cols = ["Name", "Class", "assumed MDD", "52w drop", "Yield", "Offset Yield", "Yield Signal"]
-    format_dict = {
-        "assumed MDD": lambda x: f"{x * 100:.1f}%" if x not in (None, 0.0) else "-",
-        "52w drop": lambda x: f"{x * 100:.1f}%" if x not in (None, 0.0) else "-",
-        "Yield": lambda x: f"{x * 100:.1f}%" if x not in [None, 0.0] else "-",
-        "Offset Yield": lambda x: f"{x * 100:.1f}%" if x not in [None, 0.0] else "-",
+    st.dataframe(view.table(columns, highlight=("Price Signal",)))
+
+def show_pe_signal_table(view: PortfolioView):
+    columns = {"Name": None, "Class": None, "PE": "num0", "PE p25": "num0", "PE p75": "num0", "PE Signal": None}
+    st.dataframe(view.table(columns, highlight=("PE Signal",)))
+
+def show_yield_signal_table(view: PortfolioView):
+    columns = {
+        "Name": None, "Class": None, "assumed MDD": "pct1", "52w drop": "pct1",
+        "Yield": "pct1", "Offset Yield": "pct1", "Yield Signal": None,
     }
-    # Color Green and Red Format
-    def highlight_condition(val):
-        if str(val).lower() in ("oversize", "overbought", "overvalue"):
-            return "color: red;"
-        elif str(val).lower() in ("undersize", "oversold", "undervalue", "sufficient"):
-            return "color: green;"
-        return ""
-
-    styled_df = (
-        portfolio_df[show_cols]
-        .style
-        .format(format_dict)
-        .map(highlight_condition, subset=["Yield Signal"])
-    )
-    st.dataframe(styled_df)
-
-def show_google_sheet_data_table(portfolio_df: pd.DataFrame):
-    show_cols = ["Name", "Symbol", "Currency", "Shares", "Price", "Fx", "Class", "assumed MDD", "52w high", "52w low", "Years low", "EPS", "DPS", "PE p25", "PE p75"]
-    format_dict = {
-        "Shares": lambda x: f"{x:,.2f}" if x != 0.0 else "-",
-        "Price": lambda x: f"{x:,.2f}" if x != 0.0 else "-",
-        "assumed MDD": lambda x: f"{x * 100:.0f}%" if x not in [None, 0.0] else "-",
-        "Fx": lambda x: f"{x:,.2f}" if x != 0.0 else "-",
-        "52w high": lambda x: f"{x:,.2f}" if x else "-",
-        "52w low": lambda x: f"{x:,.2f}" if x else "-",
-        "Years low": lambda x: f"{x:,.2f}" if x else "-",
-        "EPS": lambda x: f"{x:,.2f}" if pd.notnull(x) and x != 0.0 else "-",
-        "DPS": lambda x: f"{x:,.2f}" if pd.notnull(x) and x != 0.0 else "-",
-        "PE p25": lambda x: f"{x:,.2f}" if pd.notnull(x) and x != 0.0 else "-",
-        "PE p75": lambda x: f"{x:,.2f}" if pd.notnull(x) and x != 0.0 else "-",
+    st.dataframe(view.table(columns, highlight=("Yield Signal",)))
+
+def show_google_sheet_data_table(view: PortfolioView):
+    columns = {
+        "Name": None, "Symbol": None, "Currency": None,
+        "Shares": "num2", "Price": "num2", "Fx": "num2", "Class": None, "assumed MDD": "pct0",
+        "52w high": "num2", "52w low": "num2", "Years low": "num2",
+        "EPS": "num2", "DPS": "num2", "PE p25": "num2", "PE p75": "num2",
     }
-    st.dataframe(portfolio_df[show_cols].style.format(format_dict))
+    st.dataframe(view.table(columns))
 
-def show_allocation_pie_chart(portfolio_df: pd.DataFrame, total_thb: float):
+def show_allocation_pie_chart(portfolio_df: pd.DataFrame, total_thb: float, backend: str = "matplotlib"):
     chart_df = portfolio_df[["Name", "Value (THB)"]].copy()
     chart_df["weight (%)"] = (chart_df["Value (THB)"] / total_thb * 100).round(2)
     chart_df = chart_df[chart_df["weight (%)"] >= 1]
 
-    fig, ax = plt.subplots()
-    chart_df.set_index("Name")["weight (%)"].plot.pie(
-        autopct="%1.0f%%",
-        figsize=(5, 5),
-        ylabel="",
-        ax=ax
-    )
-    st.pyplot(fig)
+    show_pie_chart(chart_df.set_index("Name")["weight (%)"], backend=backend)
 
-def show_target_allocation_pie_chart(portfolio_df: pd.DataFrame):
+def show_target_allocation_pie_chart(portfolio_df: pd.DataFrame, backend: str = "matplotlib"):
     target_df = portfolio_df[["Name", "Target"]].copy()
 
     # Drop NaN and filter out targets < 1%
@@ -229,12 +225,5 @@ def show_target_allocation_pie_chart(portfolio_df: pd.DataFrame):
         st.info("No assets with target allocation ≥ 1% to display.")
         return
 
-    fig, ax = plt.subplots()
-    target_df.set_index("Name")["target (%)"].plot.pie(
-        autopct="%1.0f%%",
-        figsize=(5, 5),
-        ylabel="",
-        ax=ax
-    )
-    st.pyplot(fig)
+    show_pie_chart(target_df.set_index("Name")["target (%)"], backend=backend)
 
@@ -1,5 +1,7 @@
 # position_size.py
+import numpy as np
 from asset_data import AssetData
+from portfolio_frame import PortfolioFrame
 from user_preferences import UserPreference
 from typing import List
 
@@ -57,3 +59,57 @@ def assign_position_sizes(
         set_position_size(asset, user_pref, total_thb)
 
     return assets
+
+
+def classify_drift(
+    drift: np.ndarray,
+    drift_relative: np.ndarray,
+    threshold_drift: float,
+    threshold_drift_relative: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Drift rules of set_position_size on arrays of any shape.
+
+    Returns:
+        (undersize, oversize) boolean arrays
+    """
+    undersize = (drift < -threshold_drift) | (drift_relative < -threshold_drift_relative)
+    oversize = ~undersize & ((drift > threshold_drift) | (drift_relative > threshold_drift_relative))
+    return undersize, oversize
+
+
+def assign_position_sizes_frame(
+    frame: PortfolioFrame,
+    user_pref: UserPreference,
+    total_thb: float
+) -> PortfolioFrame:
+    """
+    Vectorized assign_position_sizes over a PortfolioFrame.
+    """
+
+    weight = frame.get("weight")
+    target = frame.get("target")
+
+    # Skip if weight or target missing
+    valid = frame.present("weight") & frame.present("target")
+    zero_target = valid & (target == 0)
+    normal = valid & ~zero_target
+
+    # Target = 0 → treat entire weight as excess
+    drift = np.where(zero_target, weight, weight - target)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drift_relative = drift / target
+
+    frame.set("drift", drift, valid)
+    frame.set("drift_relative", drift_relative, normal)
+    frame.set("drift_amount", drift * total_thb, valid)
+
+    # Position classification
+    undersize, oversize = classify_drift(
+        drift, drift_relative, user_pref.threshold_drift, user_pref.threshold_drift_relative,
+    )
+    undersize = normal & undersize
+    oversize = zero_target | (normal & oversize)
+
+    frame.set("position_size", np.select([undersize, oversize], ["undersize", "oversize"], "-"))
+    return frame
@@ -0,0 +1,115 @@
+# preference_sweep.py
+from dataclasses import dataclass
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+from class_portfolio import RiskClass
+from portfolio_frame import PortfolioFrame
+
+
+@dataclass
+class SweepResult:
+    portfolio: pd.DataFrame     # One row per (investment_weight, gold_weight_reserve, years_rebound)
+    assets: pd.DataFrame        # One row per (investment_weight, gold_weight_reserve, asset)
+
+
+def sweep_preferences(
+    frame: PortfolioFrame,
+    risk_classes: list[RiskClass],
+    investment_portfolio_mdd: float,
+    investment_weights: Sequence[float],
+    gold_weights_reserve: Sequence[float],
+    years_rebound: Sequence[int],
+) -> SweepResult:
+    """
+    Evaluate the Risk-Off/On preferences over a full grid in one vectorized pass.
+
+    ERC inside and across classes does not depend on these preferences, so
+    the frame must already hold target_in_class, mdd and rebound (the
+    pipeline result frame does). Every grid axis is then broadcast:
+
+        asset target          = investment_weight × class_target_weight × target_in_class
+        target portfolio MDD  = investment_weight × investment portfolio MDD
+        cash / bond / gold    = calculate_reserve_weights logic
+        Cash, Bond, Gold rows = assign_reserve_asset_targets logic
+        expected CAGR         = Σ(asset target × CAGR(years_rebound))
+
+    Grid points where gold would turn negative are flagged feasible=False.
+    """
+    W = np.asarray(investment_weights, dtype=np.float64)[:, None, None]
+    G = np.asarray(gold_weights_reserve, dtype=np.float64)[None, :, None]
+    Y = np.asarray(years_rebound, dtype=np.float64)[None, None, :]
+    grid_shape = (W.shape[0], G.shape[1], Y.shape[2])
+
+    # --- Investment targets per unit of investment_weight
+    asset_class = frame.get("asset_class")
+    class_weight = {rc.name: rc.class_target_weight for rc in risk_classes if rc.class_target_weight is not None}
+    erc_rows = np.isin(asset_class, list(class_weight))
+    base_target = np.zeros(len(frame))
+    base_target[erc_rows] = (
+        np.array([class_weight[c] for c in asset_class[erc_rows]])
+        * np.nan_to_num(frame.get("target_in_class")[erc_rows])
+    )
+
+    # --- Reserve weights (calculate_reserve_weights, broadcast)
+    cash_weight = W * investment_portfolio_mdd
+    reserve_weight = 1 - W
+    gold_weight = reserve_weight * G
+    bond_weight = reserve_weight - cash_weight - gold_weight
+    short = bond_weight < 0
+    gold_weight = np.where(short, gold_weight + bond_weight, gold_weight)
+    bond_weight = np.where(short, 0.0, bond_weight)
+    feasible = gold_weight >= 0
+
+    # --- Expected CAGR of the target portfolio
+    has_rebound = frame.present("rebound") & erc_rows
+    rebound = frame.get("rebound")[has_rebound]
+    cagr = (1 + rebound)[:, None] ** (1 / Y.reshape(1, -1)) - 1                 # (assets, years)
+    expected_cagr = W * (base_target[has_rebound] @ cagr)[None, None, :]
+
+    portfolio = pd.DataFrame({
+        "investment_weight": np.broadcast_to(W, grid_shape).ravel(),
+        "gold_weight_reserve": np.broadcast_to(G, grid_shape).ravel(),
+        "years_rebound": np.broadcast_to(Y, grid_shape).ravel().astype(int),
+        "target_portfolio_mdd": np.broadcast_to(W * investment_portfolio_mdd, grid_shape).ravel(),
+        "cash_weight": np.broadcast_to(cash_weight, grid_shape).ravel(),
+        "bond_weight": np.broadcast_to(bond_weight, grid_shape).ravel(),
+        "gold_weight": np.broadcast_to(gold_weight, grid_shape).ravel(),
+        "expected_cagr": np.broadcast_to(expected_cagr, grid_shape).ravel(),
+        "feasible": np.broadcast_to(feasible, grid_shape).ravel(),
+    })
+
+    # --- Per-asset targets over (investment_weight, gold_weight_reserve)
+    n_w, n_g, n_assets = grid_shape[0], grid_shape[1], len(frame)
+    W2 = np.broadcast_to(W[:, :, 0], (n_w, n_g))                                   # (W, G)
+    G2 = np.broadcast_to(G[:, :, 0], (n_w, n_g))
+    bond2, gold2 = bond_weight[:, :, 0], gold_weight[:, :, 0]
+    targets = W2[:, :, None] * base_target[None, None, :]                          # (W, G, assets)
+
+    currency = np.array([(c or "").upper() for c in frame.get("currency")], dtype=object)
+    mdd = np.abs(np.nan_to_num(frame.get("mdd")))
+    currency_names, currency_index = np.unique(currency, return_inverse=True)
+    cash_base = np.bincount(currency_index, weights=base_target * mdd, minlength=len(currency_names))
+    cash_ratio = cash_base / cash_base.sum() if cash_base.sum() > 0 else np.zeros_like(cash_base)
+
+    cash_rows = asset_class == "Cash"
+    bond_rows = asset_class == "Bond"
+    gold_rows = asset_class == "Gold"
+    targets[:, :, cash_rows] = W2[:, :, None] * cash_base[currency_index[cash_rows]]
+    targets[:, :, bond_rows] = bond2[:, :, None] * cash_ratio[currency_index[bond_rows]]
+    if gold_rows.any():
+        targets[:, :, gold_rows] = (gold2 / gold_rows.sum())[:, :, None]
+
+    assets = pd.DataFrame({
+        "investment_weight": np.repeat(W2.ravel(), n_assets),
+        "gold_weight_reserve": np.repeat(G2.ravel(), n_assets),
+        "name": np.tile(frame.get("name"), n_w * n_g),
+        "asset_class": np.tile(asset_class, n_w * n_g),
+        "currency": np.tile(frame.get("currency"), n_w * n_g),
+        "target": targets.ravel(),
+        "feasible": np.repeat(feasible[:, :, 0].ravel(), n_assets),
+    })
+
+    return SweepResult(portfolio=portfolio, assets=assets)
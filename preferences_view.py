@@ -0,0 +1,131 @@
+# preferences_view.py
+import streamlit as st
+
+from investment_allocation import ERC_METHODS
+from risk_tree import RISK_LEVELS, OPTIONAL_RISK_LEVELS
+from user_preferences import UserPreference, convert_to_csv_url
+
+BASE_CURRENCIES = ("THB", "USD", "EUR", "JPY", "GBP", "SGD", "HKD", "CNY")
+
+
+def get_user_preferences() -> UserPreference:
+    st.sidebar.header("🛠️ User Preference")
+
+    # Google Sheet URL input
+    st.sidebar.markdown("### 📄 Google Sheet Source")
+    input_url = st.sidebar.text_input(
+        label="Enter your Google Sheet URL (optional)",
+        placeholder="https://docs.google.com/spreadsheets/d/...",
+        help="Leave blank to use the default shared sheet."
+    )
+    st.sidebar.caption("ℹ️ Paste a shared Google Sheet link ending in `/edit?usp=sharing`.")
+
+    try:
+        sheet_url = convert_to_csv_url(input_url) if input_url else st.secrets["google_sheet"]["url"]
+    except ValueError:
+        st.sidebar.error("❌ Invalid link format. Please make sure it's a shared Google Sheet URL.")
+        sheet_url = st.secrets["google_sheet"]["url"]
+
+    
+    # Investment allocation slider (user-friendly % input, returned as decimals)
+    st.sidebar.markdown("### 🧑‍💼 Investment Mode: Risk-Off/On")
+    investment_pct = st.sidebar.slider(
+        label="Set Investment Portfolio (%)",
+        min_value=25,
+        max_value=75,
+        value=50,
+        step=1,
+        help="Investment portfolio includes core, growth, and speculative assets."
+    )
+    gold_pct = st.sidebar.slider(
+        label="Set Gold (%) of Reserve Portfolio",
+        min_value=0,
+        max_value=50,
+        value=20,
+        step=1,
+        help="Reserve portfolio includes cash, bond, and gold."
+    )
+    erc_method = st.sidebar.selectbox(
+        "ERC Method",
+        ERC_METHODS,
+        format_func={"inverse_mdd": "Inverse MDD", "covariance": "Covariance (return history)"}.get,
+        help="Inverse MDD ignores correlations. Covariance equalizes risk contributions using return correlations from the local price history."
+    )
+    sub_levels = st.sidebar.multiselect(
+        "Risk Levels below Class",
+        OPTIONAL_RISK_LEVELS,
+        format_func=str.title,
+        help="Split each class by the optional Region / Sector sheet columns before weighting assets (Inverse MDD only)."
+    )
+
+    # Assumption inputs
+    st.sidebar.markdown("### ⏳ Assumptions")
+    years_rebound = st.sidebar.number_input(
+        "Years for Prices to Fully Rebound from MDD",
+        value=3,
+        min_value=1,
+        max_value=10,
+        step=1
+    )
+    years_dividend = st.sidebar.number_input(
+        "Years for Dividends to cover MDD",
+        value=5,
+        min_value=1,
+        max_value=10,
+        step=1
+    )
+
+    # Drift thresholds
+    st.sidebar.markdown("### ⚖️ Rebalancing Thresholds")
+    threshold_drift_pct = st.sidebar.number_input(
+        "Absolute Drift Threshold (%)",
+        value=5,
+        min_value=1,
+        max_value=10,
+        step=1,
+        help="Example: 5 means rebalance when weight differs from target by more than 5 percentage points."
+    )
+    threshold_drift_relative_pct = st.sidebar.number_input(
+        "Relative Drift Threshold (%)",
+        value=50,
+        min_value=20,
+        max_value=200,
+        step=5,
+        help="Example: 50 means rebalance when drift is more than 50% of target weight."
+    )
+    base_currency = st.sidebar.selectbox(
+        "Base Currency",
+        BASE_CURRENCIES,
+        help="Currency of every value, total and trade amount. Other currencies than THB "
+             "need a sheet row in that currency with its Fx rate."
+    )
+    min_trade_thb = st.sidebar.number_input(
+        f"Minimum Trade ({base_currency})",
+        value=0,
+        min_value=0,
+        step=1000,
+        key="min_trade",
+        help="Orders smaller than this are left out of the trade list."
+    )
+    
+    # Convert % to decimals
+    investment_weight = investment_pct / 100
+    gold_weight_reserve = gold_pct / 100
+    threshold_drift = threshold_drift_pct / 100
+    threshold_drift_relative = threshold_drift_relative_pct / 100
+
+    prefs = UserPreference(
+        sheet_url=sheet_url,
+        investment_weight=investment_weight,
+        gold_weight_reserve=gold_weight_reserve,
+        erc_method=erc_method,
+        risk_levels=RISK_LEVELS + tuple(sub_levels),
+        years_rebound=int(years_rebound),
+        years_dividend=int(years_dividend),
+        threshold_drift=threshold_drift,
+        threshold_drift_relative=threshold_drift_relative,
+        min_trade_thb=float(min_trade_thb),
+        base_currency=base_currency,
+    )
+
+    return prefs
@@ -0,0 +1,304 @@
+# price_history.py
+"""
+Local, append-only daily price history.
+
+Each symbol is stored as two flat binary files read through np.memmap:
+    <SYMBOL>.dates   int64 days since 1970-01-01 (strictly increasing)
+    <SYMBOL>.close   float64 closing prices
+
+Other daily series (e.g. trailing EPS) live in companion stores under
+<root>/<series>/ with the same layout.
+
+Usage:
+    python price_history.py ingest-csv prices.csv          # columns: symbol, date, close
+    python price_history.py ingest-csv eps.csv --series eps  # columns: symbol, date, eps
+    python price_history.py ingest-yf AAPL NVDA --period 10y
+Store location: --root, or the PRICE_HISTORY_DIR environment variable.
+"""
+import argparse
+import os
+from contextlib import contextmanager
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from portfolio_frame import PortfolioFrame
+
+DAYS_52W = 365
+DAYS_PER_YEAR = 365.25
+
+# A symbol whose last bar is this many days older than the newest bar of
+# the batch (or as_of) is stale: delisted, renamed or no longer ingested
+MAX_STALE_DAYS = 10
+
+
+class PriceHistoryStore:
+    def __init__(self, root: str, series: str = "close"):
+        self.root = root
+        self.series = series
+        self._pinned_revision = None
+        os.makedirs(root, exist_ok=True)
+
+    def companion(self, series: str) -> "PriceHistoryStore":
+        """Store for another daily series of the same symbols (e.g. "eps")."""
+        return PriceHistoryStore(os.path.join(self.root, series), series)
+
+    @classmethod
+    def from_env(cls) -> Optional["PriceHistoryStore"]:
+        """Store at $PRICE_HISTORY_DIR, or None when it is not configured."""
+        root = os.environ.get("PRICE_HISTORY_DIR")
+        return cls(root) if root else None
+
+    # --- Files ---
+
+    def _path(self, symbol: str, kind: str) -> str:
+        safe = symbol.replace("/", "_").replace(os.sep, "_")
+        return os.path.join(self.root, f"{safe}.{kind}")
+
+    def symbols(self) -> list[str]:
+        return sorted(f[:-len(".dates")] for f in os.listdir(self.root) if f.endswith(".dates"))
+
+    def revision(self) -> tuple:
+        """Cheap token that changes whenever any series is appended to."""
+        if self._pinned_revision is not None:
+            return self._pinned_revision
+        return tuple(sorted(
+            (entry.name, entry.stat().st_size)
+            for entry in os.scandir(self.root) if entry.name.endswith(".dates")
+        ))
+
+    @contextmanager
+    def pinned_revision(self):
+        """
+        Serve one revision() token until exit instead of rescanning the
+        directory on every call (e.g. for every account of a household run).
+        Bars appended meanwhile are picked up after exit.
+        """
+        if self._pinned_revision is not None:
+            yield
+            return
+        self._pinned_revision = self.revision()
+        try:
+            yield
+        finally:
+            self._pinned_revision = None
+
+    # --- Read ---
+
+    def load(self, symbol: str) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return (dates, values) as read-only memory maps.
+
+        dates are int64 day numbers; empty arrays when the symbol is unknown.
+        """
+        dates_path = self._path(symbol, "dates")
+        if not os.path.exists(dates_path) or os.path.getsize(dates_path) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        dates = np.memmap(dates_path, dtype=np.int64, mode="r")
+        values = np.memmap(self._path(symbol, self.series), dtype=np.float64, mode="r", shape=dates.shape)
+        return dates, values
+
+    # --- Append-only write ---
+
+    def append(self, symbol: str, dates, values) -> int:
+        """
+        Append bars newer than the last stored date. Older or duplicate
+        dates are ignored (history is never rewritten).
+
+        Returns:
+            int: number of bars appended
+        """
+        days = np.asarray(pd.to_datetime(dates).values.astype("datetime64[D]").astype(np.int64))
+        values = np.asarray(values, dtype=np.float64)
+
+        order = np.argsort(days, kind="stable")
+        days, values = days[order], values[order]
+
+        # Keep the last bar for repeated dates, drop missing values
+        keep = np.append(days[1:] != days[:-1], True) & ~np.isnan(values)
+        days, values = days[keep], values[keep]
+
+        stored_dates, _ = self.load(symbol)
+        if len(stored_dates):
+            newer = days > stored_dates[-1]
+            days, values = days[newer], values[newer]
+
+        if len(days) == 0:
+            return 0
+
+        with open(self._path(symbol, self.series), "ab") as f:
+            f.write(values.astype(np.float64).tobytes())
+        with open(self._path(symbol, "dates"), "ab") as f:       # Dates last: they define the length
+            f.write(days.astype(np.int64).tobytes())
+        return len(days)
+
+    def ingest_frame(self, df: pd.DataFrame) -> dict[str, int]:
+        """Bulk ingest a long table with columns symbol, date and the series name."""
+        df = df.rename(columns=str.lower)
+        return {
+            symbol: self.append(symbol, group["date"], group[self.series])
+            for symbol, group in df.groupby("symbol", sort=False)
+        }
+
+    def ingest_yfinance(self, symbols: Iterable[str], period: str = "10y") -> dict[str, int]:
+        """Download daily closes with yfinance (optional dependency) and ingest them."""
+        import yfinance as yf
+
+        symbols = list(symbols)
+        data = yf.download(symbols, period=period, interval="1d", auto_adjust=False, progress=False)
+        closes = data["Close"]
+        if isinstance(closes, pd.Series):
+            closes = closes.to_frame(symbols[0])
+
+        long = closes.reset_index().melt(id_vars=closes.index.name or "Date", var_name="symbol", value_name="close")
+        long = long.rename(columns={closes.index.name or "Date": "date"}).dropna(subset=["close"])
+        return self.ingest_frame(long)
+
+
+# --- Trailing-window inputs ---
+
+def window_extremes(
+    store: PriceHistoryStore,
+    symbols: Iterable[str],
+    years: int,
+    as_of: Optional[np.datetime64] = None,
+    max_stale_days: Optional[int] = MAX_STALE_DAYS,
+) -> pd.DataFrame:
+    """
+    Derive the price_signal inputs for every symbol in one pass:
+    52-week high / low and the low over the last `years` years, measured
+    back from as_of (default: each symbol's latest bar).
+
+    A symbol is flagged stale when its last bar is more than max_stale_days
+    older than as_of (default: the newest bar of all the symbols); its
+    windows would otherwise end wherever its history stopped. None never
+    flags.
+
+    Returns:
+        DataFrame indexed by symbol: high_52w, low_52w, low_years, last_close, last_date, stale
+    """
+    as_of_day = None if as_of is None else np.datetime64(as_of, "D").astype(np.int64)
+    rows = {}
+
+    for symbol in dict.fromkeys(symbols):
+        dates, closes = store.load(symbol)
+        if len(dates) == 0:
+            continue
+
+        end_day = dates[-1] if as_of_day is None else as_of_day
+        end = np.searchsorted(dates, end_day, side="right")
+        if end == 0:
+            continue
+
+        start_52w = np.searchsorted(dates, end_day - DAYS_52W, side="right")
+        start_years = np.searchsorted(dates, end_day - int(years * DAYS_PER_YEAR), side="right")
+        window_52w = closes[start_52w:end]
+        window_years = closes[start_years:end]
+
+        rows[symbol] = {
+            "high_52w": float(window_52w.max()),
+            "low_52w": float(window_52w.min()),
+            "low_years": float(window_years.min()),
+            "last_close": float(closes[end - 1]),
+            "last_date": np.datetime64(int(dates[end - 1]), "D"),
+        }
+
+    extremes = pd.DataFrame.from_dict(
+        rows, orient="index",
+        columns=["high_52w", "low_52w", "low_years", "last_close", "last_date"],
+    )
+    last_day = extremes["last_date"].to_numpy(dtype="datetime64[D]").astype(np.int64)
+    if max_stale_days is None:
+        extremes["stale"] = np.zeros(len(extremes), dtype=bool)
+    else:
+        reference = as_of_day if as_of_day is not None else last_day.max(initial=0)
+        extremes["stale"] = last_day < reference - max_stale_days
+    return extremes
+
+
+def daily_log_returns(store: PriceHistoryStore, symbols: Iterable[str], years: int) -> pd.DataFrame:
+    """
+    Daily log returns over the last `years` years (measured back from the
+    latest bar across all symbols), one column per symbol with history.
+
+    Returns:
+        DataFrame indexed by day number; NaN where a symbol has no bar
+    """
+    returns = {}
+    for symbol in dict.fromkeys(symbols):
+        dates, closes = store.load(symbol)
+        if len(dates) > 1:
+            returns[symbol] = pd.Series(np.diff(np.log(closes)), index=np.asarray(dates[1:]))
+    if not returns:
+        return pd.DataFrame(dtype=np.float64)
+
+    wide = pd.DataFrame(returns)
+    return wide[wide.index > wide.index.max() - int(years * DAYS_PER_YEAR)]
+
+
+def return_correlation(
+    store: PriceHistoryStore,
+    symbols: Iterable[str],
+    years: int,
+    min_bars: int = 60,
+) -> pd.DataFrame:
+    """
+    Pairwise correlation of daily log returns over the last `years` years.
+
+    Returns:
+        DataFrame symbol × symbol; NaN where a pair shares fewer than
+        min_bars return days or a symbol has no history
+    """
+    wide = daily_log_returns(store, symbols, years)
+    if wide.empty:
+        return wide
+    return wide.corr(min_periods=min_bars)
+
+
+def apply_price_history(frame: PortfolioFrame, store: PriceHistoryStore, years_rebound: int) -> PortfolioFrame:
+    """
+    Overwrite high_52w / low_52w / low_years with values derived from the
+    store for every symbol that has current history; sheet values are kept
+    otherwise (no history, or stale per window_extremes).
+    """
+    extremes = window_extremes(store, [s for s in frame.get("symbol") if s], years_rebound)
+    extremes = extremes[~extremes["stale"]]
+    if extremes.empty:
+        return frame
+
+    symbols = pd.Series(frame.get("symbol"))
+    has_history = symbols.isin(extremes.index).to_numpy()
+    for field in ("high_52w", "low_52w", "low_years"):
+        values = symbols.map(extremes[field]).to_numpy(dtype=np.float64)
+        frame.set_where(field, has_history, values)
+    return frame
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", default=os.environ.get("PRICE_HISTORY_DIR", "price_history"))
+    sub = parser.add_subparsers(dest="command", required=True)
+    csv_cmd = sub.add_parser("ingest-csv")
+    csv_cmd.add_argument("path")
+    csv_cmd.add_argument("--series", default="close")
+    yf_cmd = sub.add_parser("ingest-yf")
+    yf_cmd.add_argument("symbols", nargs="+")
+    yf_cmd.add_argument("--period", default="10y")
+    args = parser.parse_args(argv)
+
+    store = PriceHistoryStore(args.root)
+    if args.command == "ingest-csv":
+        if args.series != store.series:
+            store = store.companion(args.series)
+        appended = store.ingest_frame(pd.read_csv(args.path, parse_dates=["date"]))
+    else:
+        appended = store.ingest_yfinance(args.symbols, period=args.period)
+
+    for symbol, n in appended.items():
+        print(f"{symbol}: +{n} bars")
+
+
+if __name__ == "__main__":
+    main()
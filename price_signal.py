@@ -1,6 +1,8 @@
 # price_signal.py
 from typing import List
+import numpy as np
 from asset_data import AssetData
+from portfolio_frame import PortfolioFrame
 
 
 def assign_price_signals(assets: List[AssetData], years_rebound: int) -> List[AssetData]:
@@ -34,11 +36,11 @@ def assign_price_signals(assets: List[AssetData], years_rebound: int) -> List[As
         asset.drop_52w = None
         asset.gain_52w = None
 
-        # Need basic price inputs
+        # Need basic price inputs (blank 52w cells load as 0)
         if (
             asset.price is None
-            or asset.high_52w is None
-            or asset.low_52w is None
+            or asset.high_52w in (None, 0)
+            or asset.low_52w in (None, 0)
         ):
             continue
 
@@ -84,3 +86,61 @@ def assign_price_signals(assets: List[AssetData], years_rebound: int) -> List[As
             asset.price_signal = "-"
 
     return assets
+
+
+def assign_price_signals_frame(frame: PortfolioFrame, years_rebound: int) -> PortfolioFrame:
+    """
+    Vectorized assign_price_signals over a PortfolioFrame.
+    """
+
+    price = frame.get("price")
+    high_52w = frame.get("high_52w")
+    low_52w = frame.get("low_52w")
+    low_years = frame.get("low_years")
+    mdd = frame.get("mdd")
+
+    # Only evaluate investment assets with basic price inputs (blank 52w cells load as 0)
+    priced = (
+        frame.investment_rows()
+        & frame.present("price")
+        & frame.present("high_52w")
+        & frame.present("low_52w")
+        & (high_52w != 0)
+        & (low_52w != 0)
+    )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # --- Calculate price moves ---
+        drop_52w = (price - high_52w) / high_52w
+        gain_52w = (price - low_52w) / low_52w
+
+        has_years = priced & frame.present("low_years") & (low_years != 0)
+        gain_years = (price - low_years) / low_years
+
+        # --- Calculate realized CAGR for Calmar ---
+        exponent = 1 / years_rebound if years_rebound > 0 else np.nan
+        has_cagr = has_years & (years_rebound > 0) & (1 + gain_years > 0)
+        realized_cagr = (1 + gain_years) ** exponent - 1
+
+        # --- Calculate Calmar ratio ---
+        has_calmar = has_cagr & frame.present("mdd") & (mdd != 0)
+        calmar_ratio = realized_cagr / np.abs(mdd)
+
+    frame.set("drop_52w", drop_52w, priced)
+    frame.set("gain_52w", gain_52w, priced)
+    frame.set("gain_years", gain_years, has_years)
+    frame.set("calmar_ratio", calmar_ratio, has_calmar)
+
+    # Need signal inputs
+    signaled = priced & frame.present("mdd") & frame.present("rebound") & frame.present("cagr")
+
+    # --- Signal classification ---
+    oversold = drop_52w <= -mdd
+    overbought = (gain_52w >= frame.get("cagr")) | (has_years & (gain_years >= frame.get("rebound")))
+
+    frame.set("price_signal", np.select(
+        [~signaled, oversold, overbought],
+        [None, "oversold", "overbought"],
+        "-",
+    ))
+    return frame
@@ -0,0 +1,154 @@
+# profiling.py
+"""
+Per-stage timing instrumentation.
+
+    profiler = Profiler(enabled=True)
+    with profiler.span("investment_erc", "stage"):
+        ...
+    profiler.summary()          # DataFrame per span name
+    profiler.chrome_trace()     # JSON for chrome://tracing / ui.perfetto.dev
+
+Each span records wall time, CPU time of the process and, when
+track_allocations is on, the bytes allocated through tracemalloc. A
+disabled profiler hands out one shared no-op context manager, so
+instrumented code costs one attribute check per span.
+
+tracemalloc is process-wide: alloc and peak include whatever other threads
+(e.g. other Streamlit sessions) allocate during the span, and every span
+restarts the one traced peak, including for spans still running elsewhere.
+Tracing is started by the first profiler that tracks allocations and
+stopped when the last one stops; it is never stopped when something else
+started it.
+"""
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from weakref import WeakSet
+
+import pandas as pd
+
+_NULL_SPAN = nullcontext()
+
+# Profilers currently tracking allocations; tracemalloc runs while any does
+_tracing_lock = threading.Lock()
+_tracing_profilers: "WeakSet[Profiler]" = WeakSet()
+_started_tracing = False            # tracemalloc was started here, not by the host process
+
+
+def _start_tracing(profiler: "Profiler") -> None:
+    global _started_tracing
+    with _tracing_lock:
+        _tracing_profilers.add(profiler)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+
+
+def _stop_tracing(profiler: "Profiler") -> None:
+    global _started_tracing
+    with _tracing_lock:
+        _tracing_profilers.discard(profiler)
+        if not _tracing_profilers and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+
+
+@dataclass
+class SpanRecord:
+    name: str
+    category: str
+    start_ns: int               # perf_counter_ns at entry
+    wall_ns: int
+    cpu_ns: int
+    alloc_bytes: int            # Net traced bytes still held at exit (0 when not tracked)
+    peak_bytes: int             # Traced peak above the entry level (nested / concurrent spans restart it)
+    thread_id: int
+
+
+class Profiler:
+    def __init__(self, enabled: bool = False, track_allocations: bool = False, max_records: int = 10_000):
+        self.enabled = enabled
+        self.track_allocations = track_allocations
+        self.max_records = max_records
+        self.records: list[SpanRecord] = []
+        self._tracing = False
+
+    def span(self, name: str, category: str = "app"):
+        """Context manager timing the enclosed block (no-op when disabled)."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name, category)
+
+    @contextmanager
+    def _span(self, name: str, category: str):
+        tracking = self.track_allocations
+        if tracking:
+            if not (self._tracing and tracemalloc.is_tracing()):
+                _start_tracing(self)
+                self._tracing = True
+            alloc_start, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+        cpu_start = time.process_time_ns()
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter_ns() - start
+            cpu = time.process_time_ns() - cpu_start
+            alloc = peak = 0
+            if tracking:
+                current, traced_peak = tracemalloc.get_traced_memory()
+                alloc, peak = current - alloc_start, traced_peak - alloc_start
+            if len(self.records) < self.max_records:
+                self.records.append(SpanRecord(name, category, start, wall, cpu, alloc, peak, threading.get_ident()))
+
+    def reset(self) -> None:
+        """
+        Drop recorded spans (e.g. at the start of each rerun). A profiler no
+        longer tracking allocations releases tracemalloc, which stops once no
+        profiler uses it.
+        """
+        self.records = []
+        if self._tracing and not (self.enabled and self.track_allocations):
+            _stop_tracing(self)
+            self._tracing = False
+
+    # --- Reports ---
+
+    def summary(self) -> pd.DataFrame:
+        """Totals per span name, slowest first: calls, wall_ms, cpu_ms, alloc_kb, peak_kb."""
+        if not self.records:
+            return pd.DataFrame(columns=["category", "calls", "wall_ms", "cpu_ms", "alloc_kb", "peak_kb"])
+        df = pd.DataFrame([r.__dict__ for r in self.records])
+        table = df.groupby(["name", "category"]).agg(
+            calls=("wall_ns", "size"),
+            wall_ms=("wall_ns", "sum"),
+            cpu_ms=("cpu_ns", "sum"),
+            alloc_kb=("alloc_bytes", "sum"),
+            peak_kb=("peak_bytes", "max"),
+        ).reset_index(level="category")
+        table[["wall_ms", "cpu_ms"]] /= 1e6
+        table[["alloc_kb", "peak_kb"]] /= 1024
+        return table.sort_values("wall_ms", ascending=False)
+
+    def chrome_trace(self) -> str:
+        """Trace Event Format JSON (complete "X" events, microseconds)."""
+        pid = os.getpid()
+        events = [
+            {
+                "name": r.name, "cat": r.category, "ph": "X",
+                "ts": r.start_ns / 1e3, "dur": r.wall_ns / 1e3,
+                "pid": pid, "tid": r.thread_id,
+                "args": {"cpu_ms": r.cpu_ns / 1e6, "alloc_kb": r.alloc_bytes / 1024, "peak_kb": r.peak_bytes / 1024},
+            }
+            for r in self.records
+        ]
+        return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
+
+
+# Shared disabled profiler for code that is not instrumented by its caller
+NULL_PROFILER = Profiler(enabled=False)
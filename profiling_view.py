@@ -0,0 +1,29 @@
+# profiling_view.py
+import streamlit as st
+
+from profiling import Profiler
+from table_format import format_table
+
+
+def get_profiler_settings(profiler: Profiler) -> None:
+    """Sidebar switches; recorded spans are cleared for the new rerun."""
+    st.sidebar.markdown("### ⏱️ Performance")
+    profiler.enabled = st.sidebar.checkbox("Time this rerun", value=False, key="profiler_enabled")
+    profiler.track_allocations = profiler.enabled and st.sidebar.checkbox(
+        "Track allocations", value=False, key="profiler_allocations",
+        help="tracemalloc counts every allocation, which slows the rerun down noticeably.",
+    )
+    profiler.reset()
+
+
+def show_performance_panel(profiler: Profiler) -> None:
+    """Per-span totals of the current rerun and a Chrome trace download (call last)."""
+    if not profiler.enabled:
+        return
+    summary = profiler.summary()
+    formats = {"wall_ms": "num2", "cpu_ms": "num2", "alloc_kb": "num0", "peak_kb": "num0"}
+    st.sidebar.dataframe(format_table(summary, formats, empty=""))
+    st.sidebar.download_button(
+        "Download Chrome trace", profiler.chrome_trace(), file_name="portfolio_trace.json", mime="application/json",
+        help="Open in chrome://tracing or ui.perfetto.dev.",
+    )
@@ -0,0 +1,227 @@
+# rebalance_backtest.py
+"""
+Historical rebalancing backtest of the position_size drift rules.
+
+The target weights of a pipeline result are held fixed and replayed over
+stored daily closes converted to THB. Whenever any row would be classified
+undersize / oversize (position_size.classify_drift), the whole portfolio
+is traded back to target at that day's close, paying trading and FX costs
+on the traded value.
+
+Holdings only change at rebalances, so the loop steps from event to event:
+each step values a block of days with one matrix product and finds the
+first breach with a vectorized test. The Python loop runs once per
+rebalance, not once per day.
+
+FX history is read from the same store under the yfinance symbol
+<CCY>THB=X (e.g. USDTHB=X); without it the sheet's current rate is used.
+"""
+from dataclasses import dataclass, field
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from portfolio_frame import PortfolioFrame
+from position_size import classify_drift
+from price_history import DAYS_PER_YEAR, PriceHistoryStore
+
+BASE_CURRENCY = "THB"
+DEFAULT_COST_BPS = 10.0                 # Commission + spread per traded value
+DEFAULT_FX_COST_BPS = 25.0              # Extra conversion spread on non-THB trades
+
+# First block of days scanned for a breach; doubled while none is found
+_FIRST_BLOCK_DAYS = 32
+
+
+def fx_symbol(currency: str) -> str:
+    return f"{currency}{BASE_CURRENCY}=X"
+
+
+@dataclass
+class BacktestMarket:
+    """Aligned daily THB prices of the backtested rows."""
+    days: np.ndarray                    # int64 days since 1970-01-01
+    prices_thb: np.ndarray              # (days, assets)
+    foreign: np.ndarray                 # Row trades in a currency other than THB
+    rows: np.ndarray                    # Row indices into the frame
+    names: list[str]
+
+
+@dataclass
+class BacktestResult:
+    value: pd.Series                    # Portfolio value (start = 1) by date
+    rebalance_dates: list = field(default_factory=list)
+    turnover: float = 0.0               # Sum of traded value / portfolio value
+    cost: float = 0.0                   # Sum of costs / portfolio value
+    skipped: list = field(default_factory=list)     # Names left out for lack of usable prices
+
+    def stats(self) -> dict:
+        years = (self.value.index[-1] - self.value.index[0]).days / DAYS_PER_YEAR
+        growth = self.value.iloc[-1] / self.value.iloc[0]
+        log_returns = np.diff(np.log(self.value.to_numpy()))
+        peak = np.maximum.accumulate(self.value.to_numpy())
+        return {
+            "cagr": float(growth ** (1 / years) - 1) if years > 0 else np.nan,
+            "volatility": float(log_returns.std() * np.sqrt(len(log_returns) / years)) if years > 0 else np.nan,
+            "mdd": float(1 - (self.value.to_numpy() / peak).min()),
+            "rebalances": len(self.rebalance_dates),
+            "turnover_per_year": self.turnover / years if years > 0 else np.nan,
+            "cost_per_year": self.cost / years if years > 0 else np.nan,
+        }
+
+
+# --- Market data ---
+
+def _series(store: PriceHistoryStore, symbol: str) -> pd.Series:
+    dates, closes = store.load(symbol)
+    return pd.Series(np.asarray(closes), index=np.asarray(dates))
+
+
+def load_backtest_market(frame: PortfolioFrame, store: PriceHistoryStore, years: int) -> BacktestMarket:
+    """
+    THB closes of every row with a positive target over the last `years`
+    years, starting on the first day all of them have a price.
+
+    Rows without price history (e.g. Cash / Bond placeholders) are held at
+    a constant local price, so they only move with their currency.
+    """
+    target = np.nan_to_num(frame.get("target"))
+    rows = np.flatnonzero(target > 0)
+    symbols = frame.get("symbol")[rows]
+    currencies = frame.get("currency")[rows]
+    sheet_fx = frame.get("fx_rate")[rows]
+
+    closes = {s: _series(store, s) for s in dict.fromkeys(s for s in symbols if s)}
+    fx = {
+        c: _series(store, fx_symbol(c))
+        for c in dict.fromkeys(c for c in currencies if c and c != BASE_CURRENCY)
+    }
+    series = {symbol: s for symbol, s in closes.items() if len(s)}
+    series.update({fx_symbol(c): s for c, s in fx.items() if len(s)})
+    if not any(len(s) for s in closes.values()):
+        return BacktestMarket(np.empty(0, np.int64), np.empty((0, len(rows))), np.zeros(len(rows), bool), rows, [])
+
+    # Calendar = union of bar days; non-trading days carry the last close
+    wide = pd.DataFrame(series).sort_index().ffill().dropna()
+    wide = wide[wide.index > wide.index.max() - int(years * DAYS_PER_YEAR)]
+
+    n_days = len(wide)
+    prices = np.empty((n_days, len(rows)))
+    for j, (symbol, currency) in enumerate(zip(symbols, currencies)):
+        local = wide[symbol].to_numpy() if symbol in wide else np.ones(n_days)
+        if not currency or currency == BASE_CURRENCY:
+            rate = np.ones(n_days)
+        elif fx_symbol(currency) in wide:
+            rate = wide[fx_symbol(currency)].to_numpy()
+        else:
+            rate = np.full(n_days, np.nan_to_num(sheet_fx[j], nan=1.0))
+        prices[:, j] = local * rate
+
+    return BacktestMarket(
+        days=wide.index.to_numpy(dtype=np.int64),
+        prices_thb=prices,
+        foreign=np.array([bool(c) and c != BASE_CURRENCY for c in currencies]),
+        rows=rows,
+        names=list(frame.get("name")[rows]),
+    )
+
+
+# --- Event loop ---
+
+def run_backtest(
+    market: BacktestMarket,
+    target: np.ndarray,
+    threshold_drift: float,
+    threshold_drift_relative: float,
+    cost_bps: float = DEFAULT_COST_BPS,
+    fx_cost_bps: float = DEFAULT_FX_COST_BPS,
+) -> BacktestResult:
+    """
+    Start at target and rebalance fully whenever a row breaches the drift
+    thresholds. target is aligned with market.rows (normalized to sum 1).
+
+    Rows with a zero, negative or missing price on any day cannot be held
+    or traded: they are left out (listed in BacktestResult.skipped) and the
+    target is renormalized over the rest.
+
+    Pass np.inf thresholds for buy-and-hold.
+    """
+    prices = market.prices_thb
+    n_days = len(prices)
+    if n_days < 2:
+        raise ValueError("At least two days of price history are needed.")
+
+    target = np.asarray(target, dtype=np.float64)
+    usable = (np.isfinite(prices) & (prices > 0)).all(axis=0) & (target > 0)
+    if not usable.any():
+        raise ValueError("No row with a positive target has positive prices on every day.")
+    skipped = [name for name, ok in zip(market.names, usable) if not ok]
+    prices, foreign = prices[:, usable], market.foreign[usable]
+    target = target[usable] / target[usable].sum()
+    cost_rate = (cost_bps + fx_cost_bps * foreign) / 1e4
+
+    values = np.empty(n_days)
+    values[0] = 1.0
+    units = target / prices[0]
+    rebalance_days, turnover, cost = [], 0.0, 0.0
+
+    day = 0
+    while day < n_days - 1:
+        # Scan growing blocks after the last event until some row breaches
+        start, block, breach = day + 1, _FIRST_BLOCK_DAYS, None
+        while start < n_days and breach is None:
+            end = min(n_days, start + block)
+            held = prices[start:end] * units
+            block_values = held.sum(axis=1)
+            values[start:end] = block_values
+            drift = held / block_values[:, None] - target
+            undersize, oversize = classify_drift(drift, drift / target, threshold_drift, threshold_drift_relative)
+            hit = (undersize | oversize).any(axis=1)
+            if hit.any():
+                breach = start + int(hit.argmax())
+            start, block = end, block * 2
+        if breach is None:
+            break
+
+        # Trade back to target at the breach close; costs come out of the portfolio
+        value = values[breach]
+        traded = np.abs(target * value - units * prices[breach])
+        paid = traded @ cost_rate
+        turnover += traded.sum() / value
+        cost += paid / value
+        values[breach] = value - paid
+        units = target * values[breach] / prices[breach]
+        rebalance_days.append(market.days[breach])
+        day = breach
+
+    dates = pd.to_datetime(market.days, unit="D")
+    return BacktestResult(
+        value=pd.Series(values, index=dates),
+        rebalance_dates=list(pd.to_datetime(rebalance_days, unit="D")),
+        turnover=turnover,
+        cost=cost,
+        skipped=skipped,
+    )
+
+
+def sweep_thresholds(
+    market: BacktestMarket,
+    target: np.ndarray,
+    threshold_drifts: Iterable[float],
+    threshold_drift_relatives: Iterable[float],
+    **costs,
+) -> pd.DataFrame:
+    """
+    Backtest every threshold pair on the same market data.
+
+    Returns:
+        DataFrame with threshold_drift, threshold_drift_relative and the
+        BacktestResult.stats() columns, one row per pair
+    """
+    rows = []
+    for drift in threshold_drifts:
+        for drift_relative in threshold_drift_relatives:
+            result = run_backtest(market, target, drift, drift_relative, **costs)
+            rows.append({"threshold_drift": drift, "threshold_drift_relative": drift_relative, **result.stats()})
+    return pd.DataFrame(rows)
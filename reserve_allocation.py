@@ -2,7 +2,7 @@
 
 from typing import Iterable
 from asset_data import AssetData
-from currency_portfolio import Currency, build_currency_objects
+from currency_portfolio import Currency
 
 def calculate_reserve_weights(cash_weight: float, user_pref,) -> tuple[float, float]:
     """
@@ -32,8 +32,10 @@ def calculate_reserve_weights(cash_weight: float, user_pref,) -> tuple[float, fl
     return bond_weight_total, gold_weight
 
 def build_currency_portfolio(assets: Iterable[AssetData], bond_weight_total: float,) -> tuple[list[Currency], dict[str, Currency]]:
-    currency_names = [asset.currency for asset in assets if asset.currency]
-    currencies, currency_map = build_currency_objects(currency_names)
+    """Per-currency exposure and reserve split, as Currency records sorted by name."""
+    currency_names = sorted({asset.currency.upper() for asset in assets if asset.currency})
+    investment_weight = dict.fromkeys(currency_names, 0.0)
+    investment_mdd = dict.fromkeys(currency_names, 0.0)
 
     for asset in assets:
         if not asset.currency:
@@ -43,23 +45,27 @@ def build_currency_portfolio(assets: Iterable[AssetData], bond_weight_total: flo
         target = asset.target or 0.0
         mdd = abs(asset.mdd) or 0.0
 
-        ccy = currency_map[currency_name]
-        ccy.currency_investment_weight += target
-        ccy.currency_investment_mdd += target * mdd
+        investment_weight[currency_name] += target
+        investment_mdd[currency_name] += target * mdd
 
+    # Cash weight of a currency = its investment MDD
     total_cash_weight = 0.0
-    for ccy in currencies:
-        ccy.currency_cash_weight = ccy.currency_investment_mdd
-        total_cash_weight += ccy.currency_cash_weight
-
-    for ccy in currencies:
-        ccy.currency_cash_ratio = (
-            ccy.currency_cash_weight / total_cash_weight
-            if total_cash_weight > 0 else 0.0
-        )
-        ccy.currency_bond_weight = bond_weight_total * ccy.currency_cash_ratio
-
-    return currencies, currency_map
+    for name in currency_names:
+        total_cash_weight += investment_mdd[name]
+
+    currencies = []
+    for name in currency_names:
+        cash_ratio = investment_mdd[name] / total_cash_weight if total_cash_weight > 0 else 0.0
+        currencies.append(Currency(
+            name=name,
+            currency_investment_weight=investment_weight[name],
+            currency_investment_mdd=investment_mdd[name],
+            currency_cash_weight=investment_mdd[name],
+            currency_cash_ratio=cash_ratio,
+            currency_bond_weight=bond_weight_total * cash_ratio,
+        ))
+
+    return currencies, {c.name: c for c in currencies}
 
 def assign_reserve_asset_targets(
     assets: list[AssetData],
@@ -2,87 +2,56 @@
 import pandas as pd
 import streamlit as st
 
+from portfolio_view import PortfolioView
+from table_format import format_table
 
-def show_risk_asset_table(portfolio_df: pd.DataFrame):
-    show_cols = [
-        "Name", "Currency", "Class", "assumed MDD", "Target in Class", "Target", "MDD Contribution",
-    ]
 
-    format_dict = {
-        "assumed MDD": lambda x: f"{x * 100:.0f}%" if x not in [None, 0.0] else "-",
-        "Target in Class": lambda x: f"{x * 100:.0f}%" if x not in [None, 0.0] else "-",
-        "Target": lambda x: f"{x * 100:.0f}%" if x not in [None, 0.0] else "-",
-        "MDD Contribution": lambda x: f"{x * 100:.0f}%" if x not in [None, 0.0] else "-",
+def show_risk_asset_table(view: PortfolioView):
+    columns = {
+        "Name": None, "Currency": None, "Class": None,
+        "assumed MDD": "pct0", "Target in Class": "pct0", "Target": "pct0", "MDD Contribution": "pct0",
     }
 
     st.dataframe(
-        portfolio_df[show_cols].style.format(format_dict),
+        view.table(columns),
         use_container_width=True,
     )
 
 
 def show_risk_class_table(risk_classes):
-    data = []
+    df = pd.DataFrame({
+        "Class": [rc.name for rc in risk_classes],
+        "Class MDD": [rc.class_mdd for rc in risk_classes],
+        "Target Weight": [rc.class_target_weight for rc in risk_classes],
+        "MDD Contribution": [rc.class_mdd_contribution for rc in risk_classes],
+    })
 
-    for rc in risk_classes:
-        data.append({
-            "Class": rc.name,
-            "Class MDD": rc.class_mdd,
-            "Target Weight": rc.class_target_weight,
-            "MDD Contribution": rc.class_mdd_contribution,
-        })
-
-    df = pd.DataFrame(data)
-
-    if "Class MDD" in df:
-        df["Class MDD"] = df["Class MDD"].map(
-            lambda x: f"{x:.0%}" if pd.notnull(x) else ""
-        )
-    if "Target Weight" in df:
-        df["Target Weight"] = df["Target Weight"].map(
-            lambda x: f"{x:.0%}" if pd.notnull(x) else ""
-        )
-    if "MDD Contribution" in df:
-        df["MDD Contribution"] = df["MDD Contribution"].map(
-            lambda x: f"{x:.0%}" if pd.notnull(x) else ""
-        )
-
-    st.dataframe(df, use_container_width=True)
+    formats = dict.fromkeys(("Class MDD", "Target Weight", "MDD Contribution"), "pct0")
+    st.dataframe(format_table(df, formats, empty="", zero_is_empty=False), use_container_width=True)
 
 def show_currency_table(currencies):
-    data = []
-
-    for ccy in currencies:
-        data.append({
-            "Currency": ccy.name,
-            "Investment Weight": ccy.currency_investment_weight,
-            "Investment MDD": ccy.currency_investment_mdd,
-            "Cash Weight": ccy.currency_cash_weight,
-            "Cash Ratio": ccy.currency_cash_ratio,
-            "Bond Weight": ccy.currency_bond_weight,
-        })
-
-    df = pd.DataFrame(data)
-
-    if "Investment Weight" in df:
-        df["Investment Weight"] = df["Investment Weight"].map(
-            lambda x: f"{x:.1%}" if pd.notnull(x) else ""
-        )
-    if "Investment MDD" in df:
-        df["Investment MDD"] = df["Investment MDD"].map(
-            lambda x: f"{x:.1%}" if pd.notnull(x) else ""
-        )
-    if "Cash Weight" in df:
-        df["Cash Weight"] = df["Cash Weight"].map(
-            lambda x: f"{x:.1%}" if pd.notnull(x) else ""
-        )
-    if "Cash Ratio" in df:
-        df["Cash Ratio"] = df["Cash Ratio"].map(
-            lambda x: f"{x:.1%}" if pd.notnull(x) else ""
-        )
-    if "Bond Weight" in df:
-        df["Bond Weight"] = df["Bond Weight"].map(
-            lambda x: f"{x:.1%}" if pd.notnull(x) else ""
-        )
-
-    st.dataframe(df, use_container_width=True)
+    df = pd.DataFrame({
+        "Currency": [ccy.name for ccy in currencies],
+        "Investment Weight": [ccy.currency_investment_weight for ccy in currencies],
+        "Investment MDD": [ccy.currency_investment_mdd for ccy in currencies],
+        "Cash Weight": [ccy.currency_cash_weight for ccy in currencies],
+        "Cash Ratio": [ccy.currency_cash_ratio for ccy in currencies],
+        "Bond Weight": [ccy.currency_bond_weight for ccy in currencies],
+    })
+
+    formats = dict.fromkeys(("Investment Weight", "Investment MDD", "Cash Weight", "Cash Ratio", "Bond Weight"), "pct1")
+    st.dataframe(format_table(df, formats, empty="", zero_is_empty=False), use_container_width=True)
+
+def show_risk_tree_table(risk_tree):
+    df = risk_tree.nodes[["level", "path", "mdd", "target_weight", "weight", "mdd_contribution"]].rename(columns={
+        "level": "Level",
+        "path": "Group",
+        "mdd": "Group MDD",
+        "target_weight": "Weight in Parent",
+        "weight": "Investment Weight",
+        "mdd_contribution": "MDD Contribution",
+    })
+    df["Level"] = df["Level"].str.replace("asset_class", "class").str.title()
+
+    formats = dict.fromkeys(("Group MDD", "Weight in Parent", "Investment Weight", "MDD Contribution"), "pct0")
+    st.dataframe(format_table(df, formats, empty="", zero_is_empty=False), use_container_width=True, hide_index=True)
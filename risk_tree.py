@@ -0,0 +1,174 @@
+# risk_tree.py
+from dataclasses import dataclass
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from class_portfolio import RiskClass, ERC_CLASSES
+from portfolio_frame import PortfolioFrame
+
+# Grouping levels below the portfolio root, top first (AssetData text fields).
+# ("asset_class",) is the original class → asset hierarchy.
+RISK_LEVELS = ("asset_class",)
+
+# Optional sheet columns that can be added as lower levels
+OPTIONAL_RISK_LEVELS = ("region", "sector")
+
+# Label of assets with an empty cell at some level
+UNASSIGNED = "Unassigned"
+
+_PATH_SEP = "\x1f"
+
+
+@dataclass
+class RiskTree:
+    """
+    Inverse-MDD ERC at every level of a grouping hierarchy.
+
+    nodes: one row per group
+        level, name, path, parent_path, mdd, mdd_inverse,
+        target_weight (within parent), weight (in the investment portfolio),
+        mdd_contribution (weight × mdd)
+    Asset arrays are aligned with the investment rows of the frame.
+    """
+    levels: tuple[str, ...]
+    rows: np.ndarray                    # Investment row indices into the frame
+    nodes: pd.DataFrame
+    mdd_inverse: np.ndarray
+    target_in_class: np.ndarray         # Weight inside the top-level class
+    weight: np.ndarray                  # Weight in the investment portfolio
+    portfolio_mdd: float
+
+    def risk_classes(self) -> list[RiskClass]:
+        """Top level as RiskClass objects (every ERC class, zeros when empty)."""
+        top = self.nodes[self.nodes["level"] == self.levels[0]].set_index("name")
+        risk_classes = []
+        for name in ERC_CLASSES:
+            if name in top.index:
+                node = top.loc[name]
+                risk_classes.append(RiskClass(
+                    name,
+                    class_mdd=float(node["mdd"]),
+                    class_mdd_inverse=float(node["mdd_inverse"]),
+                    class_target_weight=float(node["target_weight"]),
+                    class_mdd_contribution=float(node["mdd_contribution"]),
+                ))
+            else:
+                risk_classes.append(RiskClass(
+                    name, class_mdd=0.0, class_mdd_inverse=0.0, class_target_weight=0.0, class_mdd_contribution=0.0,
+                ))
+        return risk_classes
+
+
+def _erc_layer(mdd: np.ndarray, parent: np.ndarray, n_parents: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Inverse-MDD ERC of units inside their parent groups, all groups at once.
+
+    Returns:
+        (mdd_inverse, weight_in_parent, parent_mdd)
+    """
+    inverse = np.divide(1.0, mdd, out=np.zeros_like(mdd), where=mdd > 0)
+    total = np.bincount(parent, weights=inverse, minlength=n_parents)
+    weight = np.divide(inverse, total[parent], out=np.zeros_like(inverse), where=total[parent] > 0)
+    parent_mdd = np.bincount(parent, weights=weight * mdd, minlength=n_parents)
+    return inverse, weight, parent_mdd
+
+
+def build_risk_tree(frame: PortfolioFrame, levels: Iterable[str] = RISK_LEVELS) -> RiskTree:
+    """
+    Hierarchical ERC over the investment rows, bottom-up in one pass.
+
+    Every level is grouped once with a hash index (pd.factorize), and each
+    layer is solved for all groups together with np.bincount, so the cost
+    is O(assets × levels).
+
+    Assets with an empty label at some level are pooled into an
+    "Unassigned" group of their parent, so a level missing from the sheet
+    leaves the weights unchanged. With levels=("asset_class",) the result
+    equals apply_asset_class_erc followed by apply_risk_class_erc.
+    """
+    levels = tuple(levels)
+    if not levels or levels[0] != "asset_class":
+        raise ValueError(f"levels must start with 'asset_class', got {levels}.")
+
+    rows = np.flatnonzero(frame.investment_rows())
+    n = len(rows)
+    asset_mdd = np.abs(np.nan_to_num(frame.get("mdd")[rows]))
+
+    # --- Group index per level (paths make labels unique within their parent)
+    paths, group_ids = [], []
+    path = np.full(n, "", dtype=object)
+    for depth, level in enumerate(levels):
+        labels = np.array([label or UNASSIGNED for label in frame.get(level)[rows]], dtype=object)
+        path = path + _PATH_SEP + labels if depth > 0 else labels
+        ids, uniques = pd.factorize(path)
+        paths.append(np.asarray(uniques, dtype=object))
+        group_ids.append(ids)
+
+    # Parent of each group at level d = group at level d-1 of any of its members
+    group_parent = []
+    for depth in range(len(levels)):
+        n_groups = len(paths[depth])
+        if depth == 0:
+            group_parent.append(np.zeros(n_groups, dtype=np.int64))
+        else:
+            parent = np.empty(n_groups, dtype=np.int64)
+            parent[group_ids[depth]] = group_ids[depth - 1]
+            group_parent.append(parent)
+
+    # --- Bottom-up: assets into the deepest groups, then each level into the one above
+    deepest = len(levels) - 1
+    mdd_inverse, weight_in_group, mdd = _erc_layer(asset_mdd, group_ids[deepest], len(paths[deepest]))
+
+    node_inverse, node_weight, node_mdd = [None] * len(levels), [None] * len(levels), [None] * len(levels)
+    for depth in range(deepest, -1, -1):
+        node_mdd[depth] = mdd
+        n_parents = len(paths[depth - 1]) if depth > 0 else 1
+        node_inverse[depth], node_weight[depth], mdd = _erc_layer(mdd, group_parent[depth], n_parents)
+    portfolio_mdd = float(mdd[0]) if len(mdd) else 0.0
+
+    # --- Top-down: weight in the investment portfolio
+    node_global = [None] * len(levels)
+    for depth in range(len(levels)):
+        parent_global = node_global[depth - 1][group_parent[depth]] if depth > 0 else 1.0
+        node_global[depth] = node_weight[depth] * parent_global
+
+    weight = weight_in_group * node_global[deepest][group_ids[deepest]]
+    class_weight = node_global[0][group_ids[0]]
+    target_in_class = np.divide(weight, class_weight, out=np.zeros_like(weight), where=class_weight > 0)
+
+    nodes = pd.concat([
+        pd.DataFrame({
+            "level": level,
+            "name": [p.rsplit(_PATH_SEP, 1)[-1] for p in paths[depth]],
+            "path": [p.replace(_PATH_SEP, " / ") for p in paths[depth]],
+            "parent_path": [paths[depth - 1][i].replace(_PATH_SEP, " / ") for i in group_parent[depth]] if depth else "",
+            "mdd": node_mdd[depth],
+            "mdd_inverse": node_inverse[depth],
+            "target_weight": node_weight[depth],
+            "weight": node_global[depth],
+            "mdd_contribution": node_global[depth] * node_mdd[depth],
+        })
+        for depth, level in enumerate(levels)
+    ], ignore_index=True)
+
+    return RiskTree(
+        levels=levels,
+        rows=rows,
+        nodes=nodes,
+        mdd_inverse=mdd_inverse,
+        target_in_class=target_in_class,
+        weight=weight,
+        portfolio_mdd=portfolio_mdd,
+    )
+
+
+def apply_risk_tree(frame: PortfolioFrame, tree: RiskTree) -> None:
+    """Write mdd_inverse / target_in_class of the investment rows (as the class ERC does)."""
+    investment = np.zeros(len(frame), dtype=bool)
+    investment[tree.rows] = True
+    for field, values in (("mdd_inverse", tree.mdd_inverse), ("target_in_class", tree.target_in_class)):
+        column = np.full(len(frame), np.nan)
+        column[tree.rows] = values
+        frame.set_where(field, investment, column)
@@ -0,0 +1,240 @@
+# sheet_cache.py
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from dataclasses import asdict, dataclass
+from typing import Callable, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+SNAPSHOT_METADATA_KEY = b"sheet_cache"
+
+
+def default_cache_dir() -> str:
+    """Per-user cache directory: $XDG_CACHE_HOME, %LOCALAPPDATA% or ~/.cache."""
+    base = (
+        os.environ.get("XDG_CACHE_HOME")
+        or os.environ.get("LOCALAPPDATA")
+        or os.path.join(os.path.expanduser("~"), ".cache")
+    )
+    return os.path.join(base, "portfolio_sheet_cache")
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    df: pd.DataFrame
+    fetched_at: float                       # Last time the source was confirmed fresh
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None     # HTTP Last-Modified, or file mtime for local paths
+    digest: Optional[str] = None            # sha256 of the raw CSV bytes
+
+
+class SheetCache:
+    """
+    Cache of parsed CSV sheets keyed by URL.
+
+    Lookup order:
+        1. In-memory entry younger than ttl_seconds → served as-is
+        2. Stale or on-disk entry → revalidated with If-None-Match /
+           If-Modified-Since (304 keeps the parsed snapshot)
+        3. Otherwise the CSV is downloaded, parsed and snapshotted to disk
+
+    Local file paths are revalidated against their modification time.
+
+    Snapshots are Parquet files (the entry's fields in the schema metadata)
+    in a directory only the current user can read, default_cache_dir()
+    unless cache_dir is given.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 300.0,
+        cache_dir: Optional[str] = None,
+        opener: Callable = urllib.request.urlopen,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.opener = opener
+        self.clock = clock
+        self._entries: dict[str, CacheEntry] = {}
+        self._revisions: dict[str, tuple[str, float]] = {}     # url → (token, last confirmed)
+
+    def read_csv(self, url: str, **read_csv_kwargs) -> pd.DataFrame:
+        """Return the parsed sheet, touching the network only when needed."""
+        return self.get(url, **read_csv_kwargs).df.copy()
+
+    def get(self, url: str, **read_csv_kwargs) -> CacheEntry:
+        """Return the fresh cache entry (callers must not mutate entry.df)."""
+        key = self._key(url, read_csv_kwargs)
+        entry = self._entries.get(key) or self._load_snapshot(key)
+
+        if entry is not None and self.clock() - entry.fetched_at < self.ttl_seconds:
+            self._entries[key] = entry
+            return entry
+
+        entry = self._fetch(url, entry, read_csv_kwargs)
+        self._entries[key] = entry
+        self._save_snapshot(key, entry)
+        return entry
+
+    def revision(self, url: str, block_size: int = 1 << 20) -> str:
+        """
+        Change token for url without downloading it: size and mtime for local
+        paths, otherwise the ETag / Last-Modified of a HEAD request. Tokens are
+        served for ttl_seconds, then revalidated with a conditional HEAD
+        (304 keeps the token). Only servers that send neither validator have
+        their content streamed and hashed.
+        """
+        if not url.startswith(("http://", "https://")):
+            stat = os.stat(url)
+            return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+        cached = self._revisions.get(url)
+        if cached is not None and self.clock() - cached[1] < self.ttl_seconds:
+            return cached[0]
+
+        request = urllib.request.Request(url, method="HEAD")
+        if cached is not None and cached[0].startswith("etag:"):
+            request.add_header("If-None-Match", cached[0][len("etag:"):])
+        elif cached is not None and cached[0].startswith("modified:"):
+            request.add_header("If-Modified-Since", cached[0][len("modified:"):])
+
+        try:
+            with self.opener(request) as response:
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and cached is not None:
+                self._revisions[url] = (cached[0], self.clock())
+                return cached[0]
+            raise
+
+        if etag:
+            token = f"etag:{etag}"
+        elif last_modified:
+            token = f"modified:{last_modified}"
+        else:
+            digest = hashlib.sha256()
+            with self.opener(url) as response:
+                for block in iter(lambda: response.read(block_size), b""):
+                    digest.update(block)
+            token = f"sha256:{digest.hexdigest()}"
+
+        self._revisions[url] = (token, self.clock())
+        return token
+
+    def invalidate(self, url: Optional[str] = None) -> None:
+        """Drop cached entries for one URL (all parse options), or everything."""
+        for key, entry in list(self._entries.items()):
+            if url is None or entry.url == url:
+                del self._entries[key]
+        for cached_url in list(self._revisions):
+            if url is None or cached_url == url:
+                del self._revisions[cached_url]
+
+        if not os.path.isdir(self.cache_dir):
+            return
+        for file_name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, file_name)
+            if url is None or file_name.startswith(self._url_prefix(url)):
+                os.remove(path)
+
+    # --- Fetching ---
+
+    def _fetch(self, url: str, entry: Optional[CacheEntry], read_csv_kwargs: dict) -> CacheEntry:
+        if not url.startswith(("http://", "https://")):
+            return self._fetch_local(url, entry, read_csv_kwargs)
+
+        request = urllib.request.Request(url)
+        if entry is not None and entry.etag:
+            request.add_header("If-None-Match", entry.etag)
+        if entry is not None and entry.last_modified:
+            request.add_header("If-Modified-Since", entry.last_modified)
+
+        try:
+            with self.opener(request) as response:
+                body = response.read()
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and entry is not None:
+                entry.fetched_at = self.clock()
+                return entry
+            raise
+
+        return CacheEntry(
+            url=url,
+            df=pd.read_csv(io.BytesIO(body), **read_csv_kwargs),
+            fetched_at=self.clock(),
+            etag=etag,
+            last_modified=last_modified,
+            digest=hashlib.sha256(body).hexdigest(),
+        )
+
+    def _fetch_local(self, path: str, entry: Optional[CacheEntry], read_csv_kwargs: dict) -> CacheEntry:
+        mtime = str(os.path.getmtime(path))
+        if entry is not None and entry.last_modified == mtime:
+            entry.fetched_at = self.clock()
+            return entry
+
+        with open(path, "rb") as f:
+            body = f.read()
+
+        return CacheEntry(
+            url=path,
+            df=pd.read_csv(io.BytesIO(body), **read_csv_kwargs),
+            fetched_at=self.clock(),
+            last_modified=mtime,
+            digest=hashlib.sha256(body).hexdigest(),
+        )
+
+    # --- Disk snapshots ---
+
+    def _url_prefix(self, url: str) -> str:
+        return hashlib.sha256(url.encode()).hexdigest()[:16]
+
+    def _key(self, url: str, read_csv_kwargs: dict) -> str:
+        options = hashlib.sha256(repr(sorted(read_csv_kwargs.items())).encode()).hexdigest()[:8]
+        return f"{self._url_prefix(url)}-{options}"
+
+    def _snapshot_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.parquet")
+
+    def _load_snapshot(self, key: str) -> Optional[CacheEntry]:
+        try:
+            table = pq.read_table(self._snapshot_path(key))
+            fields = json.loads(table.schema.metadata[SNAPSHOT_METADATA_KEY])
+            return CacheEntry(df=table.to_pandas(), **fields)
+        except (OSError, pa.ArrowException, KeyError, TypeError, ValueError):
+            return None
+
+    def _save_snapshot(self, key: str, entry: CacheEntry) -> None:
+        fields = {name: value for name, value in asdict(entry).items() if name != "df"}
+        try:
+            os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+            os.chmod(self.cache_dir, 0o700)         # Also tightens a directory created before
+            table = pa.Table.from_pandas(entry.df)
+            table = table.replace_schema_metadata({
+                **(table.schema.metadata or {}),
+                SNAPSHOT_METADATA_KEY: json.dumps(fields).encode(),
+            })
+            # Unique temp file: concurrent sessions may snapshot the same sheet
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f"{key}.", suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pq.write_table(table, f)
+            os.replace(tmp_path, self._snapshot_path(key))
+        except (OSError, pa.ArrowException):
+            pass  # Snapshot is an optimization only
+
+
+# Shared by every Streamlit rerun in this server process
+sheet_cache = SheetCache()
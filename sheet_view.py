@@ -0,0 +1,46 @@
+# sheet_view.py
+from typing import Mapping, Sequence
+
+import streamlit as st
+
+from asset_data import AssetData
+from load_assets import SheetLoadError, build_reserve_assets, read_assets_from_sheet
+
+
+def show_parse_failures(failures: Mapping[str, Sequence]) -> None:
+    if failures:
+        st.warning(
+            "⚠️ Some cells could not be read (numbers were set to 0, lots without symbol or name were skipped): "
+            + "; ".join(
+                f"{col} ({len(values)}): {', '.join(map(str, values[:5]))}"
+                + (" …" if len(values) > 5 else "")
+                for col, values in failures.items()
+            )
+        )
+
+
+def load_assets_from_google_sheet(sheet_url: str) -> list[AssetData]:
+    try:
+        assets, failures = read_assets_from_sheet(sheet_url)
+    except SheetLoadError as e:
+        st.error(f"❌ {e}")
+        st.stop()
+
+    show_parse_failures(failures)
+    return assets
+
+
+def ensure_reserve_assets_per_currency(assets: list[AssetData]) -> list[AssetData]:
+    """
+    Ensure every currency has Bond and Cash.
+    Ensure Gold exists only in USD.
+    """
+    added_assets = build_reserve_assets(assets)
+
+    if added_assets:
+        st.caption(
+            "ℹ️ Auto-added reserve assets: "
+            + ", ".join(a.name for a in added_assets)
+        )
+
+    return assets + added_assets
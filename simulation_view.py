@@ -0,0 +1,47 @@
+# simulation_view.py
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from drawdown_simulation import DrawdownSimulation, SIMULATION_METHODS, TRADING_DAYS
+from table_format import format_table
+
+SIMULATION_PATHS = (1_000, 10_000, 100_000, 1_000_000)
+
+
+def get_simulation_settings() -> dict:
+    """Widgets for simulate_portfolio_drawdowns keyword arguments."""
+    col1, col2, col3 = st.columns(3)
+    method = col1.selectbox("Model", SIMULATION_METHODS, format_func=str.title, key="simulation_method")
+    n_paths = col2.select_slider("Paths", SIMULATION_PATHS, value=10_000, key="simulation_paths")
+    years = col3.number_input("Horizon (years)", value=1, min_value=1, max_value=10, step=1, key="simulation_years")
+    return {
+        "method": method,
+        "n_paths": n_paths,
+        "horizon_days": int(years) * TRADING_DAYS,
+        "block_days": 20 if method == "bootstrap" else 1,        # Monthly blocks keep volatility clusters
+    }
+
+
+def show_drawdown_simulation(simulation: DrawdownSimulation, assumed_mdd: dict[str, float]):
+    summary = simulation.summary()
+    summary.insert(0, "Assumed MDD", pd.Series(assumed_mdd))
+    summary["P(MDD > Assumed)"] = simulation.exceedance(assumed_mdd)
+    formats = dict.fromkeys(summary.columns, "pct1")
+    st.dataframe(format_table(summary, formats, empty="", zero_is_empty=False), use_container_width=True)
+
+    # Histogram of simulated MDD, 1% bins
+    bins = np.arange(0, 101) / 100
+    hist = pd.DataFrame(
+        {name: np.histogram(simulation.mdd[name], bins=bins)[0] for name in simulation.mdd.columns},
+        index=(bins[:-1] * 100).round().astype(int),
+    )
+    hist = hist.loc[:hist.index[hist.to_numpy().any(axis=1)].max()]
+    hist.index.name = "MDD (%)"
+    st.bar_chart(hist, stack=False)
+
+    st.caption(
+        f"ℹ️ {len(simulation.mdd):,} paths of {simulation.horizon_days} trading days, "
+        f"{simulation.method} model fitted on {simulation.history_days:,} days of price history. "
+        "Assets without history are treated as cash (zero return)."
+    )
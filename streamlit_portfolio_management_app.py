@@ -1,29 +1,41 @@
 #streamlit_portfolio_management_app.py
 import streamlit as st
 import pandas as pd
+import numpy as np
+from dataclasses import replace
 
-from asset_data import AssetData
-from class_portfolio import RiskClass, RISK_CLASSES
-from user_preferences import UserPreference, get_user_preferences
+from user_preferences import UserPreference
+from preferences_view import get_user_preferences
 
-from load_assets import load_assets_from_google_sheet, ensure_reserve_assets_per_currency
-from portfolio_value import summarize_assets, combine_assets, calculate_portfolio_total, assign_weights
-from assumption import calculate_assumptions
-from investment_allocation import apply_asset_class_erc, apply_risk_class_erc, apply_final_asset_targets
-from reserve_allocation import calculate_reserve_weights, build_currency_portfolio, assign_reserve_asset_targets
-
-from position_size import assign_position_sizes
-from price_signal import assign_price_signals
-from pe_signal import assign_pe_signals
-from yield_signal import assign_yield_signals
+from load_assets import sheet_revision, SheetLoadError
+from sheet_view import show_parse_failures
+from fx_engine import FxRateError
+from sheet_cache import sheet_cache
+from portfolio_pipeline import build_portfolio_graph, run_portfolio_pipeline, source_revision, ReserveAllocationError
+from price_history import PriceHistoryStore
+from market_data import MarketDataService
+from pe_percentiles import PEPercentileEngine
+from portfolio_history import PortfolioHistory
 
 from portfolio_view import (
-    get_portfolio_df,
+    PortfolioView,
     show_summary_signal_table, show_position_table, show_price_signal_table, show_pe_signal_table, show_yield_signal_table,
-    show_google_sheet_data_table,
+    show_google_sheet_data_table, show_trade_list,
     show_allocation_pie_chart, show_target_allocation_pie_chart,
 )
-from risk_contribution_view import show_risk_asset_table, show_risk_class_table, show_currency_table
+from risk_contribution_view import show_risk_asset_table, show_risk_class_table, show_risk_tree_table, show_currency_table
+from preference_sweep import sweep_preferences
+from chart_cache import CHART_BACKENDS
+from sweep_view import show_sweep_heatmap
+from drawdown_simulation import simulate_portfolio_drawdowns
+from simulation_view import get_simulation_settings, show_drawdown_simulation
+from rebalance_backtest import load_backtest_market, run_backtest, sweep_thresholds
+from backtest_view import show_backtest, show_threshold_heatmap
+from history_view import get_history_settings, load_history, show_history
+from tab_memo import TabMemo
+from trade_list import build_trade_list
+from profiling import Profiler
+from profiling_view import get_profiler_settings, show_performance_panel
 
 # --- Streamlit Page Config ---
 st.set_page_config(page_title="Portfolio Management", layout="centered")
@@ -32,104 +44,227 @@ st.title("🗂️ Portfolio Management")
 # --- User Preferences ---
 user_pref = get_user_preferences()
 
+# Stage results are memoized per session; only stages downstream of a changed input rerun
+if "portfolio_graph" not in st.session_state:
+    price_store = PriceHistoryStore.from_env()
+    st.session_state.profiler = Profiler()
+    st.session_state.portfolio_graph = build_portfolio_graph(
+        price_store=price_store,
+        market_data=MarketDataService.from_env(),
+        pe_engine=PEPercentileEngine(price_store, price_store.companion("eps")) if price_store else None,
+        profiler=st.session_state.profiler,
+    )
+    st.session_state.tab_memo = TabMemo()
+    st.session_state.price_store = price_store
+    st.session_state.history = PortfolioHistory.from_env()
+portfolio_graph = st.session_state.portfolio_graph
+price_store = st.session_state.price_store
+history = st.session_state.history
+tab_memo = st.session_state.tab_memo
+profiler = st.session_state.profiler
+get_profiler_settings(profiler)
+
+if st.sidebar.button("🔄 Reload Google Sheet", help="Discard the cached copy and download the sheet again."):
+    sheet_cache.invalidate()
+    portfolio_graph.invalidate()
+
 # --- Load Asset Data ---
 try:
-    assets = load_assets_from_google_sheet(user_pref.sheet_url)
-except Exception:
+    sheet_revision(user_pref.sheet_url)
+except SheetLoadError:
     st.error("❌ Failed to load data from the provided Google Sheet. Using default sheet instead.")
-    assets = load_assets_from_google_sheet(st.secrets["google_sheet"]["url"])
-    
-assets = ensure_reserve_assets_per_currency(assets)
+    user_pref = replace(user_pref, sheet_url=st.secrets["google_sheet"]["url"])
 
 # --- Portfolio Calculations ---
-assets = summarize_assets(assets)
-total_thb = calculate_portfolio_total(assets)
-current_portfolio_mdd= assign_weights(assets, total_thb)
-calculate_assumptions(assets, user_pref)
-
-# # --- Assign Target Weight to Investment Portfolio                                                                        
-core_mdd = apply_asset_class_erc(assets, RISK_CLASSES, "Core")                    # Asset ERC inside each class
-growth_mdd = apply_asset_class_erc(assets, RISK_CLASSES, "Growth")
-speculative_mdd = apply_asset_class_erc(assets, RISK_CLASSES, "Speculative") 
-
-investment_portfolio_mdd = apply_risk_class_erc(RISK_CLASSES)                     # Class ERC using dynamic class_mdd
-target_portfolio_mdd = user_pref.investment_weight * investment_portfolio_mdd
-apply_final_asset_targets(assets, RISK_CLASSES, user_pref.investment_weight)      # Final asset portfolio targets
-
-
-# # --- Assign Target Weight to Reserve Portfolio
-cash_weight = user_pref.investment_weight * investment_portfolio_mdd
-bond_weight_total, gold_weight = calculate_reserve_weights(cash_weight=cash_weight, user_pref=user_pref,)
-
-# If gold also becomes negative, reserve is insufficient
-if gold_weight < 0:
-    st.error("❌ Reserve allocation is insufficient. Please lower Investment Portfolio (%) setting.")
+try:
+    with profiler.span("pipeline", "app"):
+        result = run_portfolio_pipeline(portfolio_graph, user_pref)
+except (SheetLoadError, ReserveAllocationError, FxRateError) as e:
+    st.error(f"❌ {e}")
     st.stop()
-    
-currencies, currency_map = build_currency_portfolio(assets=assets, bond_weight_total=bond_weight_total,)
-assign_reserve_asset_targets(assets, currencies, gold_weight)
 
+# Record every new result (not every rerun) in the local history store;
+# results other sessions already recorded are skipped by content digest
+if history is not None and st.session_state.get("recorded_version") != portfolio_graph.version("assemble"):
+    with profiler.span("record history", "app"):
+        history.append_if_changed(result, user_pref, source_revision(user_pref))
+    st.session_state.recorded_version = portfolio_graph.version("assemble")
 
-# # --- Assign Signals
-assign_position_sizes(assets, user_pref, total_thb)
-assign_price_signals(assets, user_pref.years_rebound)
-assign_pe_signals(assets)
-assign_yield_signals(assets)
+show_parse_failures(result.parse_failures)
+if result.added_reserves:
+    st.caption("ℹ️ Auto-added reserve assets: " + ", ".join(result.added_reserves))
 
+total_thb = result.total_thb
+current_portfolio_mdd = result.current_portfolio_mdd
+target_portfolio_mdd = result.target_portfolio_mdd
+currencies = result.currencies
 
-# --- Convert to DataFrame ---
-portfolio_df = get_portfolio_df(assets)
+
+# --- Display Model (built once per pipeline output, shared by every table and chart) ---
+view = tab_memo.get("view", portfolio_graph.version("assemble"), lambda: PortfolioView.from_frame(result.frame, result.base_currency))
 
 # --- Display Tables ---
-tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(["🚦 Signals", "🎯 Position", "💹 Price Signal",  "📜 PE Signal", "💵 Yield Signal", "📄 Google Sheet", "📉 Risk"])
-with tab1:
-    st.subheader("🚦 Portfolio Signals")
-    show_summary_signal_table(portfolio_df)
-with tab2:
-    st.subheader("🎯 Position")
-    show_position_table(portfolio_df)
-with tab3:
-    st.subheader("💹 Price Signal")
-    show_price_signal_table(portfolio_df)
-    st.caption(f"""
-    ℹ️ Calmar ratio = annualized return over the past {user_pref.years_rebound} years divided by the assumed MDD.  
-    ℹ️ Don't use Calmar ratio when the asset's price crashes.
-    """)
-with tab4:
-    st.subheader("📜 PE Signal")
-    show_pe_signal_table(portfolio_df)
-with tab5:
-    st.subheader("💵 Yield Signal")
-    show_yield_signal_table(portfolio_df)
-with tab6:
-    st.subheader("📄 Google Sheet Format")
-    show_google_sheet_data_table(portfolio_df)
-    st.caption(f"""
-    ℹ️ "Years low" shows the lowest market price in the last {user_pref.years_rebound} years.  
-    ℹ️ "PE p25" shows the PE ratio 25th percentile in the last {user_pref.years_rebound} years.  
-    ℹ️ "PE p75" shows the PE ratio 75th percentile in the last {user_pref.years_rebound} years.
-    """)
-with tab7:
-    st.subheader("📉 Risk Contribution")
-    show_risk_asset_table(portfolio_df)
-    show_risk_class_table(RISK_CLASSES)
-    show_currency_table(currencies)
+# on_change="rerun" makes tabs lazy: only the open tab's body runs
+tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(
+    ["🚦 Signals", "🎯 Position", "💹 Price Signal",  "📜 PE Signal", "💵 Yield Signal", "📄 Google Sheet", "📉 Risk"],
+    key="table_tab", on_change="rerun",
+)
+if tab1.open:
+    with tab1, profiler.span("🚦 Portfolio Signals", "render"):
+        st.subheader("🚦 Portfolio Signals")
+        show_summary_signal_table(view)
+if tab2.open:
+    with tab2, profiler.span("🎯 Position", "render"):
+        st.subheader("🎯 Position")
+        show_position_table(view)
+        st.subheader("🧾 Trade List")
+        trade_list = tab_memo.get(
+            "trade_list",
+            (portfolio_graph.version("assemble"), user_pref.min_trade_thb),
+            lambda: build_trade_list(
+                result.frame, currencies, total_thb,
+                user_pref.threshold_drift, user_pref.threshold_drift_relative, user_pref.min_trade_thb,
+                fx=result.fx, base=result.base_currency,
+            ),
+        )
+        show_trade_list(trade_list, result.base_currency)
+        st.caption("""
+        ℹ️ Undersize / oversize positions are traded back to target in whole lots ("Lot" column in the sheet, default 1 share).  
+        ℹ️ Orders settle against the cash of their currency; FX conversions refill overdrawn or out-of-band cash.
+        """)
+if tab3.open:
+    with tab3, profiler.span("💹 Price Signal", "render"):
+        st.subheader("💹 Price Signal")
+        show_price_signal_table(view)
+        st.caption(f"""
+        ℹ️ Calmar ratio = annualized return over the past {user_pref.years_rebound} years divided by the assumed MDD.  
+        ℹ️ Don't use Calmar ratio when the asset's price crashes.
+        """)
+if tab4.open:
+    with tab4, profiler.span("📜 PE Signal", "render"):
+        st.subheader("📜 PE Signal")
+        show_pe_signal_table(view)
+if tab5.open:
+    with tab5, profiler.span("💵 Yield Signal", "render"):
+        st.subheader("💵 Yield Signal")
+        show_yield_signal_table(view)
+if tab6.open:
+    with tab6, profiler.span("📄 Google Sheet Format", "render"):
+        st.subheader("📄 Google Sheet Format")
+        show_google_sheet_data_table(view)
+        st.caption(f"""
+        ℹ️ "Years low" shows the lowest market price in the last {user_pref.years_rebound} years.  
+        ℹ️ "PE p25" shows the PE ratio 25th percentile in the last {user_pref.years_rebound} years.  
+        ℹ️ "PE p75" shows the PE ratio 75th percentile in the last {user_pref.years_rebound} years.
+        """)
+if tab7.open:
+    with tab7, profiler.span("📉 Risk Contribution", "render"):
+        st.subheader("📉 Risk Contribution")
+        show_risk_asset_table(view)
+        show_risk_class_table(result.risk_classes)
+        if result.risk_tree is not None and len(result.risk_tree.levels) > 1:
+            show_risk_tree_table(result.risk_tree)
+        show_currency_table(currencies)
 
 
 
 
 # --- Display Pie Charts ---
-assets_combine = combine_assets(assets)
-portfolio_combine_df = get_portfolio_df(assets_combine)
-
-tab1, tab2 = st.tabs(["📊 Actual", "🎯 Target"])
-with tab1:
-    st.subheader("📊 Actual Allocation Pie Chart")
-    show_allocation_pie_chart(portfolio_combine_df, total_thb)
-    st.write(f"Estimated Current Portfolio MDD: **{current_portfolio_mdd:.0%}**")
-with tab2:
-    st.subheader("🎯 Target Allocation Pie Chart")
-    show_target_allocation_pie_chart(portfolio_combine_df)
-    st.write(f"Estimated Target Portfolio MDD: **{target_portfolio_mdd:.0%}**")
+chart_backend = st.sidebar.selectbox(
+    "Chart Renderer",
+    CHART_BACKENDS,
+    help="matplotlib: cached images. native: interactive charts drawn by the browser.",
+)
 
+tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(
+    ["📊 Actual", "🎯 Target", "🧪 Sweep", "🎲 MDD Simulation", "🔁 Backtest", "🕰️ History"],
+    key="chart_tab", on_change="rerun",
+)
+if tab1.open:
+    with tab1, profiler.span("📊 Actual Allocation Pie Chart", "render"):
+        st.subheader("📊 Actual Allocation Pie Chart")
+        show_allocation_pie_chart(view.combined_df, total_thb, backend=chart_backend)
+        st.write(f"Estimated Current Portfolio MDD: **{current_portfolio_mdd:.0%}**")
+if tab2.open:
+    with tab2, profiler.span("🎯 Target Allocation Pie Chart", "render"):
+        st.subheader("🎯 Target Allocation Pie Chart")
+        show_target_allocation_pie_chart(view.combined_df, backend=chart_backend)
+        st.write(f"Estimated Target Portfolio MDD: **{target_portfolio_mdd:.0%}**")
+if tab3.open:
+    with tab3, profiler.span("🧪 Risk-Off/On Sweep", "render"):
+        st.subheader("🧪 Risk-Off/On Sweep")
+        # The sweep only reads the valuation, assumption and class ERC results
+        sweep = tab_memo.get(
+            "sweep",
+            tuple(portfolio_graph.version(name) for name in ("valuation", "assumptions", "investment_erc")),
+            lambda: sweep_preferences(                                               # Same ranges as the sidebar inputs
+                result.frame, result.risk_classes, result.investment_portfolio_mdd,
+                investment_weights=[pct / 100 for pct in range(25, 76)],
+                gold_weights_reserve=[pct / 100 for pct in range(0, 51)],
+                years_rebound=range(1, 11),
+            ),
+        )
+        show_sweep_heatmap(sweep.portfolio, user_pref.years_rebound)
+if tab4.open:
+    with tab4, profiler.span("🎲 Monte Carlo Drawdown", "render"):
+        st.subheader("🎲 Monte Carlo Drawdown")
+        if price_store is None:
+            st.info("ℹ️ Set PRICE_HISTORY_DIR to a price history store to simulate drawdowns.")
+        else:
+            settings = get_simulation_settings()
+            simulation = tab_memo.get(
+                "simulation",
+                (portfolio_graph.version("assemble"), price_store.revision(), tuple(settings.items())),
+                lambda: simulate_portfolio_drawdowns(result.frame, price_store, **settings),
+            )
+            if simulation is None:
+                st.info("ℹ️ No price history for the portfolio's symbols.")
+            else:
+                show_drawdown_simulation(simulation, {"Target": target_portfolio_mdd, "Current": current_portfolio_mdd})
+if tab5.open:
+    with tab5, profiler.span("🔁 Rebalancing Backtest", "render"):
+        st.subheader("🔁 Rebalancing Backtest")
+        if price_store is None:
+            st.info("ℹ️ Set PRICE_HISTORY_DIR to a price history store to backtest rebalancing.")
+        else:
+            backtest_years = st.number_input("History (years)", value=10, min_value=1, max_value=30, step=1, key="backtest_years")
+            market_key = (portfolio_graph.version("assemble"), price_store.revision(), int(backtest_years))
+            market = tab_memo.get("backtest_market", market_key, lambda: load_backtest_market(result.frame, price_store, int(backtest_years)))
+            if len(market.days) < 2:
+                st.info("ℹ️ No price history for the portfolio's symbols.")
+            else:
+                target = result.frame.get("target")[market.rows]
+                show_backtest({
+                    "Drift Rules": run_backtest(market, target, user_pref.threshold_drift, user_pref.threshold_drift_relative),
+                    "Buy and Hold": run_backtest(market, target, np.inf, np.inf),
+                })
+                grid = tab_memo.get(                                                 # Same ranges as the sidebar inputs
+                    "backtest_grid",
+                    market_key,
+                    lambda: sweep_thresholds(
+                        market, target,
+                        threshold_drifts=[pct / 100 for pct in range(1, 11)],
+                        threshold_drift_relatives=[pct / 100 for pct in range(20, 201, 20)],
+                    ),
+                )
+                show_threshold_heatmap(grid, user_pref.threshold_drift, user_pref.threshold_drift_relative)
+                st.caption(
+                    f"ℹ️ Replays {len(market.days):,} days from {pd.to_datetime(market.days[0], unit='D'):%Y-%m-%d} "
+                    "with today's targets; any undersize / oversize position triggers a full rebalance. "
+                    "Assets without history are held at a constant local price."
+                )
+if tab6.open:
+    with tab6, profiler.span("🕰️ History", "render"):
+        st.subheader("🕰️ History")
+        if history is None:
+            st.info("ℹ️ Set PORTFOLIO_HISTORY_DIR to a local directory to record and chart past runs.")
+        else:
+            history_start, history_field = get_history_settings()
+            history_data = tab_memo.get(
+                "history",
+                (history.revision(), user_pref.sheet_url, history_start and history_start.date()),
+                lambda: load_history(history, user_pref.sheet_url, history_start),
+            )
+            show_history(history_data, history_field)
 
+show_performance_panel(profiler)
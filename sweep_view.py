@@ -0,0 +1,40 @@
+# sweep_view.py
+import matplotlib.pyplot as plt
+import pandas as pd
+import streamlit as st
+
+SWEEP_METRICS = {
+    "Bond Weight": "bond_weight",
+    "Gold Weight": "gold_weight",
+    "Cash Weight": "cash_weight",
+    "Target Portfolio MDD": "target_portfolio_mdd",
+    "Expected CAGR": "expected_cagr",
+}
+
+
+def show_sweep_heatmap(sweep_df: pd.DataFrame, years_rebound: int):
+    label = st.selectbox("Metric", list(SWEEP_METRICS), key="sweep_metric")
+    metric = SWEEP_METRICS[label]
+
+    # Slice at the current years_rebound; infeasible cells stay blank
+    slice_df = sweep_df[sweep_df["years_rebound"] == years_rebound]
+    slice_df = slice_df.assign(**{metric: slice_df[metric].where(slice_df["feasible"])})
+    grid = slice_df.pivot(index="gold_weight_reserve", columns="investment_weight", values=metric) * 100
+
+    fig, ax = plt.subplots(figsize=(6, 4))
+    image = ax.imshow(
+        grid.values,
+        origin="lower",
+        aspect="auto",
+        extent=[
+            grid.columns.min() * 100, grid.columns.max() * 100,
+            grid.index.min() * 100, grid.index.max() * 100,
+        ],
+    )
+    ax.set_xlabel("Investment Portfolio (%)")
+    ax.set_ylabel("Gold (%) of Reserve Portfolio")
+    fig.colorbar(image, ax=ax, label=f"{label} (%)")
+    st.pyplot(fig)
+    plt.close(fig)
+
+    st.caption("ℹ️ Blank cells: reserve allocation is insufficient for that setting.")
@@ -0,0 +1,128 @@
+# symbol_cache.py
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+import numpy as np
+import pandas as pd
+
+from portfolio_frame import TEXT_FIELDS, PortfolioFrame
+
+
+def _row_groups(columns: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Group rows with equal values in every column (NaN / None equal to
+    themselves). Returns (first row of each group, group of each row).
+    """
+    inverse = np.zeros(len(columns[0]), dtype=np.int64)
+    for column in columns:
+        codes, uniques = pd.factorize(column, use_na_sentinel=False)
+        # Renumber after every column so the combined code stays below the row count
+        _, inverse = np.unique(inverse * len(uniques) + codes, return_inverse=True)
+    n_groups = int(inverse.max()) + 1
+    first = np.full(n_groups, len(inverse), dtype=np.int64)
+    np.minimum.at(first, inverse, np.arange(len(inverse)))
+    return first, inverse
+
+
+def _python_values(frame: PortfolioFrame, name: str, rows) -> list:
+    """Values of a field on the given rows, None where missing."""
+    values = frame.get(name)[rows].tolist()
+    if name in TEXT_FIELDS:
+        return values
+    return [v if m else None for v, m in zip(values, frame.present(name)[rows].tolist())]
+
+
+class SymbolCache:
+    """
+    Per-symbol results of row-wise computations (assumptions, price / P/E /
+    yield signals), shared by every portfolio graph it is given to.
+
+    A row's outputs depend only on its own input fields and on the table
+    key (stage name, preferences, data revisions), so rows with equal
+    inputs – the same symbol held in several portfolios – are computed
+    once: per run only the distinct unseen input rows reach the
+    computation, and every other row is filled from the cache.
+
+    Each table keeps at most max_entries rows and the max_tables most
+    recently used tables are kept. Safe to share between threads.
+    """
+
+    def __init__(self, max_entries: int = 200_000, max_tables: int = 32):
+        self.max_entries = max_entries
+        self.max_tables = max_tables
+        self._tables: OrderedDict[Hashable, dict[tuple, tuple]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0       # Distinct input rows served from the cache
+        self.misses = 0     # Distinct input rows computed
+
+    def apply(
+        self,
+        frame: PortfolioFrame,
+        table: Hashable,
+        inputs: tuple[str, ...],
+        outputs: tuple[str, ...],
+        compute: Callable[[PortfolioFrame], object],
+    ) -> PortfolioFrame:
+        """
+        Fill the output fields of frame as compute(frame) would.
+
+        compute must be row-wise and read no frame fields besides inputs;
+        everything else it depends on belongs in table.
+        """
+        if len(frame) == 0:
+            compute(frame)
+            return frame
+
+        first, inverse = _row_groups([frame.get(name) for name in inputs])
+        keys = list(zip(*(_python_values(frame, name, first) for name in inputs)))
+
+        with self._lock:
+            entries = self._tables.get(table)
+            if entries is None:
+                entries = self._tables[table] = {}
+            self._tables.move_to_end(table)
+            while len(self._tables) > self.max_tables:
+                self._tables.popitem(last=False)
+            rows = [entries.get(key) for key in keys]
+
+        missing = [i for i, row in enumerate(rows) if row is None]
+        if missing:
+            subset = frame.take(first[missing])
+            compute(subset)
+            computed = list(zip(*(_python_values(subset, name, slice(None)) for name in outputs)))
+            for i, row in zip(missing, computed):
+                rows[i] = row
+            with self._lock:
+                for i, row in zip(missing, computed):
+                    if len(entries) >= self.max_entries:
+                        del entries[next(iter(entries))]
+                    entries[keys[i]] = row
+
+        with self._lock:
+            self.hits += len(rows) - len(missing)
+            self.misses += len(missing)
+
+        for name, values in zip(outputs, zip(*rows)):
+            if name in TEXT_FIELDS:
+                column = np.empty(len(values), dtype=object)
+                column[:] = values
+                frame.set(name, column[inverse])
+            else:
+                mask = np.array([v is not None for v in values], dtype=bool)
+                column = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+                frame.set(name, column[inverse], mask[inverse])
+        return frame
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tables": len(self._tables),
+                "entries": sum(len(entries) for entries in self._tables.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tables.clear()
@@ -0,0 +1,25 @@
+# tab_memo.py
+from typing import Any, Callable, Hashable
+
+
+class TabMemo:
+    """
+    Prepared tab content (display tables, chart data, sweeps) kept between
+    Streamlit reruns.
+
+    Each entry is keyed on a version token, normally StageGraph.version() of
+    the stages it is derived from; it is rebuilt only when a tab that needs
+    it is open and the token has changed.
+    """
+
+    def __init__(self):
+        self._entries: dict[str, tuple[Hashable, Any]] = {}
+
+    def get(self, name: str, version: Hashable, build: Callable[[], Any]) -> Any:
+        entry = self._entries.get(name)
+        if entry is None or entry[0] != version:
+            entry = self._entries[name] = (version, build())
+        return entry[1]
+
+    def clear(self) -> None:
+        self._entries.clear()
@@ -0,0 +1,68 @@
+# table_format.py
+from functools import lru_cache
+from typing import Any, Callable, Optional
+
+import numpy as np
+import pandas as pd
+from pandas.io.formats.style import Styler
+
+
+# Formatter name → format spec for one float
+FORMATS: dict[str, str] = {
+    "num0": "{:,.0f}",
+    "num2": "{:,.2f}",
+    "pct0": "{:.0%}",
+    "pct1": "{:.1%}",
+}
+
+# Signal / position text → cell style
+SIGNAL_STYLES = {
+    "oversize": "color: red;",
+    "overbought": "color: red;",
+    "overvalue": "color: red;",
+    "undersize": "color: green;",
+    "oversold": "color: green;",
+    "undervalue": "color: green;",
+    "sufficient": "color: green;",
+}
+
+
+@lru_cache(maxsize=None)
+def cell_formatter(fmt: str, empty: str = "-", zero_is_empty: bool = True) -> Callable[[Any], str]:
+    """
+    Styler.format callable for one FORMATS name (one shared instance per
+    argument combination).
+
+    Missing / non-numeric values (and zeros, unless zero_is_empty=False) are
+    shown as `empty`. Only the display text changes: the cell keeps its
+    number, so tables still sort numerically.
+    """
+    spec = FORMATS[fmt]
+
+    def format_cell(value) -> str:
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return empty
+        if np.isnan(value) or (zero_is_empty and value == 0.0):
+            return empty
+        return spec.format(value)
+
+    return format_cell
+
+
+def format_table(
+    df: pd.DataFrame,
+    formats: dict[str, Optional[str]],
+    empty: str = "-",
+    zero_is_empty: bool = True,
+) -> Styler:
+    """Styler of df with the {column: formatter name} display formats (None = as is)."""
+    return df.style.format({
+        column: cell_formatter(fmt, empty, zero_is_empty) for column, fmt in formats.items() if fmt is not None
+    })
+
+
+def signal_styles(df: pd.DataFrame) -> pd.DataFrame:
+    """Styler.apply(axis=None) callback: red / green text for signal columns."""
+    return df.apply(lambda col: col.astype(str).str.lower().map(SIGNAL_STYLES)).fillna("")
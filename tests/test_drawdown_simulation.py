@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from drawdown_simulation import _max_drawdown, simulate_drawdowns
+
+
+def log_returns(wealth):
+    return np.diff(np.log([1.0, *wealth]))
+
+
+def test_max_drawdown_matches_hand_computed_paths():
+    paths = np.array([[
+        log_returns([1.1, 0.99, 1.21, 0.605]),      # 1.1 → 0.99 is 10%, 1.21 → 0.605 is 50%
+        log_returns([0.8, 0.9, 1.2, 1.3]),          # Below the starting wealth at once: 20%
+        log_returns([1.1, 1.2, 1.3, 1.4]),          # Never falls
+    ]])
+    np.testing.assert_allclose(_max_drawdown(paths), [[0.5, 0.2, 0.0]], atol=1e-12)
+
+
+@pytest.fixture
+def history():
+    rng = np.random.default_rng(3)
+    common = rng.normal(0, 0.01, 500)
+    return pd.DataFrame({
+        "Target": common + rng.normal(0.0003, 0.004, 500),
+        "Current": common + rng.normal(0.0002, 0.008, 500),
+    })
+
+
+@pytest.mark.parametrize("method, block_days", [("bootstrap", 1), ("bootstrap", 20), ("gaussian", 1)])
+def test_results_do_not_depend_on_worker_count(history, method, block_days):
+    kwargs = dict(n_paths=2_000, horizon_days=60, method=method, block_days=block_days, seed=7, chunk_bytes=500_000)
+    serial = simulate_drawdowns(history, workers=1, **kwargs)
+    parallel = simulate_drawdowns(history, workers=2, **kwargs)
+
+    pd.testing.assert_frame_equal(serial.mdd, parallel.mdd)
+    assert len(serial.mdd) == 2_000
+    assert ((serial.mdd >= 0) & (serial.mdd < 1)).all().all()
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from asset_data import AssetData
+from fx_engine import FxMatrix, FxRateError, convert_frame
+from portfolio_frame import PortfolioFrame
+from portfolio_value import summarize_assets, summarize_assets_frame
+
+
+def sheet(rows):
+    """rows of (currency, shares, price, fx)"""
+    return [
+        AssetData(f"A{i}", f"A{i}", currency, shares, price=price, fx_rate=fx, asset_class="Core")
+        for i, (currency, shares, price, fx) in enumerate(rows)
+    ]
+
+
+CONFLICTING = [("USD", 100, 50.0, 35.0), ("USD", 100, 50.0, 36.5), ("THB", 1000, 1.0, 0.0), ("EUR", 10, 20.0, 38.0)]
+
+
+def test_rows_are_valued_with_their_own_fx_cell():
+    with pytest.warns(UserWarning, match="Conflicting Fx rates for USD"):
+        fx = FxMatrix.from_assets(sheet(CONFLICTING))
+    frame = PortfolioFrame.from_assets(sheet(CONFLICTING))
+    summarize_assets_frame(frame, fx)
+
+    np.testing.assert_allclose(frame.get("value_thb"), [175_000, 182_500, 0, 7_600])
+    assert [a.value_thb for a in summarize_assets(sheet(CONFLICTING), fx)] == pytest.approx([175_000, 182_500, 0, 7_600])
+
+
+def test_per_currency_rate_is_the_last_positive_one():
+    with pytest.warns(UserWarning):
+        fx = FxMatrix.from_assets(sheet(CONFLICTING))
+    assert fx.rate("USD", "THB") == 36.5
+    assert fx.rate("THB", "THB") == 1.0
+
+
+def test_other_base_applies_the_cross_rate_to_each_row():
+    rows = [("USD", 100, 50.0, 35.0), ("EUR", 10, 20.0, 38.0), ("THB", 700, 1.0, 1.0)]
+    fx = FxMatrix.from_assets(sheet(rows))
+    frame = PortfolioFrame.from_assets(sheet(rows))
+    values = frame.get("shares") * frame.get("price")
+
+    np.testing.assert_allclose(convert_frame(frame, values, fx, "USD"), [5_000, 7_600 / 35, 20])
+    assert fx.rate("EUR", "USD") == pytest.approx(38 / 35)          # Triangulated through THB
+
+
+def test_unknown_base_raises():
+    rows = [("USD", 100, 50.0, 35.0)]
+    frame = PortfolioFrame.from_assets(sheet(rows))
+    with pytest.raises(FxRateError):
+        convert_frame(frame, frame.get("shares"), FxMatrix.from_assets(sheet(rows)), "GBP")
+    with pytest.raises(FxRateError):
+        convert_frame(frame, frame.get("shares"), None, "USD")
+
+
+def test_unreachable_pairs_stay_nan():
+    fx = FxMatrix.from_quotes({("USD", "THB"): 35.0, ("GBP", "CHF"): 1.1})
+    assert fx.rate("GBP", "CHF") == 1.1
+    assert fx.rate("CHF", "GBP") == pytest.approx(1 / 1.1)
+    assert np.isnan(fx.rate("USD", "GBP"))
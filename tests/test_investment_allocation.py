@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from investment_allocation import CORRELATION_SHRINKAGE, nearest_correlation, solve_erc
+
+
+def sample_cov(n, periods, seed=0):
+    """Covariance from fewer periods than assets: rank-deficient before cleaning."""
+    rng = np.random.default_rng(seed)
+    returns = rng.standard_normal((periods, n)) + rng.standard_normal((periods, 1))
+    mdd = rng.uniform(0.1, 0.6, n)
+    return np.outer(mdd, mdd) * nearest_correlation(np.corrcoef(returns.T)), mdd
+
+
+def risk_contributions(weights, cov):
+    return weights * (cov @ weights)
+
+
+@pytest.mark.parametrize("method", ["newton", "ccd"])
+@pytest.mark.parametrize("n, periods", [(40, 250), (120, 30)])
+def test_risk_contributions_are_equal(method, n, periods):
+    cov, mdd = sample_cov(n, periods)
+    weights = solve_erc(cov, x0=1 / mdd, method=method)
+
+    assert weights.sum() == pytest.approx(1.0)
+    assert (weights > 0).all()
+    rc = risk_contributions(weights, cov)
+    np.testing.assert_allclose(rc, rc.mean(), rtol=1e-8)
+
+
+def test_methods_agree_and_newton_runs_above_its_size_limit():
+    cov, mdd = sample_cov(600, 50)
+    newton = solve_erc(cov, x0=1 / mdd, method="newton")
+    np.testing.assert_allclose(newton, solve_erc(cov, x0=1 / mdd, method="ccd"), rtol=1e-8)
+
+
+def test_negative_correlation_keeps_weights_positive():
+    corr = np.array([[1.0, -0.9, 0.3], [-0.9, 1.0, -0.5], [0.3, -0.5, 1.0]])
+    cov = np.outer([0.2, 0.4, 0.3], [0.2, 0.4, 0.3]) * nearest_correlation(corr)
+    weights = solve_erc(cov)
+    assert (weights > 0).all()
+    rc = risk_contributions(weights, cov)
+    np.testing.assert_allclose(rc, rc.mean(), rtol=1e-8)
+
+
+def test_unconverged_solve_warns():
+    cov, _ = sample_cov(50, 20)
+    with pytest.warns(RuntimeWarning, match="did not converge"):
+        solve_erc(cov, method="ccd", max_iter=1)
+
+
+def test_nearest_correlation_is_shrunk_and_positive_definite():
+    corr = np.array([[1.0, 0.99, np.nan], [0.99, 1.0, -0.99], [np.nan, -0.99, 1.0]])
+    cleaned = nearest_correlation(corr)
+
+    np.testing.assert_allclose(cleaned, cleaned.T)
+    np.testing.assert_allclose(np.diag(cleaned), 1.0)
+    assert np.linalg.eigvalsh(cleaned).min() >= CORRELATION_SHRINKAGE - 1e-12
+    assert nearest_correlation(np.eye(3)) == pytest.approx(np.eye(3))
@@ -0,0 +1,63 @@
+import csv
+
+import pytest
+
+from benchmark import SHEET_HEADER
+from load_assets import KEYLESS_LOTS, stream_assets_from_csv
+
+
+def lot(name="Apple", symbol="AAPL", currency="USD", shares="10", price="190.5", fx="35", mdd="40%"):
+    return [name, symbol, currency, shares, price, fx, "Growth", mdd, "200", "150", "120", "6", "1", "20", "30"]
+
+
+def write_lots(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(SHEET_HEADER)
+        writer.writerows(rows)
+    return str(path)
+
+
+@pytest.mark.parametrize("chunksize", [1, 100])
+def test_blank_cells_of_first_lot_do_not_win(tmp_path, chunksize):
+    path = write_lots(tmp_path / "lots.csv", [
+        lot(shares="5", price="", fx="", mdd=""),
+        lot(shares="7", price="1,185.69", fx="35.2", mdd="45%"),
+    ])
+    assets, failures = stream_assets_from_csv(path, chunksize=chunksize)
+
+    assert failures == {}
+    assert len(assets) == 1
+    asset = assets[0]
+    assert asset.shares == 12
+    assert asset.price == pytest.approx(1185.69)
+    assert asset.fx_rate == pytest.approx(35.2)
+    assert asset.mdd == pytest.approx(0.45)
+
+
+def test_blank_in_every_lot_becomes_zero(tmp_path):
+    path = write_lots(tmp_path / "lots.csv", [lot(price=""), lot(price="")])
+    assets, _ = stream_assets_from_csv(path)
+    assert assets[0].price == 0.0
+
+
+def test_positions_use_normalized_keys_whatever_the_lot_order(tmp_path):
+    rows = [lot(symbol="aapl ", currency="usd"), lot(symbol="AAPL", currency=" USD")]
+    forward, _ = stream_assets_from_csv(write_lots(tmp_path / "a.csv", rows), chunksize=1)
+    backward, _ = stream_assets_from_csv(write_lots(tmp_path / "b.csv", rows[::-1]), chunksize=1)
+
+    for assets in (forward, backward):
+        assert [(a.symbol, a.currency, a.shares) for a in assets] == [("AAPL", "USD", 20)]
+
+
+def test_keyless_lots_are_reported_not_merged(tmp_path):
+    path = write_lots(tmp_path / "lots.csv", [
+        lot(name="", symbol=""),
+        lot(),
+        lot(name=" ", symbol="", currency="THB"),
+        lot(name="Cash", symbol="", currency="THB"),
+    ])
+    assets, failures = stream_assets_from_csv(path, chunksize=2)
+
+    assert [(a.symbol, a.name, a.currency) for a in assets] == [("AAPL", "Apple", "USD"), ("", "Cash", "THB")]
+    assert failures == {KEYLESS_LOTS: ["line 2", "line 4"]}
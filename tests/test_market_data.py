@@ -0,0 +1,135 @@
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from asset_data import AssetData
+from market_data import MarketDataService, RateLimiter, ReplayProvider, apply_market_data
+from portfolio_frame import PortfolioFrame
+
+REPLAY = {
+    "quotes": {"AAPL": {"price": 190.5, "eps": 6.1, "dps": 0.96}, "": {"price": 1.0}},
+    "fx": {"USDTHB": 35.2},
+}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingProvider(ReplayProvider):
+    """ReplayProvider that counts calls and fails the first `failures` of them."""
+
+    def __init__(self, path, failures=0, gate=None):
+        super().__init__(path)
+        self.calls = []
+        self.failures = failures
+        self.gate = gate
+
+    def fetch_quote(self, symbol):
+        self.calls.append(symbol)
+        if self.gate is not None:
+            self.gate.wait(timeout=5)
+        if len(self.calls) <= self.failures:
+            raise ConnectionError("rate limited")
+        return super().fetch_quote(symbol)
+
+
+@pytest.fixture
+def replay_path(tmp_path):
+    path = tmp_path / "replay.json"
+    path.write_text(json.dumps(REPLAY))
+    return str(path)
+
+
+def make_service(provider, clock, sleeps=None, **kwargs):
+    sleep = sleeps.append if sleeps is not None else (lambda seconds: None)
+    return MarketDataService(provider, max_workers=1, rate_per_second=0, clock=clock, sleep=sleep, **kwargs)
+
+
+def test_fields_are_refetched_after_their_ttl(replay_path):
+    provider, clock = CountingProvider(replay_path), Clock()
+    service = make_service(provider, clock)
+
+    assert service.get_quotes(["AAPL"])["AAPL"] == REPLAY["quotes"]["AAPL"]
+    clock.now += 59
+    service.get_quotes(["AAPL"])
+    assert provider.calls == ["AAPL"]
+
+    clock.now += 2
+    service.get_quotes(["AAPL"], fields=("eps", "dps"))         # Daily TTL: still fresh
+    assert provider.calls == ["AAPL"]
+    service.get_quotes(["AAPL"])                                 # Price TTL (60 s) expired
+    assert provider.calls == ["AAPL", "AAPL"]
+
+
+def test_concurrent_requests_share_one_provider_call(replay_path):
+    gate = threading.Event()
+    provider = CountingProvider(replay_path, gate=gate)
+    service = make_service(provider, Clock())
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.get_quotes(["AAPL"]))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)                                              # Every thread is waiting on the first call
+    gate.set()
+    for thread in threads:
+        thread.join()
+
+    assert provider.calls == ["AAPL"]
+    assert all(result["AAPL"]["price"] == 190.5 for result in results)
+
+
+def test_rate_limiter_spaces_calls():
+    clock, sleeps = Clock(), []
+    limiter = RateLimiter(4.0, clock=clock, sleep=sleeps.append)
+    for _ in range(3):
+        limiter.acquire()
+    assert sleeps == [0.25, 0.5]
+
+    clock.now += 10                                              # Idle: no debt carried over
+    limiter.acquire()
+    assert sleeps == [0.25, 0.5]
+
+
+def test_transient_errors_are_retried_with_backoff(replay_path):
+    provider, sleeps = CountingProvider(replay_path, failures=2), []
+    service = make_service(provider, Clock(), sleeps, retries=3, backoff_seconds=0.5)
+
+    assert service.get_quotes(["AAPL"])["AAPL"]["price"] == 190.5
+    assert sleeps == [0.5, 1.0]
+    assert service.errors == {}
+
+
+def test_persistent_errors_are_reported_and_not_cached(replay_path):
+    provider, sleeps = CountingProvider(replay_path, failures=10), []
+    service = make_service(provider, Clock(), sleeps, retries=2, backoff_seconds=0.5)
+
+    assert service.get_quotes(["AAPL"]) == {"AAPL": {}}
+    assert len(provider.calls) == 3 and sleeps == [0.5, 1.0]
+    assert service.errors == {"AAPL": "rate limited"}
+
+    provider.failures = 0
+    assert service.get_quotes(["AAPL"])["AAPL"]["price"] == 190.5
+    assert service.errors == {}
+
+
+def test_blank_symbols_are_not_quoted(replay_path):
+    provider = CountingProvider(replay_path)
+    frame = PortfolioFrame.from_assets([
+        AssetData("Apple", "AAPL", "USD", 10, price=100.0, fx_rate=35.0, asset_class="Growth"),
+        AssetData("Unlisted", "", "USD", 10, price=5.0, fx_rate=35.0, asset_class="Growth"),
+        AssetData("Cash", "CASH", "THB", 1, price=1.0, fx_rate=1.0, asset_class="Cash"),
+    ])
+    apply_market_data(frame, make_service(provider, Clock()))
+
+    assert provider.calls == ["AAPL"]
+    np.testing.assert_allclose(frame.get("price"), [190.5, 5.0, 1.0])
+    np.testing.assert_allclose(frame.get("fx_rate"), [35.2, 35.2, 1.0])
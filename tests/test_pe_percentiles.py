@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pe_percentiles import PEPercentileEngine
+from price_history import PriceHistoryStore
+
+
+@pytest.fixture
+def stores(tmp_path):
+    prices = PriceHistoryStore(str(tmp_path))
+    return prices, prices.companion("eps")
+
+
+def dates(start, periods):
+    return pd.date_range(start, periods=periods, freq="D")
+
+
+def fresh(prices, eps):
+    return PEPercentileEngine(prices, eps).percentiles(["AAA"], years=1)
+
+
+def test_incremental_closes_match_a_fresh_engine(stores):
+    prices, eps = stores
+    eps.append("AAA", dates("2024-01-01", 1), [2.0])
+    prices.append("AAA", dates("2024-01-01", 40), np.linspace(20, 60, 40))
+    engine = PEPercentileEngine(prices, eps)
+    engine.percentiles(["AAA"], years=1)
+
+    prices.append("AAA", dates("2024-02-10", 10), np.linspace(10, 15, 10))
+    pd.testing.assert_frame_equal(engine.percentiles(["AAA"], years=1), fresh(prices, eps))
+
+
+def test_backfilled_eps_rebuilds_the_window(stores):
+    prices, eps = stores
+    prices.append("AAA", dates("2024-01-01", 40), np.linspace(20, 60, 40))
+    engine = PEPercentileEngine(prices, eps)
+    assert engine.percentiles(["AAA"], years=1).empty          # No EPS yet: no P/E bars
+
+    eps.append("AAA", dates("2024-01-01", 1), [2.0])
+    first = engine.percentiles(["AAA"], years=1)
+    assert first.loc["AAA", "n_bars"] == 40
+    pd.testing.assert_frame_equal(first, fresh(prices, eps))
+
+    # A new EPS print re-prices the closes already in the window from its date on
+    eps.append("AAA", dates("2024-01-21", 1), [4.0])
+    revised = engine.percentiles(["AAA"], years=1)
+    pd.testing.assert_frame_equal(revised, fresh(prices, eps))
+    assert revised.loc["AAA", "pe_p75"] < first.loc["AAA", "pe_p75"]
@@ -0,0 +1,18 @@
+from benchmark import make_sheet_csv
+from portfolio_batch import run_batch
+
+
+def test_parallel_output_matches_serial_order(tmp_path):
+    sheets = []
+    for i, rows in enumerate((300, 5, 80, 1)):
+        path = tmp_path / f"sheet{i}.csv"
+        path.write_text(make_sheet_csv(rows, seed=i))
+        sheets.append(str(path))
+    pref_sets = [{"name": "a"}, {"name": "b", "investment_weight": 0.4}]
+
+    serial = run_batch(sheets, pref_sets, workers=1)
+    parallel = run_batch(sheets, pref_sets, workers=3)
+
+    for name, table in serial.items():
+        assert parallel[name].equals(table), name
+    assert serial["summary"]["sheet"].drop_duplicates().tolist() == sheets
@@ -0,0 +1,45 @@
+import pytest
+
+from benchmark import make_sheet_csv
+from portfolio_history import PortfolioHistory
+from portfolio_pipeline import build_portfolio_graph, run_portfolio_pipeline, source_revision
+from sheet_cache import sheet_cache
+from user_preferences import UserPreference
+
+
+@pytest.fixture
+def sheet(tmp_path):
+    path = tmp_path / "sheet.csv"
+    path.write_text(make_sheet_csv(30, missing_ratio=0.1))
+    return path
+
+
+def run(path, **prefs):
+    user_pref = UserPreference(sheet_url=str(path), **prefs)
+    return run_portfolio_pipeline(build_portfolio_graph(), user_pref), user_pref
+
+
+def test_identical_results_are_recorded_once(tmp_path, sheet):
+    history = PortfolioHistory(str(tmp_path / "history"))
+    result, user_pref = run(sheet)
+    assert history.append_if_changed(result, user_pref, source_revision(user_pref)) is not None
+
+    # Another session with its own graph computes the same result
+    again, _ = run(sheet)
+    assert PortfolioHistory(history.root).append_if_changed(again, user_pref, source_revision(user_pref)) is None
+    assert len(history.runs()) == 1
+
+
+def test_changed_sheet_or_targets_are_recorded(tmp_path, sheet):
+    history = PortfolioHistory(str(tmp_path / "history"))
+    result, user_pref = run(sheet)
+    history.append_if_changed(result, user_pref, source_revision(user_pref))
+
+    retargeted, retargeted_pref = run(sheet, investment_weight=0.4)
+    assert history.append_if_changed(retargeted, retargeted_pref, source_revision(retargeted_pref)) is not None
+
+    sheet.write_text(make_sheet_csv(31, missing_ratio=0.1))
+    sheet_cache.invalidate(str(sheet))                      # Skip the cache TTL
+    edited, _ = run(sheet, investment_weight=0.4)
+    assert history.append_if_changed(edited, retargeted_pref, source_revision(retargeted_pref)) is not None
+    assert history.runs()["content_digest"].nunique() == 3
@@ -0,0 +1,34 @@
+from dataclasses import FrozenInstanceError
+
+import pytest
+
+from benchmark import make_sheet_csv
+from portfolio_pipeline import build_portfolio_graph, run_portfolio_pipeline
+from user_preferences import UserPreference
+
+
+@pytest.fixture
+def result(tmp_path):
+    path = tmp_path / "sheet.csv"
+    path.write_text(make_sheet_csv(50, missing_ratio=0.1))
+    return run_portfolio_pipeline(build_portfolio_graph(), UserPreference(sheet_url=str(path)))
+
+
+def test_result_is_immutable(result):
+    with pytest.raises(FrozenInstanceError):
+        result.risk_classes[0].class_target_weight = 1.0
+    with pytest.raises(FrozenInstanceError):
+        result.currencies[0].currency_cash_weight = 1.0
+    with pytest.raises(TypeError):
+        result.parse_failures["price"] = ("bad",)
+    assert all(isinstance(values, tuple) for values in result.parse_failures.values())
+    assert isinstance(result.added_reserves, tuple)
+    with pytest.raises(ValueError):
+        result.frame.get("target")[0] = 1.0
+
+
+def test_assets_are_built_on_demand_from_the_frame(result):
+    assets = result.assets
+    assert [a.name for a in assets] == list(result.frame.get("name"))
+    assets[0].target = -1.0
+    assert result.assets[0].target != -1.0                  # Fresh copies: the result is untouched
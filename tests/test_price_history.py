@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from asset_data import AssetData
+from portfolio_frame import PortfolioFrame
+from price_history import PriceHistoryStore, apply_price_history, window_extremes
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PriceHistoryStore(str(tmp_path))
+    store.append("LIVE", pd.date_range("2025-01-01", "2025-12-31"), np.linspace(100, 200, 365))
+    store.append("DELISTED", pd.date_range("2025-01-01", "2025-06-30"), np.linspace(50, 10, 181))
+    store.append("LAGGING", pd.date_range("2025-01-01", "2025-12-24"), np.linspace(10, 20, 358))
+    return store
+
+
+def test_symbols_far_behind_the_newest_bar_are_flagged(store):
+    extremes = window_extremes(store, ["LIVE", "DELISTED", "LAGGING", "MISSING"], years=1)
+    assert extremes["stale"].to_dict() == {"LIVE": False, "DELISTED": True, "LAGGING": False}
+
+    as_of = window_extremes(store, ["LIVE", "LAGGING"], years=1, as_of=np.datetime64("2026-01-05"))
+    assert as_of["stale"].to_dict() == {"LIVE": False, "LAGGING": True}
+    assert not window_extremes(store, ["DELISTED"], years=1, max_stale_days=None)["stale"].any()
+
+
+def test_stale_history_keeps_the_sheet_values(store):
+    frame = PortfolioFrame.from_assets([
+        AssetData("Live", "LIVE", "USD", 1, high_52w=1.0, low_52w=1.0),
+        AssetData("Delisted", "DELISTED", "USD", 1, high_52w=60.0, low_52w=5.0),
+    ])
+    apply_price_history(frame, store, years_rebound=1)
+
+    np.testing.assert_allclose(frame.get("high_52w"), [200.0, 60.0])
+    np.testing.assert_allclose(frame.get("low_52w"), [100.0, 5.0])
@@ -0,0 +1,36 @@
+import pytest
+
+from asset_data import AssetData
+from portfolio_frame import PortfolioFrame
+from price_signal import assign_price_signals, assign_price_signals_frame
+
+
+def assets(**overrides):
+    fields = dict(
+        name="A", symbol="A", currency="USD", shares=1, price=100.0, asset_class="Growth",
+        mdd=0.4, rebound=0.67, cagr=0.2, high_52w=120.0, low_52w=90.0, low_years=60.0,
+    )
+    fields.update(overrides)
+    return [AssetData(**fields)]
+
+
+@pytest.mark.parametrize("blank", ["high_52w", "low_52w"])
+def test_zero_52w_cells_get_no_signal(blank):
+    frame = PortfolioFrame.from_assets(assets(**{blank: 0.0}))
+    assign_price_signals_frame(frame, years_rebound=3)
+    (asset,) = frame.to_assets()
+    assert asset.price_signal is None
+    assert asset.drop_52w is None and asset.gain_52w is None
+
+    (asset,) = assign_price_signals(assets(**{blank: 0.0}), years_rebound=3)
+    assert asset.price_signal is None
+    assert asset.drop_52w is None and asset.gain_52w is None
+
+
+def test_frame_matches_row_wise():
+    frame = PortfolioFrame.from_assets(assets())
+    assign_price_signals_frame(frame, years_rebound=3)
+    (expected,) = assign_price_signals(assets(), years_rebound=3)
+    (asset,) = frame.to_assets()
+    assert asset.price_signal == expected.price_signal == "-"
+    assert asset.gain_52w == pytest.approx(expected.gain_52w)
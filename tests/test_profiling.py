@@ -0,0 +1,50 @@
+import tracemalloc
+
+import pytest
+
+from profiling import Profiler
+
+
+@pytest.fixture(autouse=True)
+def no_tracing():
+    tracemalloc.stop()
+    yield
+    tracemalloc.stop()
+
+
+def tracked_span(profiler):
+    with profiler.span("work"):
+        _ = [0] * 10_000
+
+
+def test_reset_keeps_tracing_while_another_profiler_tracks():
+    first = Profiler(enabled=True, track_allocations=True)
+    second = Profiler(enabled=True, track_allocations=True)
+    tracked_span(first)
+    tracked_span(second)
+
+    first.track_allocations = False
+    first.reset()
+    assert tracemalloc.is_tracing()
+    tracked_span(second)
+    assert second.records[-1].alloc_bytes != 0 or second.records[-1].peak_bytes > 0
+
+    second.enabled = False
+    second.reset()
+    assert not tracemalloc.is_tracing()
+
+
+def test_tracing_started_elsewhere_is_left_running():
+    tracemalloc.start()
+    profiler = Profiler(enabled=True, track_allocations=True)
+    tracked_span(profiler)
+
+    profiler.enabled = False
+    profiler.reset()
+    assert tracemalloc.is_tracing()
+
+
+def test_untracked_profiler_never_stops_tracing():
+    tracemalloc.start()
+    Profiler(enabled=False).reset()
+    assert tracemalloc.is_tracing()
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from position_size import classify_drift
+from rebalance_backtest import BacktestMarket, run_backtest
+
+TARGET = np.array([0.5, 0.3, 0.2])
+
+
+def random_market(n_days=600, seed=1):
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0003, [0.01, 0.02, 0.005], size=(n_days, 3))
+    prices = 100 * np.exp(np.cumsum(returns, axis=0))
+    return BacktestMarket(
+        days=np.arange(19_000, 19_000 + n_days, dtype=np.int64),
+        prices_thb=prices,
+        foreign=np.array([False, True, False]),
+        rows=np.arange(3),
+        names=["A", "B", "C"],
+    )
+
+
+def naive_backtest(market, target, threshold_drift, threshold_drift_relative, cost_bps=10.0, fx_cost_bps=25.0):
+    """Reference: one step per day."""
+    prices = market.prices_thb
+    cost_rate = (cost_bps + fx_cost_bps * market.foreign) / 1e4
+    units = target / prices[0]
+    value, rebalances = 1.0, []
+    for day in range(1, len(prices)):
+        held = units * prices[day]
+        value = held.sum()
+        drift = held / value - target
+        undersize, oversize = classify_drift(drift, drift / target, threshold_drift, threshold_drift_relative)
+        if (undersize | oversize).any():
+            value -= np.abs(target * value - held) @ cost_rate
+            units = target * value / prices[day]
+            rebalances.append(market.days[day])
+    return value, rebalances
+
+
+@pytest.mark.parametrize("thresholds", [(0.05, 0.25), (0.02, 0.1), (0.03, np.inf)])
+def test_event_loop_matches_the_daily_loop(thresholds):
+    market = random_market()
+    result = run_backtest(market, TARGET, *thresholds)
+    final_value, rebalance_days = naive_backtest(market, TARGET, *thresholds)
+
+    assert result.value.iloc[-1] == pytest.approx(final_value, rel=1e-12)
+    assert [d.value // 86_400_000_000_000 for d in result.rebalance_dates] == rebalance_days
+    assert len(rebalance_days) > 0
+
+
+def test_infinite_thresholds_buy_and_hold():
+    market = random_market()
+    result = run_backtest(market, TARGET, np.inf, np.inf)
+
+    expected = market.prices_thb @ (TARGET / market.prices_thb[0])
+    np.testing.assert_allclose(result.value.to_numpy(), expected, rtol=1e-12)
+    assert result.rebalance_dates == [] and result.turnover == 0.0 and result.cost == 0.0
+
+
+@pytest.mark.parametrize("bad_price", [0.0, np.nan])
+def test_rows_without_usable_prices_are_left_out(bad_price):
+    market = random_market()
+    market.prices_thb[0, 1] = bad_price
+    result = run_backtest(market, TARGET, np.inf, np.inf)
+
+    assert result.skipped == ["B"]
+    assert np.isfinite(result.value.to_numpy()).all()
+    held = np.array([0.5, 0.2]) / 0.7
+    np.testing.assert_allclose(result.value.to_numpy(), market.prices_thb[:, [0, 2]] @ (held / market.prices_thb[0, [0, 2]]))
@@ -0,0 +1,188 @@
+import hashlib
+import os
+import stat
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from sheet_cache import SheetCache, default_cache_dir
+
+
+class SheetServer:
+    """Serves one CSV (GET / HEAD) with an ETag, answering If-None-Match with 304; records every request."""
+
+    def __init__(self):
+        self.body = b"name,shares\nA,1\n"
+        self.requests = []          # If-None-Match header of each request (None when absent)
+        self.methods = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.respond(with_body=True)
+
+            def do_HEAD(self):
+                self.respond(with_body=False)
+
+            def respond(self, with_body):
+                etag = f'"{hashlib.sha256(server.body).hexdigest()[:12]}"'
+                server.requests.append(self.headers.get("If-None-Match"))
+                server.methods.append(self.command)
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Type", "text/csv")
+                self.send_header("Content-Length", str(len(server.body)))
+                self.end_headers()
+                if with_body:
+                    self.wfile.write(server.body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/sheet.csv"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def etag(self):
+        return f'"{hashlib.sha256(self.body).hexdigest()[:12]}"'
+
+
+@pytest.fixture
+def server():
+    server = SheetServer()
+    server.thread.start()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def make_cache(tmp_path, clock):
+    # No proxy, whatever the environment says: the stand-in is on localhost
+    opener = urllib.request.build_opener(urllib.request.ProxyHandler({})).open
+    return SheetCache(ttl_seconds=60, cache_dir=str(tmp_path), opener=opener, clock=clock)
+
+
+def test_cold_fetch_then_served_within_ttl(server, tmp_path, clock):
+    cache = make_cache(tmp_path, clock)
+
+    entry = cache.get(server.url, dtype=str)
+    assert server.requests == [None]
+    assert entry.etag == server.etag()
+    assert entry.digest == hashlib.sha256(server.body).hexdigest()
+    assert entry.df["name"].tolist() == ["A"]
+
+    clock.now += 59
+    assert cache.get(server.url, dtype=str) is entry
+    assert len(server.requests) == 1
+
+
+def test_stale_entry_revalidates_with_etag(server, tmp_path, clock):
+    cache = make_cache(tmp_path, clock)
+    first = cache.get(server.url, dtype=str)
+
+    clock.now += 61
+    assert cache.get(server.url, dtype=str) is first               # 304: snapshot kept
+    assert server.requests == [None, server.etag()]
+    assert first.fetched_at == clock.now
+
+    clock.now += 30
+    cache.get(server.url, dtype=str)
+    assert len(server.requests) == 2                               # Revalidation restarted the TTL
+
+    server.body = b"name,shares\nB,2\n"
+    clock.now += 61
+    changed = cache.get(server.url, dtype=str)
+    assert len(server.requests) == 3
+    assert changed.df["name"].tolist() == ["B"]
+    assert changed.etag == server.etag() != first.etag
+
+
+def test_disk_snapshot_reused_by_new_cache(server, tmp_path, clock):
+    make_cache(tmp_path, clock).get(server.url, dtype=str)
+    assert len(list(tmp_path.glob("*.parquet"))) == 1
+
+    restarted = make_cache(tmp_path, clock)
+    assert restarted.get(server.url, dtype=str).df["name"].tolist() == ["A"]
+    assert len(server.requests) == 1                               # Fresh snapshot: no request
+
+    clock.now += 61
+    restarted = make_cache(tmp_path, clock)
+    restarted.get(server.url, dtype=str)
+    assert server.requests == [None, server.etag()]                # Stale snapshot: revalidated
+
+
+def test_invalidate_forces_full_download(server, tmp_path, clock):
+    cache = make_cache(tmp_path, clock)
+    cache.get(server.url, dtype=str)
+
+    cache.invalidate(server.url)
+    assert not list(tmp_path.glob("*.parquet"))
+    cache.get(server.url, dtype=str)
+    assert server.requests == [None, None]                         # No If-None-Match after invalidate
+
+
+def test_parse_options_are_cached_separately(server, tmp_path, clock):
+    cache = make_cache(tmp_path, clock)
+    as_text = cache.get(server.url, dtype=str)
+    parsed = cache.get(server.url)
+
+    assert len(server.requests) == 2
+    assert as_text.df["shares"].tolist() == ["1"]
+    assert parsed.df["shares"].tolist() == [1]
+
+
+def test_snapshots_are_private_to_the_user(server, tmp_path, clock, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    cache = make_cache(tmp_path, clock)
+    cache.cache_dir = default_cache_dir()
+    assert cache.cache_dir.startswith(str(tmp_path))
+
+    cache.get(server.url, dtype=str)
+    assert stat.S_IMODE(os.stat(cache.cache_dir).st_mode) == 0o700
+    assert [p.suffix for p in (tmp_path / "portfolio_sheet_cache").iterdir()] == [".parquet"]
+
+
+def test_revision_uses_conditional_head_requests(server, tmp_path, clock):
+    cache = make_cache(tmp_path, clock)
+    first = cache.revision(server.url)
+    assert first == cache.revision(server.url)
+    assert server.methods == ["HEAD"]                              # Served within the TTL
+
+    clock.now += 61
+    assert cache.revision(server.url) == first                     # 304 keeps the token
+    assert server.requests == [None, server.etag()]
+
+    server.body = b"name,shares\nB,2\n"
+    clock.now += 61
+    assert cache.revision(server.url) != first
+    assert server.methods == ["HEAD"] * 3                          # Nothing was downloaded
+
+
+def test_local_revision_is_size_and_mtime(tmp_path, clock):
+    path = tmp_path / "lots.csv"
+    path.write_text("name,shares\nA,1\n")
+    cache = make_cache(tmp_path, clock)
+    first = cache.revision(str(path))
+
+    path.write_text("name,shares\nA,12\n")
+    assert cache.revision(str(path)) != first
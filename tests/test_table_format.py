@@ -0,0 +1,21 @@
+import numpy as np
+import pandas as pd
+
+from table_format import cell_formatter, format_table
+
+
+def test_cells_keep_their_numbers_and_format_for_display():
+    df = pd.DataFrame({"Name": ["B", "A", "C"], "Value": [1_234_567.8, 9.0, np.nan], "Weight": [0.1234, 0.0, 0.5]})
+    styled = format_table(df, {"Name": None, "Value": "num0", "Weight": "pct1"})
+
+    assert styled.data["Value"].dtype == np.float64
+    assert df.sort_values("Value")["Name"].tolist() == ["A", "B", "C"]     # Numeric, not textual, order
+    rendered = styled.to_string()
+    assert "1,234,568" in rendered and "12.3%" in rendered
+    assert rendered.count("-") == 2                                         # NaN and the zero weight
+
+
+def test_formatters_are_shared_and_handle_blanks():
+    assert cell_formatter("pct0") is cell_formatter("pct0")
+    keep_zero = cell_formatter("num2", empty="", zero_is_empty=False)
+    assert [keep_zero(v) for v in (0.0, None, "n/a", 1234.5)] == ["0.00", "", "", "1,234.50"]
@@ -0,0 +1,80 @@
+import pytest
+
+from asset_data import AssetData
+from currency_portfolio import Currency
+from portfolio_frame import PortfolioFrame
+from trade_list import NO_CURRENCY, build_trade_list
+
+TOTAL = 10_000_000
+
+
+def stock(name, drift_amount, currency="USD", price=10.0, fx=35.0, lot_size=None):
+    position = "oversize" if drift_amount > 0 else "undersize"
+    return AssetData(name, name, currency, 1_000, price=price, fx_rate=fx, asset_class="Growth",
+                     lot_size=lot_size, position_size=position, drift_amount=drift_amount)
+
+
+def cash(currency, value_thb, fx):
+    return AssetData(f"Cash {currency}", "", currency, value_thb / fx, price=1.0, fx_rate=fx,
+                     asset_class="Cash", value_thb=value_thb, position_size="")
+
+
+def trade(assets, currencies=(), **kwargs):
+    kwargs = {"threshold_drift": 0.05, "threshold_drift_relative": 0.5, **kwargs}
+    return build_trade_list(PortfolioFrame.from_assets(assets), list(currencies), TOTAL, **kwargs)
+
+
+def test_whole_lots_are_truncated_toward_zero():
+    trades = trade(
+        [stock("BUY", -100_000, lot_size=100), stock("SELL", 100_000, lot_size=100), cash("USD", 1_000_000, 35.0)],
+        [Currency("USD", currency_cash_weight=0.1)],
+    )
+    orders = trades.orders.set_index("Name")
+    # 100,000 THB is 285.7 shares at 350 THB: two whole lots of 100 either way
+    assert orders.loc["BUY", ["Side", "Shares"]].tolist() == ["Buy", 200]
+    assert orders.loc["SELL", ["Side", "Shares"]].tolist() == ["Sell", 200]
+    assert orders["Value (THB)"].tolist() == [70_000, -70_000]
+    assert trades.fx.empty
+
+
+def test_orders_below_the_minimum_trade_are_dropped():
+    trades = trade(
+        [stock("SMALL", -3_500), stock("LARGE", -35_000), cash("USD", 1_000_000, 35.0)],
+        [Currency("USD", currency_cash_weight=0.1)],
+        min_trade_thb=10_000,
+    )
+    assert trades.orders["Name"].tolist() == ["LARGE"]
+
+
+def test_fx_legs_net_to_zero_and_cover_the_overdraft():
+    trades = trade(
+        [stock("BUY", -700_000), cash("USD", 100_000, 35.0), cash("THB", 3_000_000, 1.0)],
+        [Currency("USD", currency_cash_weight=0.0), Currency("THB", currency_cash_weight=0.1)],
+    )
+    assert trades.fx[["From", "To"]].values.tolist() == [["THB", "USD"]]
+    leg = trades.fx.iloc[0]
+    assert leg["Amount (THB)"] == pytest.approx(600_000)
+    assert leg["Amount (To)"] == pytest.approx(600_000 / 35)
+    assert trades.cash["FX"].sum() == pytest.approx(0)
+    assert trades.cash.loc["USD", "Cash After"] == pytest.approx(0)
+    assert trades.shortfall.empty
+
+
+def test_uncovered_deficit_is_reported_as_shortfall():
+    trades = trade(
+        [stock("BUY", -700_000), cash("USD", 100_000, 35.0), cash("THB", 400_000, 1.0)],
+        [Currency("USD"), Currency("THB")],
+    )
+    assert trades.fx["Amount (THB)"].sum() == pytest.approx(400_000)
+    assert trades.shortfall.to_dict() == pytest.approx({"USD": 200_000})
+
+
+def test_blank_currency_rows_get_their_own_cash_row_and_no_fx():
+    trades = trade(
+        [stock("NOCCY", -35_000, currency=" "), cash("THB", 3_000_000, 1.0)],
+        [Currency("THB", currency_cash_weight=0.3)],
+    )
+    assert trades.orders["Currency"].tolist() == [NO_CURRENCY]
+    assert trades.fx.empty
+    assert trades.cash.loc[NO_CURRENCY, "Order Flow"] == pytest.approx(-35_000)
+    assert trades.shortfall.to_dict() == pytest.approx({NO_CURRENCY: 35_000})
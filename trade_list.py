@@ -0,0 +1,177 @@
+# trade_list.py
+"""
+Turn position drift into orders.
+
+Only rows the drift rules flag (undersize / oversize) are traded, each
+back to its target, so turnover is the least the rules allow. Quantities
+are rounded toward zero to whole lots (never overshooting the target) and
+orders below the minimum trade value are dropped.
+
+Cash rows are not traded directly: every order settles against the cash
+of its own currency. A currency whose cash would go negative, or drift
+out of its band around the target from build_currency_portfolio, is then
+topped up / drawn down with FX conversions, matched greedily from the
+largest surplus to the largest deficit (at most currencies − 1 transfers).
+When the surpluses cannot cover every overdrawn balance, the cash still
+missing is reported per currency (Shortfall) rather than left unsaid.
+
+Rows without a currency settle into their own NO_CURRENCY cash row, which
+is shown but never converted: there is no currency to buy or sell.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from currency_portfolio import Currency
+from fx_engine import FxMatrix, SHEET_FX_BASE, sheet_cross_rate
+from portfolio_frame import PortfolioFrame
+from position_size import classify_drift
+
+TRADED_POSITIONS = ("undersize", "oversize")
+
+# Cash row of orders on rows with a blank currency
+NO_CURRENCY = "(no currency)"
+
+
+@dataclass
+class TradeList:
+    orders: pd.DataFrame                # One row per order
+    fx: pd.DataFrame                    # FX conversions between cash balances
+    cash: pd.DataFrame                  # Per-currency cash before / after, in THB
+
+    @property
+    def turnover_thb(self) -> float:
+        return float(self.orders["Value (THB)"].abs().sum() + self.fx["Amount (THB)"].sum())
+
+    @property
+    def shortfall(self) -> pd.Series:
+        """THB still missing per overdrawn currency after every FX conversion."""
+        return self.cash["Shortfall"][self.cash["Shortfall"] > 0]
+
+
+def _lot_sizes(frame: PortfolioFrame, default_lot: float) -> np.ndarray:
+    lots = frame.get("lot_size")
+    return np.where(np.nan_to_num(lots) > 0, lots, default_lot)
+
+
+def _match_fx(names: list[str], need: np.ndarray, spare: np.ndarray) -> list[tuple[str, str, float]]:
+    """Greedy transfers (from, to, THB) covering need from spare, largest first."""
+    need, spare = need.copy(), spare.copy()
+    transfers = []
+    while need.max(initial=0.0) > 0 and spare.max(initial=0.0) > 0:
+        to, source = int(need.argmax()), int(spare.argmax())
+        amount = min(need[to], spare[source])
+        transfers.append((names[source], names[to], amount))
+        need[to] -= amount
+        spare[source] -= amount
+    return transfers
+
+
+def _currency_fx(frame: PortfolioFrame, codes: np.ndarray, n_currencies: int) -> np.ndarray:
+    """THB per unit of each currency (first positive fx_rate in the sheet; 1 when none)."""
+    fx_rate = np.nan_to_num(frame.get("fx_rate"))
+    rates = np.ones(n_currencies)
+    for code in range(n_currencies):
+        positive = fx_rate[(codes == code) & (fx_rate > 0)]
+        if len(positive):
+            rates[code] = positive[0]
+    return rates
+
+
+def build_trade_list(
+    frame: PortfolioFrame,
+    currencies: list[Currency],
+    total_thb: float,
+    threshold_drift: float,
+    threshold_drift_relative: float,
+    min_trade_thb: float = 0.0,
+    default_lot: float = 1.0,
+    fx: Optional[FxMatrix] = None,
+    base: str = SHEET_FX_BASE,
+) -> TradeList:
+    """
+    Orders and FX conversions for a pipeline result frame (after position sizing).
+
+    Amounts labelled THB are in the base currency of the result (pass its
+    fx and base_currency): sheet rates are converted with the cross rate
+    from THB. Currencies without a rate count 1:1 with THB.
+
+    Rows priced at 0 (auto-added Bond placeholders) trade in units of one
+    local currency. A lot_size column in the sheet overrides default_lot
+    per row; default_lot=0 allows fractional quantities.
+    """
+    asset_class = frame.get("asset_class")
+    currency = np.array([(c or "").strip().upper() or NO_CURRENCY for c in frame.get("currency")], dtype=object)
+    codes, names = pd.factorize(currency)
+    names = list(names)
+    fx_by_currency = _currency_fx(frame, codes, len(names)) * sheet_cross_rate(fx, base)
+
+    # --- Orders: flagged non-cash rows back to target, whole lots toward zero
+    traded = np.isin(frame.get("position_size"), TRADED_POSITIONS) & (asset_class != "Cash")
+    price = np.nan_to_num(frame.get("price"))
+    price = np.where(price > 0, price, 1.0)
+    unit_thb = price * fx_by_currency[codes]
+    gap_thb = np.where(traded, -np.nan_to_num(frame.get("drift_amount")), 0.0)
+
+    lot = _lot_sizes(frame, default_lot)
+    quantity = gap_thb / unit_thb
+    lots = np.divide(quantity, lot, out=np.zeros_like(quantity), where=lot > 0)
+    quantity = np.where(lot > 0, np.trunc(lots) * lot, quantity)
+    value_thb = quantity * unit_thb
+    order = traded & (quantity != 0) & (np.abs(value_thb) >= min_trade_thb)
+    quantity, value_thb = np.where(order, quantity, 0.0), np.where(order, value_thb, 0.0)
+
+    rows = np.flatnonzero(order)
+    orders = pd.DataFrame({
+        "Name": frame.get("name")[rows],
+        "Symbol": frame.get("symbol")[rows],
+        "Currency": currency[rows],
+        "Side": np.where(quantity[rows] > 0, "Buy", "Sell"),
+        "Shares": np.abs(quantity[rows]),
+        "Price": price[rows],
+        "Value (Local)": np.abs(quantity[rows] * price[rows]),
+        "Value (THB)": value_thb[rows],
+    })
+
+    # --- Per-currency cash after every order has settled against it
+    is_cash = asset_class == "Cash"
+    cash_before = np.bincount(codes, weights=np.where(is_cash, np.nan_to_num(frame.get("value_thb")), 0.0), minlength=len(names))
+    flow = -np.bincount(codes, weights=value_thb, minlength=len(names))
+    cash_target = np.zeros(len(names))
+    for c in currencies:
+        if c.name in names:
+            cash_target[names.index(c.name)] = c.currency_cash_weight * total_thb
+    cash_after = cash_before + flow
+
+    # Overdrawn or out-of-band balances go back to target; the rest stays put
+    weight_after = cash_after / total_thb if total_thb else np.zeros(len(names))
+    target_weight = cash_target / total_thb if total_thb else np.zeros(len(names))
+    drift = weight_after - target_weight
+    drift_relative = np.divide(drift, target_weight, out=np.zeros_like(drift), where=target_weight > 0)
+    undersize, _ = classify_drift(drift, drift_relative, threshold_drift, threshold_drift_relative)
+    convertible = np.array([name != NO_CURRENCY for name in names], dtype=bool)
+    need = np.where(convertible & (undersize | (cash_after < 0)), cash_target - cash_after, 0.0)
+    spare = np.where(convertible & (need <= 0), np.maximum(cash_after - cash_target, 0.0), 0.0)
+    transfers = _match_fx(names, np.maximum(need, 0.0), spare)
+
+    fx = pd.DataFrame(transfers, columns=["From", "To", "Amount (THB)"])
+    fx["Amount (From)"] = fx["Amount (THB)"] / fx["From"].map(dict(zip(names, fx_by_currency)))
+    fx["Amount (To)"] = fx["Amount (THB)"] / fx["To"].map(dict(zip(names, fx_by_currency)))
+
+    converted = np.zeros(len(names))
+    for source, to, amount in transfers:
+        converted[names.index(source)] -= amount
+        converted[names.index(to)] += amount
+
+    cash = pd.DataFrame({
+        "Cash Before": cash_before,
+        "Order Flow": flow,
+        "FX": converted,
+        "Cash After": cash_after + converted,
+        "Cash Target": cash_target,
+        "Shortfall": np.maximum(-(cash_after + converted), 0.0),
+    }, index=pd.Index(names, name="Currency"))
+
+    return TradeList(orders=orders, fx=fx, cash=cash)
@@ -1,6 +1,8 @@
 # yield_signal.py
 from typing import List
+import numpy as np
 from asset_data import AssetData
+from portfolio_frame import PortfolioFrame
 
 
 def assign_yield_signals(assets: List[AssetData]) -> List[AssetData]:
@@ -33,3 +35,28 @@ def assign_yield_signals(assets: List[AssetData]) -> List[AssetData]:
             asset.dividend_yield_signal = "-"
 
     return assets
+
+
+def assign_yield_signals_frame(frame: PortfolioFrame) -> PortfolioFrame:
+    """
+    Vectorized assign_yield_signals over a PortfolioFrame.
+    """
+
+    price = frame.get("price")
+
+    # --- Step 1: Calculate Dividend Yield (DPS / Price) ---
+    has_yield = frame.present("dps") & frame.present("price") & (price > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frame.set("dividend_yield", frame.get("dps") / price, has_yield)
+
+    # --- Step 2-3: Only investment assets with assumption + yield ---
+    evaluated = frame.investment_rows() & has_yield & frame.present("dividend_yield_offset")
+
+    # --- Step 4: Compare yield vs offset ---
+    sufficient = frame.get("dividend_yield") >= frame.get("dividend_yield_offset")
+    frame.set("dividend_yield_signal", np.select(
+        [~evaluated, sufficient],
+        [None, "sufficient"],
+        "-",
+    ))
+    return frame